@@ -0,0 +1,394 @@
+# -*- coding: utf-8 -*-
+
+
+"""benchmark.py
+
+Measures the speed of the sequence alignment models.
+Run as a module of the package, for example:
+
+    python -m DiffVis.benchmark alignment --sizes 1000 10000
+"""
+
+
+import os
+import sys
+import json
+import random
+import socket
+import asyncio
+import subprocess
+import time
+
+from .string_distance import Levenshtein, Damerau, LongestCommonSubsequence, Hirschberg, Myers, Anchored
+from .string_distance import pairwise_distances
+from .diffvis import DiffVis
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='benchmark.py',
+        usage='python -m DiffVis.benchmark <benchmark> [options]',
+        description='Measures the speed of DiffVis',
+        epilog='end',
+        add_help=True,
+        )
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    parser_alignment = subparsers.add_parser(
+        'alignment',
+        help='compare alignment models on near-identical sequences',
+        )
+    parser_alignment.add_argument(
+        '-s', '--sizes',
+        help='lengths of the sequences',
+        action='store',
+        nargs='+',
+        type=int,
+        default=[1000, 10000, 100000, 1000000],
+        )
+    parser_alignment.add_argument(
+        '-e', '--edits',
+        help='number of edit operations applied to the target',
+        action='store',
+        type=int,
+        default=10,
+        )
+    parser_alignment.add_argument(
+        '--max-table-size',
+        help='largest length for which models building cost table are run',
+        action='store',
+        type=int,
+        default=2000,
+        )
+
+    parser_pairwise = subparsers.add_parser(
+        'pairwise',
+        help='measure scaling of pairwise distances across worker processes',
+        )
+    parser_pairwise.add_argument(
+        '-n', '--n-sequences',
+        help='number of sequences',
+        action='store',
+        type=int,
+        default=400,
+        )
+    parser_pairwise.add_argument(
+        '-l', '--length',
+        help='length of each sequence',
+        action='store',
+        type=int,
+        default=50,
+        )
+    parser_pairwise.add_argument(
+        '-j', '--jobs',
+        help='numbers of worker processes',
+        action='store',
+        nargs='+',
+        type=int,
+        default=[1, 2, 4, 8],
+        )
+
+    parser_batch = subparsers.add_parser(
+        'batch',
+        help='compare throughput of DiffVis.batch with a loop of DiffVis',
+        )
+    parser_batch.add_argument(
+        '-n', '--n-pairs',
+        help='number of pairs',
+        action='store',
+        type=int,
+        default=2000,
+        )
+    parser_batch.add_argument(
+        '-u', '--n-unique',
+        help='number of unique pairs among them',
+        action='store',
+        type=int,
+        default=1000,
+        )
+    parser_batch.add_argument(
+        '-l', '--length',
+        help='length of each sequence',
+        action='store',
+        type=int,
+        default=100,
+        )
+    parser_batch.add_argument(
+        '-m', '--mode',
+        help='output mode',
+        action='store',
+        default='HTML',
+        )
+    parser_batch.add_argument(
+        '-j', '--jobs',
+        help='numbers of worker processes',
+        action='store',
+        nargs='+',
+        type=int,
+        default=[1, 2, 4, 8],
+        )
+
+    parser_server = subparsers.add_parser(
+        'server',
+        help='measure latency of a local HTTP server under concurrent requests',
+        )
+    parser_server.add_argument(
+        '-n', '--n-requests',
+        help='number of requests',
+        action='store',
+        type=int,
+        default=1000,
+        )
+    parser_server.add_argument(
+        '-c', '--concurrency',
+        help='number of concurrent clients',
+        action='store',
+        type=int,
+        default=16,
+        )
+    parser_server.add_argument(
+        '-l', '--length',
+        help='length of each sequence',
+        action='store',
+        type=int,
+        default=200,
+        )
+    parser_server.add_argument(
+        '-m', '--mode',
+        help='output mode',
+        action='store',
+        default='HTML',
+        )
+    parser_server.add_argument(
+        '-w', '--workers',
+        help='number of worker processes of the server',
+        action='store',
+        type=int,
+        default=None,
+        )
+
+    args = parser.parse_args()
+    if args.benchmark == 'alignment':
+        benchmark_alignment(args.sizes, args.edits, args.max_table_size)
+    elif args.benchmark == 'pairwise':
+        benchmark_pairwise(args.n_sequences, args.length, args.jobs)
+    elif args.benchmark == 'batch':
+        benchmark_batch(args.n_pairs, args.n_unique, args.length, args.mode, args.jobs)
+    elif args.benchmark == 'server':
+        benchmark_server(args.n_requests, args.concurrency, args.length, args.mode, args.workers)
+
+
+def make_similar_sequences(length, n_edits, alphabet='abcdefghijklmnopqrstuvwxyz', seed=0):
+    """Makes random source sequence and target sequence
+    by applying random edit operations to the source.
+
+    Args:
+        length (int): Length of source sequence.
+        n_edits (int): Number of edit operations.
+        alphabet (str): Elements of the sequences.
+        seed (int): Random seed.
+
+    Returns:
+        source (str): Source sequence.
+        target (str): Target sequence.
+    """
+    rand = random.Random(seed)
+    source = [rand.choice(alphabet) for _ in range(length)]
+    target = list(source)
+    for _ in range(n_edits):
+        position = rand.randrange(len(target) + 1)
+        operation = rand.choice(['insert', 'delete', 'replace'])
+        if (operation == 'insert') or (position == len(target)):
+            target.insert(position, rand.choice(alphabet))
+        elif operation == 'delete':
+            del target[position]
+        else:
+            target[position] = rand.choice(alphabet)
+    return ''.join(source), ''.join(target)
+
+
+def measure_time(function, *args, **kwargs):
+    """Measures elapsed time of the function call in seconds."""
+    time_start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - time_start
+
+
+def benchmark_alignment(sizes, n_edits, max_table_size):
+    """Compares build time of the alignment models on near-identical sequences.
+    Models materializing cost table or dividing it are skipped
+    for sequences longer than max_table_size.
+
+    Args:
+        sizes (list[int]): Lengths of the sequences.
+        n_edits (int): Number of edit operations applied to the target.
+        max_table_size (int): Largest length for O(mn) models.
+    """
+    models = [
+        ('Levenshtein', Levenshtein, True),
+        ('Damerau', Damerau, True),
+        ('LCS', LongestCommonSubsequence, True),
+        ('Hirschberg', Hirschberg, True),
+        ('Myers', Myers, False),
+        ('Anchored', Anchored, False),
+        ]
+    print('{:>10}'.format('length') + ''.join(f'{name:>14}' for name, _, _ in models))
+    for size in sizes:
+        source, target = make_similar_sequences(size, n_edits)
+        row = f'{size:>10}'
+        for name, Model, is_quadratic in models:
+            if is_quadratic and (size > max_table_size):
+                row += '{:>14}'.format('-')
+                continue
+            elapsed = measure_time(Model(source, target).build)
+            row += f'{elapsed:>13.4f}s'
+        print(row)
+
+
+def benchmark_pairwise(n_sequences, length, jobs):
+    """Measures time of pairwise_distances for each number of worker processes.
+
+    Args:
+        n_sequences (int): Number of sequences.
+        length (int): Length of each sequence.
+        jobs (list[int]): Numbers of worker processes.
+    """
+    sequences = [make_similar_sequences(length, 0, seed=k)[0] for k in range(n_sequences)]
+    n_pairs = n_sequences * (n_sequences-1) // 2
+    print(f'{n_pairs} pairs of length {length}')
+    print('{:>6}{:>12}{:>14}{:>10}'.format('jobs', 'time', 'pairs/s', 'speedup'))
+    elapsed_single = None
+    for n_jobs in jobs:
+        elapsed = measure_time(pairwise_distances, sequences, n_jobs=n_jobs)
+        if elapsed_single is None:
+            elapsed_single = elapsed
+        print(f'{n_jobs:>6}{elapsed:>11.3f}s{n_pairs/elapsed:>14.0f}{elapsed_single/elapsed:>9.2f}x')
+
+
+def benchmark_batch(n_pairs, n_unique, length, mode, jobs):
+    """Measures throughput of DiffVis.batch for each number of worker processes,
+    compared with building and visualizing DiffVis one by one.
+
+    Args:
+        n_pairs (int): Number of pairs.
+        n_unique (int): Number of unique pairs among them.
+        length (int): Length of each sequence.
+        mode (str): Output mode.
+        jobs (list[int]): Numbers of worker processes.
+    """
+    rand = random.Random(0)
+    pairs_unique = [make_similar_sequences(length, max(1, length // 20), seed=k) for k in range(n_unique)]
+    pairs = [rand.choice(pairs_unique) for _ in range(n_pairs)]
+
+    def _visualize_naive():
+        for source, target in pairs:
+            dv = DiffVis(source, target)
+            dv.build()
+            dv.visualize(mode=mode)
+
+    print(f'{n_pairs} pairs ({n_unique} unique) of length {length}')
+    print('{:>8}{:>12}{:>14}{:>10}'.format('jobs', 'time', 'pairs/s', 'speedup'))
+    elapsed_naive = measure_time(_visualize_naive)
+    print('{:>8}'.format('loop') + f'{elapsed_naive:>11.3f}s{n_pairs/elapsed_naive:>14.0f}{1:>9.2f}x')
+    for n_jobs in jobs:
+        elapsed = measure_time(DiffVis.batch, pairs, mode=mode, n_jobs=n_jobs)
+        print(f'{n_jobs:>8}{elapsed:>11.3f}s{n_pairs/elapsed:>14.0f}{elapsed_naive/elapsed:>9.2f}x')
+
+
+def benchmark_server(n_requests, concurrency, length, mode, n_workers=None):
+    """Measures latency of requests to a local HTTP server
+    started in another process.
+    Each client keeps its connection alive and sends requests one by one.
+
+    Args:
+        n_requests (int): Number of requests.
+        concurrency (int): Number of concurrent clients.
+        length (int): Length of each sequence.
+        mode (str): Output mode.
+        n_workers (int): Number of worker processes of the server.
+            Defaults to None (the number of CPUs).
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    command = [sys.executable, '-m', f'{__package__}.diffvis', '--serve', 'http', '--port', str(port)]
+    if n_workers is not None:
+        command += ['--workers', str(n_workers)]
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join([root] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time_limit = time.perf_counter() + 30
+        while True:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if (time.perf_counter() > time_limit) or (process.poll() is not None):
+                    raise RuntimeError('Server did not start.')
+                time.sleep(0.1)
+
+        bodies = []
+        for k in range(n_requests):
+            source, target = make_similar_sequences(length, max(1, length // 20), seed=k)
+            bodies.append(json.dumps({'source': source, 'target': target, 'mode': mode}).encode('utf-8'))
+        latencies, elapsed = asyncio.run(_load_server(port, bodies, concurrency))
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies.sort()
+    def _percentile(p):
+        return latencies[min(len(latencies)-1, int(len(latencies) * p / 100))] * 1000
+
+    print(f'{n_requests} requests of length {length} from {concurrency} clients')
+    print('{:>12}{:>10}{:>10}{:>10}{:>10}'.format('requests/s', 'p50', 'p90', 'p99', 'max'))
+    print(
+        f'{n_requests/elapsed:>12.0f}'
+        f'{_percentile(50):>8.1f}ms{_percentile(90):>8.1f}ms'
+        f'{_percentile(99):>8.1f}ms{latencies[-1]*1000:>8.1f}ms'
+        )
+
+
+async def _load_server(port, bodies, concurrency):
+    # returns latencies of the requests (seconds) and elapsed time of all
+    queue = asyncio.Queue()
+    for body in bodies:
+        queue.put_nowait(body)
+    latencies = []
+
+    async def _client():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            while not queue.empty():
+                body = queue.get_nowait()
+                time_start = time.perf_counter()
+                writer.write(
+                    b'POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body
+                    )
+                await writer.drain()
+                status = await reader.readline()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in [b'\r\n', b'']:
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                await reader.readexactly(int(headers['content-length']))
+                if b' 200 ' not in status:
+                    raise RuntimeError(f'Request failed: {status.decode("latin-1").strip()}')
+                latencies.append(time.perf_counter() - time_start)
+        finally:
+            writer.close()
+
+    time_start = time.perf_counter()
+    await asyncio.gather(*[_client() for _ in range(concurrency)])
+    return latencies, time.perf_counter() - time_start
+
+
+if __name__ == '__main__':
+    main()
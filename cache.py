@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+
+"""cache.py
+
+Caches results of sequence alignment (edit histories)
+so that the same pair of sequences is not aligned again.
+Results are looked up by a hash of source, target, alignment model, and cost model.
+Recently used results are kept in memory (serialized,
+so callers cannot change cached results through the returned objects),
+and optionally in SQLite database on disk, shared among processes.
+Both tiers are bounded and least recently used results are evicted.
+"""
+
+
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .string_distance import EditScript, is_weighted
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        prog='cache.py',
+        usage='python -m DiffVis.cache <path> [--clear]',
+        description='Shows or clears alignment cache on disk',
+        epilog='end',
+        add_help=True,
+        )
+    parser.add_argument(
+        'path',
+        help='path to cache database',
+        action='store',
+        )
+    parser.add_argument(
+        '--clear',
+        help='flag to remove all the results',
+        action='store_true',
+        required=False,
+        )
+
+    args = parser.parse_args()
+    cache = AlignmentCache(path=args.path)
+    if args.clear:
+        cache.clear()
+    n_entries, size = cache.disk_usage()
+    print(f'Entries: {n_entries}')
+    print(f'Size: {size} bytes (max {cache.max_disk_size} bytes)')
+    cache.close()
+
+
+def make_key(source, target, alignment, cost_model=None):
+    """Makes key of alignment result from its inputs.
+    Strings are hashed by their characters,
+    and other sequences are hashed by repr of their elements.
+
+    Args:
+        source (iterable): Source sequence.
+        target (iterable): Target sequence.
+        alignment (str): Sequence alignment model name.
+        cost_model (CostModel): Costs of edit operations.
+            Ignored if the costs are unit. Defaults to None.
+
+    Returns:
+        key (str): SHA-256 hex digest.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(alignment.encode('utf-8') + b'\0')
+    if is_weighted(cost_model):
+        hasher.update(repr(cost_model).encode('utf-8'))
+    hasher.update(b'\0')
+    for sequence in [source, target]:
+        if isinstance(sequence, str):
+            data = b's' + sequence.encode('utf-8', 'surrogatepass')
+        else:
+            data = b'l' + repr([elem for elem in sequence]).encode('utf-8', 'backslashreplace')
+        hasher.update(len(data).to_bytes(8, 'little'))
+        hasher.update(data)
+    return hasher.hexdigest()
+
+
+class AlignmentCache(object):
+    """Two-tier LRU cache of edit histories.
+
+    Args:
+        path (str): Path to SQLite database file.
+            If None, results are kept only in memory.
+            Defaults to None.
+        max_memory_entries (int): Maximum number of results kept in memory.
+            Defaults to 256.
+        max_disk_size (int): Maximum total size (bytes) of results on disk.
+            Defaults to 64 MiB.
+
+    Attributes:
+        path (str): Path to SQLite database file.
+        max_memory_entries (int): Maximum number of results kept in memory.
+        max_disk_size (int): Maximum total size (bytes) of results on disk.
+        hits (int): Number of results found.
+        misses (int): Number of results not found.
+    """
+    def __init__(self, path=None, max_memory_entries=256, max_disk_size=64*1024*1024):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_size = max_disk_size
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = None
+        if path is not None:
+            self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS alignments ('
+                'key TEXT PRIMARY KEY, edit_history BLOB NOT NULL, '
+                'size INTEGER NOT NULL, last_used REAL NOT NULL)'
+                )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS alignments_last_used ON alignments (last_used)'
+                )
+
+    def get(self, key):
+        """Gets edit history of the key.
+
+        Args:
+            key (str): Key made by make_key.
+
+        Returns:
+            edit_history (EditScript): History of edition.
+                It is a new object on every call.
+                None if not cached.
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return EditScript.from_bytes(data)
+
+            if self._connection is not None:
+                row = self._connection.execute(
+                    'SELECT edit_history FROM alignments WHERE key = ?', (key,),
+                    ).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        'UPDATE alignments SET last_used = ? WHERE key = ?', (time.time(), key),
+                        )
+                    data = bytes(row[0])
+                    self._put_memory(key, data)
+                    self.hits += 1
+                    return EditScript.from_bytes(data)
+
+            self.misses += 1
+            return None
+
+    def set(self, key, edit_history):
+        """Stores edit history of the key.
+
+        Args:
+            key (str): Key made by make_key.
+            edit_history (EditScript): History of edition.
+                It is copied, so changing it later does not affect the cache.
+        """
+        if not isinstance(edit_history, EditScript):
+            edit_history = EditScript.from_operations(edit_history)
+        data = edit_history.to_bytes()
+        with self._lock:
+            self._put_memory(key, data)
+            if self._connection is None:
+                return
+            if len(data) > self.max_disk_size:
+                return
+            self._connection.execute(
+                'INSERT OR REPLACE INTO alignments VALUES (?, ?, ?, ?)',
+                (key, data, len(data), time.time()),
+                )
+            self._evict_disk()
+
+    def clear(self):
+        """Removes all the results."""
+        with self._lock:
+            self._memory.clear()
+            if self._connection is not None:
+                self._connection.execute('DELETE FROM alignments')
+
+    def disk_usage(self):
+        """Gets number of results and their total size on disk.
+
+        Returns:
+            n_entries (int): Number of results.
+            size (int): Total size (bytes).
+        """
+        if self._connection is None:
+            return 0, 0
+        with self._lock:
+            n_entries, size = self._connection.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM alignments',
+                ).fetchone()
+        return n_entries, size
+
+    def close(self):
+        """Closes database."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _put_memory(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        size = self._connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM alignments',
+            ).fetchone()[0]
+        if size <= self.max_disk_size:
+            return
+        rows = self._connection.execute(
+            'SELECT key, size FROM alignments ORDER BY last_used',
+            ).fetchall()
+        keys_evicted = []
+        for key, size_entry in rows:
+            if size <= self.max_disk_size:
+                break
+            keys_evicted.append((key,))
+            size -= size_entry
+        self._connection.executemany('DELETE FROM alignments WHERE key = ?', keys_evicted)
+
+
+if __name__ == '__main__':
+    main()
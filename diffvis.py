@@ -9,16 +9,26 @@ Not only string, but also list of words (tokenized sentence) can be used.
 """
 
 
-from .string_distance import Levenshtein, LongestCommonSubsequence
+import os
+import asyncio
+import operator
+import itertools
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .string_distance import get_model, is_weighted, Levenshtein, Hirschberg, Hierarchical, SemiGlobal
+from .string_distance import Damerau, LongestCommonSubsequence
 from .string_distance import format_cost_table, format_edit_history, extract_common_parts
-from .formatter import ConsoleFormatter, HTMLFormatter, HTMLTabFormatter
+from .string_distance import iter_hunks, iter_runs, Vocabulary
+from .string_distance import make_worker_pool, get_worker_settings
+from .formatter import get_formatter
+from .cache import make_key
 
 
 def main():
     import argparse
     parser = argparse.ArgumentParser(
         prog='diffvis.py',
-        usage='python diffvis.py <source> <target> -p',
+        usage='python diffvis.py <source> <target> -p | --serve {http,stdio}',
         description='Visualize difference between two strings',
         epilog='end',
         add_help=True,
@@ -27,11 +37,13 @@ def main():
         'source',
         help='source string',
         action='store',
+        nargs='?',
         )
     parser.add_argument(
         'target',
         help='target string',
         action='store',
+        nargs='?',
         )
     parser.add_argument(
         '-p', '--padding',
@@ -39,23 +51,130 @@ def main():
         action='store_true',
         required=False,
         )
+    parser.add_argument(
+        '-c', '--context',
+        help='number of matches shown around changes. If not given, all are shown.',
+        action='store',
+        type=int,
+        required=False,
+        default=None,
+        )
     parser.add_argument(
         '-m', '--mode',
-        help='sequence alignment algorythm. Levenshtein or LCS can be used.',
+        help='sequence alignment algorythm. Levenshtein, Damerau, LCS, Hirschberg, Myers, LineLevenshtein, LineLCS, SemiGlobal, Anchored, or AnchoredLCS can be used.',
         action='store',
         required=False,
         default='Levenshtein',
         )
+    parser.add_argument(
+        '-o', '--output',
+        help='output mode. Console, HTML, HTMLTab, CompactHTML, or CompactHTMLTab can be used.',
+        action='store',
+        required=False,
+        default='Console',
+        )
+    parser.add_argument(
+        '--columns',
+        help='number of cells in a row of CompactHTMLTab table. If not given, the table has one row for each sequence.',
+        action='store',
+        type=int,
+        required=False,
+        default=None,
+        )
+
+    parser.add_argument(
+        '--serve',
+        help='serves DiffVis over HTTP or standard input/output instead. See server.py.',
+        action='store',
+        choices=['http', 'stdio'],
+        required=False,
+        default=None,
+        )
+    parser.add_argument(
+        '--host',
+        help='host name of HTTP server',
+        action='store',
+        required=False,
+        default='127.0.0.1',
+        )
+    parser.add_argument(
+        '--port',
+        help='port number of HTTP server',
+        action='store',
+        type=int,
+        required=False,
+        default=8000,
+        )
+    parser.add_argument(
+        '--timeout',
+        help='time budget of each request in seconds',
+        action='store',
+        type=float,
+        required=False,
+        default=None,
+        )
+    parser.add_argument(
+        '--workers',
+        help='number of worker processes of the server. If not given, the number of CPUs is used.',
+        action='store',
+        type=int,
+        required=False,
+        default=None,
+        )
 
     args = parser.parse_args()
+    if args.serve is not None:
+        from .server import run
+        run(
+            args.serve, host=args.host, port=args.port, alignment=args.mode,
+            timeout=args.timeout, max_workers=args.workers,
+            )
+        return
+    if (args.source is None) or (args.target is None):
+        parser.error('source and target are required')
+
     source = args.source
     target = args.target
     padding = args.padding
     mode = args.mode
+    context = args.context
 
     dv = DiffVis(source, target, alignment=mode)
     dv.build()
-    print(dv.visualize(mode='console', padding=padding))
+    print(dv.visualize(mode=args.output, padding=padding, context=context, columns=args.columns))
+
+
+def make_template(sequences, alignment='Levenshtein', return_str=False, blank='<blank>'):
+    """Make one template from many sequences
+    by folding them one by one into the template.
+
+    Args:
+        sequences (list): Sequences.
+        alignment (str): Sequence alignment model name.
+            Defaults to Levenshtein.
+        return_str (bool): Determines whether to return str or list.
+            Defaults to False.
+        blank (str): String for blank. Defaluts to '<blank>'.
+
+    Returns:
+        template (list[str]): Sequence that has common parts of all the sequences,
+            and has blank in non-common parts.
+    """
+    template = None
+    vocabulary = Vocabulary()
+    for sequence in sequences:
+        if template is None:
+            template = list(sequence)
+            continue
+        dv = DiffVis(template, sequence, alignment=alignment, vocabulary=vocabulary)
+        dv.build()
+        template = dv.make_template(blank=blank)
+
+    if template is None:
+        template = []
+    if return_str:
+        template = ''.join(template)
+    return template
 
 
 class DiffVis(object):
@@ -65,42 +184,205 @@ class DiffVis(object):
         source (iterable): Source sequence.
         target (iterable): Target sequence.
         alignment (str): Sequence alignment model name.
-            Levenshtein or LCS can be chosen now.
+            Levenshtein, Damerau, LCS, Hirschberg, Myers,
+            LineLevenshtein, LineLCS, SemiGlobal, Anchored, or AnchoredLCS can be chosen now.
+            Damerau treats swap of adjacent elements as one edit ('transpose').
+            Hirschberg aligns in linear space without cost table.
+            Myers is fast for similar sequences.
+            LineLevenshtein and LineLCS align lines first,
+            and then characters only in replaced lines (for large texts).
             Defaults to Levenshtein.
+        vocabulary (Vocabulary): Vocabulary to intern tokens.
+            Sharing one among many instances avoids re-interning the same tokens.
+            If None, new one is made when needed.
+            Defaults to None.
+        cost_model (CostModel): Costs of edit operations.
+            Only Levenshtein and Hirschberg accept it.
+            If the costs are weighted, tokens are encoded by
+            the cost model instead.
+            Defaults to None.
+        cache (cache.AlignmentCache): Cache of edit histories.
+            If given, build() looks up the result before aligning,
+            and stores it after aligning.
+            Hierarchical models do not use it,
+            because their blocks of replaced lines are not cached.
+            Defaults to None.
 
     Attributes:
         source (iterable): Source sequence.
         target (iterable): Target sequence.
+        vocabulary (Vocabulary): Vocabulary to intern tokens.
+        cost_model (CostModel): Costs of edit operations.
         cost_table (tuple[tuple[int]]): Cost table.
-        edit_history (tuple): History of edition.
+            None if the alignment model does not materialize it.
+        edit_history (EditScript): History of edition.
     """
     COLOR_SETTINGS = {
         'base': 'green',
         'source': 'red',
         'target': 'blue',
+        'transpose': 'purple',
+        'block': 'yellow',
+        'collapse': 'cyan',
         }
-    def __init__(self, source, target, alignment='Levenshtein'):
+    def __init__(
+            self, source, target, alignment='Levenshtein',
+            vocabulary=None, cost_model=None, cache=None,
+            ):
         self.source = source
         self.target = target
-        self.cost_table = None
+        self.vocabulary = vocabulary
+        self.cost_model = cost_model
+        self.cache = cache
         self.edit_history = None
+        self._model = None
         self.template = None
 
-        if alignment in ['Levenshtein', 'EditDistance']:
-            self.Model = Levenshtein
-        elif alignment in ['LongestCommonSubsequence', 'LCS']:
-            self.Model = LongestCommonSubsequence
-        else:
-            raise ValueError(f'Unknown alignment mode: {alignment}')
+        self.Model = get_model(alignment)
+        if (cost_model is not None) and (self.Model not in [Levenshtein, Hirschberg]):
+            raise ValueError(f'Cost model cannot be used with alignment mode: {alignment}')
 
-    def build(self):
-        """Builds cost table and edit history."""
-        model = self.Model(self.source, self.target)
-        model.build()
-        self.cost_table = model.cost_table
+    def build(self, max_distance=None, keep_cost_table=False):
+        """Builds edit history.
+
+        Args:
+            max_distance (int): Upper bound of distance.
+                If the distance exceeds it, alignment is skipped
+                and cost_table and edit_history are left None.
+                Defaults to None.
+            keep_cost_table (bool): Determines whether to keep the cost table
+                built by the alignment model.
+                If False, it is rebuilt when cost_table is accessed,
+                and format_cost_table recalculates it row by row.
+                Defaults to False.
+        """
+        source, target = self.encode()
+        if self._build_from_cache(source, target, max_distance):
+            return
+        model = _build_model(
+            self.Model, source, target, self._model_options(), max_distance, keep_cost_table,
+            )
+        self._set_model(model)
+
+    async def abuild(self, max_distance=None, keep_cost_table=False, timeout=None, executor=None):
+        """Builds edit history without blocking the event loop.
+        Alignment runs in the executor, and the result is sent back.
+        If the task is cancelled or timed out,
+        the alignment is cancelled unless it has already started in the executor,
+        and edit_history is left as it was.
+
+        Args:
+            max_distance (int): Upper bound of distance. See build.
+                Defaults to None.
+            keep_cost_table (bool): Determines whether to keep the cost table. See build.
+                Defaults to False.
+            timeout (float): Time budget in seconds.
+                If None, waits until the alignment finishes.
+                Defaults to None.
+            executor (concurrent.futures.Executor): Executor of alignment.
+                If None, the shared process pool of get_executor is used.
+                Defaults to None.
+
+        Raises:
+            asyncio.TimeoutError: If the alignment does not finish within timeout.
+        """
+        source, target = self.encode()
+        if self._build_from_cache(source, target, max_distance):
+            return
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            executor or get_executor(), _build_model_detached,
+            self.Model, source, target, self._model_options(), max_distance, keep_cost_table,
+            )
+        model = await asyncio.wait_for(future, timeout)
+        if model is not None:
+            model.source = source
+            model.target = target
+        self._set_model(model)
+
+    def _build_from_cache(self, source, target, max_distance):
+        # returns whether the result is found in the cache
+        if not self._use_cache():
+            return False
+        edit_history = self.cache.get(self._cache_key())
+        if edit_history is None:
+            return False
+        model = self.Model(source, target, **self._model_options())
+        model.edit_history = edit_history
+        self.edit_history = edit_history
+        self._model = model
+        if (max_distance is not None) and (self.distance() > max_distance):
+            self.edit_history = None
+            self._model = None
+        return True
+
+    def _set_model(self, model):
+        if model is None:
+            self.edit_history = None
+            self._model = None
+            return
         self.edit_history = model.edit_history
+        self._model = model
+        if self._use_cache():
+            self.cache.set(self._cache_key(), model.edit_history)
+
+    def _use_cache(self):
+        # blocks of hierarchical models are not in edit history,
+        # so they are rebuilt rather than restored without the blocks
+        return (self.cache is not None) and not issubclass(self.Model, Hierarchical)
+
+    def _cache_key(self):
+        return make_key(self.source, self.target, self.Model.__name__, self.cost_model)
+
+    def encode(self):
+        """Interns tokens of source and target to integer ids before alignment.
+        Strings are returned as they are,
+        because characters are compared as fast as ids.
+        Edit history is made from the ids,
+        but the positions are the same as source and target ones,
+        so the original tokens are rendered.
 
-    def distance(self, normalize=False):
+        Returns:
+            source (iterable): Encoded source sequence.
+            target (iterable): Encoded target sequence.
+        """
+        if isinstance(self.source, str) and isinstance(self.target, str):
+            return self.source, self.target
+        if is_weighted(self.cost_model):
+            # encoded by the cost model
+            return self.source, self.target
+        if issubclass(self.Model, Hierarchical):
+            # lines are interned by the model
+            return self.source, self.target
+        if self.vocabulary is None:
+            self.vocabulary = Vocabulary()
+        source = self.vocabulary.encode(self.source)
+        target = self.vocabulary.encode(self.target)
+        return source, target
+
+    def _model_options(self):
+        if self.cost_model is None:
+            return {}
+        return {'cost_model': self.cost_model}
+
+    @property
+    def cost_table(self):
+        """Cost table of the alignment model.
+        It may be built at the first access."""
+        if self._model is None:
+            return None
+        return self._model.cost_table
+
+    @property
+    def span(self):
+        """Start and end positions of target matched by source.
+        Only for semi-global models, otherwise None."""
+        if (self.edit_history is None) or not issubclass(self.Model, SemiGlobal):
+            return None
+        start, end, _ = SemiGlobal.find_span(self.edit_history)
+        return start, end
+
+    def distance(self, normalize=False, max_distance=None):
         """Measures Lebenshtein distance between source and target.
 
         Args:
@@ -108,15 +390,23 @@ class DiffVis(object):
             Determines whether to normalize Levenshtein distance,
             deviding by longer length of the input two sequences.
             Defaults to False.
+            max_distance (int): Upper bound of distance.
+            If distance exceeds it, max_distance + 1 is returned.
+            Defaults to None.
 
         Returns:
             dist (float): Levenshtein distance.
         """
+        if self.edit_history is None:
+            source, target = self.encode()
+        else:
+            source, target = self.source, self.target
         dist = self.Model.measure(
-            self.source, self.target,
-            cost_table=self.cost_table,
+            source, target,
             edit_history=self.edit_history,
             normalize=normalize,
+            max_distance=max_distance,
+            **self._model_options(),
             )
         return dist
 
@@ -127,7 +417,7 @@ class DiffVis(object):
         Returns:
             dist (float): Edit distance.
         """
-        dist = len([operation for operation in self.edit_history if operation != 'match'])
+        dist = len(self.edit_history) - self.edit_history.count('match')
         return dist
 
     def make_template(self, return_str=False, blank='<blank>'):
@@ -153,13 +443,38 @@ class DiffVis(object):
             template = ''.join(template)
         return template
 
-    def format_cost_table(self):
-        return format_cost_table(self.source, self.target, self.cost_table)
+    def format_cost_table(self, rows=None, columns=None):
+        """Formats cost table of the alignment model.
+        If the cost table is not kept, only the rows up to the window are recalculated
+        keeping a few rows at once.
+
+        Args:
+            rows (slice): Rows to format (0 to len(source)).
+                Defaults to None (all the rows).
+            columns (slice): Columns to format (0 to len(target)).
+                Defaults to None (all the columns).
+
+        Returns:
+            result (str): Formatted cost table.
+
+        Raises:
+            ValueError: If not built yet, or the alignment model has no cost table
+                (e.g. Myers, Hirschberg, and hierarchical models).
+        """
+        if self._model is None:
+            raise ValueError('Cost table is not built. Call build() first.')
+        if hasattr(self._model, 'iter_cost_table'):
+            cost_table = self._model.iter_cost_table()
+        else:
+            cost_table = self.cost_table
+        if cost_table is None:
+            raise ValueError(f'Cost table is not available with alignment mode: {self.Model.__name__}')
+        return format_cost_table(self.source, self.target, cost_table, rows=rows, columns=columns)
 
     def format_edit_history(self):
         return format_edit_history(self.edit_history)
 
-    def visualize(self, mode='Console', padding=True):
+    def visualize(self, mode='Console', padding=True, file=None, chunk_size=None, context=None, columns=None):
         """Visualize the difference between source and target.
         This method only inputs formatter to generate_comparison method depending on the mode.
         So you can use generate_comparison method with your original formatter.
@@ -167,33 +482,58 @@ class DiffVis(object):
             * Console: to be shown in console
             * HTML: HTML format
             * HTMLTab: HTML format (table)
+            * CompactHTML: HTML format with CSS classes and coalesced colors
+            * CompactHTMLTab: HTML format (table) with CSS classes
 
         Notes:
             * Console output is not for Windows.
 
         Args:
             mode (str): Output mode.
-                Must be hosen from 'Console', 'HTML', or HTMLTab'.
+                Must be hosen from 'Console', 'HTML', 'HTMLTab',
+                'CompactHTML', or 'CompactHTMLTab'.
                 Defaults to 'Console'
             padding (bool): Determines whether to pad or not.
                 Defaults to True.
+            file (file-like object): If given, output is written to it
+                instead of being returned.
+                Defaults to None.
+            chunk_size (int): Number of operations in a block.
+                If given, the comparison is split into blocks of this size,
+                each of which has source and target rows.
+                Used only if file is given.
+                Defaults to None.
+            context (int): Number of matches shown before and after changes.
+                If given, only the changed hunks are shown
+                and the other matches are collapsed into markers.
+                Defaults to None.
+            columns (int): Number of cells in a row of CompactHTMLTab table.
+                If given, the table is paginated into blocks of rows of this width.
+                Defaults to None.
 
         Returns:
-            output (str): Output.
+            output (str): Output. None if file is given.
         """
-        mode = mode.lower()
-        if mode in ['console']:
-            formatter = ConsoleFormatter()
-        elif mode in ['html']:
-            formatter = HTMLFormatter()
-        elif mode in ['htmltab']:
-            formatter = HTMLTabFormatter()
-        else:
-            raise ValueError(f'Unknown mode: {mode}')
-        output = self.generate_comparison(formatter, padding=padding)
-        return output
+        formatter = get_formatter(mode, columns=columns)
 
-    def generate_comparison(self, formatter, padding=True):
+        if file is None:
+            output = self.generate_comparison(formatter, padding=padding, context=context)
+            return output
+
+        if chunk_size is None:
+            file.write(self.generate_comparison(formatter, padding=padding, context=context))
+            return
+
+        chunks = self.iter_comparison(
+            formatter, padding=padding, chunk_size=chunk_size, context=context,
+            )
+        file.write(formatter.header())
+        for k, (result_source, result_target) in enumerate(chunks):
+            if k > 0:
+                file.write(formatter.separate())
+            file.write(formatter.concatenate(result_source, result_target))
+
+    def generate_comparison(self, formatter, padding=True, context=None):
         """Visualize the difference between source and target,
         formatting by formatter.
 
@@ -201,54 +541,431 @@ class DiffVis(object):
             formatter (formatter.Formatter): Formatter.
             padding (bool): Determines whether to pad or not.
                 Defaults to True.
+            context (int): Number of matches shown before and after changes.
+                If given, the other matches are collapsed.
+                Defaults to None.
 
         Returns:
             output (str): Output.
         """
+        results_source = []
+        results_target = []
+        chunks = self.iter_comparison(formatter, padding=padding, context=context)
+        for result_source, result_target in chunks:
+            results_source.append(result_source)
+            results_target.append(result_target)
+        output = formatter.header() + formatter.concatenate(''.join(results_source), ''.join(results_target))
+        return output
+
+    def iter_comparison(self, formatter, padding=True, chunk_size=1000, context=None):
+        """Generates formatted source and target rows chunk by chunk.
+        If context is given, matches far from changes are not formatted
+        but replaced with a marker for each skipped run.
+
+        Args:
+            formatter (formatter.Formatter): Formatter.
+            padding (bool): Determines whether to pad or not.
+                Defaults to True.
+            chunk_size (int): Number of operations in a chunk.
+                Defaults to 1000.
+            context (int): Number of matches shown before and after changes.
+                Defaults to None.
+
+        Yields:
+            result_source (str): Formatted source of the chunk.
+            result_target (str): Formatted target of the chunk.
+        """
         source = self.source
         target = self.target
         color_base = DiffVis.COLOR_SETTINGS['base']
         color_source = DiffVis.COLOR_SETTINGS['source']
         color_target = DiffVis.COLOR_SETTINGS['target']
-
-        def _form(text, color, length):
-            text = formatter.escape(text)
-            if padding:
-                text = formatter.pad(text, length)
-            text = formatter.colorize(text, color)
+        color_transpose = DiffVis.COLOR_SETTINGS['transpose']
+        color_block = DiffVis.COLOR_SETTINGS['block']
+        color_collapse = DiffVis.COLOR_SETTINGS['collapse']
+
+        # elements wait here as (color, element, length) if changed,
+        # or runs of matched elements as (color, elements, None),
+        # so that consecutive ones of the same color are rendered at once
+        # if the formatter merges them
+        pending_source = []
+        pending_target = []
+
+        def _render_pending():
+            # the same runs in both rows (e.g. a match run alone) are rendered once
+            rendered = {}
+            for pending, results in [(pending_source, results_source), (pending_target, results_target)]:
+                if not formatter.MERGE_RUNS:
+                    for run in pending:
+                        color, elements, length = run
+                        if length is not None:
+                            results.append(formatter.render(elements, color, length if padding else None))
+                            continue
+                        if id(run) not in rendered:
+                            rendered[id(run)] = formatter.render_run(elements, color, padding=padding)
+                        results.append(rendered[id(run)])
+                    continue
+
+                for color, runs in itertools.groupby(pending, key=operator.itemgetter(0)):
+                    runs = list(runs)
+                    key = tuple(map(id, runs))
+                    if key not in rendered:
+                        elements = []
+                        lengths = []
+                        for _, elements_run, length in runs:
+                            if length is None:
+                                elements.extend(elements_run)
+                                lengths.extend(map(len, elements_run))
+                            else:
+                                elements.append(elements_run)
+                                lengths.append(length)
+                        rendered[key] = formatter.render_run(elements, color, padding=padding, lengths=lengths)
+                    results.append(rendered[key])
+            pending_source.clear()
+            pending_target.clear()
+
+        def _form_marker(n_skipped):
+            # marker is the same in both rows, so it is not padded
+            text = formatter.escape(formatter.collapse(n_skipped))
+            text = formatter.colorize(text, color_collapse)
             text = formatter.form(text)
             return text
 
-        i = 0
-        j = 0
-        result_source = ''
-        result_target = ''
-        for operation in self.edit_history:
-            if operation == 'match':
-                length = max(len(source[i]), len(target[j]))
-                result_source += _form(source[i], color_base, length)
-                result_target += _form(target[j], color_base, length)
-                i += 1
-                j += 1
-            elif operation == 'replace':
-                length = max(len(source[i]), len(target[j]))
-                result_source += _form(source[i], color_source, length)
-                result_target += _form(target[j], color_target, length)
-                i += 1
-                j += 1
-            elif operation == 'delete':
-                length = len(source[i])
-                result_source += _form(source[i], color_source, length)
-                result_target += _form('', color_base, length)
-                i += 1
-            elif operation == 'insert':
-                length = len(target[j])
-                result_source += _form('', color_base, length)
-                result_target += _form(target[j], color_target, length)
-                j += 1
-
-        output = formatter.concatenate(result_source, result_target)
-        return output
+        # only the matched span of target is shown (semi-global models)
+        edit_history = self.edit_history
+        j_start = 0
+        if issubclass(self.Model, SemiGlobal):
+            j_start, _, edit_history = SemiGlobal.find_span(edit_history)
+
+        if context is None:
+            hunks = [(0, j_start, edit_history)]
+        else:
+            hunks = (
+                (i, j_start + j, edit_history_hunk)
+                for i, j, edit_history_hunk in iter_hunks(edit_history, context=context)
+                )
+
+        # matches in blocks of replaced lines are highlighted (hierarchical models)
+        blocks = getattr(self._model, 'blocks', None) or []
+        k_block = 0
+
+        i_end = 0
+        n_elements = 0
+        results_source = []
+        results_target = []
+        for i, j, edit_history in hunks:
+            if i > i_end:
+                _render_pending()
+                marker = _form_marker(i - i_end)
+                results_source.append(marker)
+                results_target.append(marker)
+            for operation, length_run in iter_runs(edit_history):
+                if operation == 'match':
+                    # matched elements are the same in both rows,
+                    # so added as one run in pieces of the same color within the chunk
+                    i_run_end = i + length_run
+                    while i < i_run_end:
+                        color = color_base
+                        n = min(i_run_end - i, max(chunk_size - n_elements, 1))
+                        if blocks:
+                            while (k_block < len(blocks)) and (blocks[k_block][1] <= i):
+                                k_block += 1
+                            if k_block < len(blocks):
+                                if blocks[k_block][0] <= i:
+                                    color = color_block
+                                    n = min(n, blocks[k_block][1] - i)
+                                else:
+                                    n = min(n, blocks[k_block][0] - i)
+                        run = (color, source[i:i+n], None)
+                        pending_source.append(run)
+                        pending_target.append(run)
+                        i += n
+                        j += n
+                        n_elements += n
+                        if n_elements >= chunk_size:
+                            _render_pending()
+                            yield ''.join(results_source), ''.join(results_target)
+                            results_source = []
+                            results_target = []
+                            n_elements = 0
+                    continue
+
+                for _ in range(length_run):
+                    if operation == 'replace':
+                        length = max(len(source[i]), len(target[j]))
+                        pending_source.append((color_source, source[i], length))
+                        pending_target.append((color_target, target[j], length))
+                        i += 1
+                        j += 1
+                    elif operation == 'delete':
+                        length = len(source[i])
+                        pending_source.append((color_source, source[i], length))
+                        pending_target.append((color_base, '', length))
+                        i += 1
+                    elif operation == 'insert':
+                        length = len(target[j])
+                        pending_source.append((color_base, '', length))
+                        pending_target.append((color_target, target[j], length))
+                        j += 1
+                    elif operation == 'transpose':
+                        for k in range(2):
+                            length = max(len(source[i+k]), len(target[j+k]))
+                            pending_source.append((color_transpose, source[i+k], length))
+                            pending_target.append((color_transpose, target[j+k], length))
+                        i += 2
+                        j += 2
+
+                    n_elements += 1
+                    if n_elements >= chunk_size:
+                        _render_pending()
+                        yield ''.join(results_source), ''.join(results_target)
+                        results_source = []
+                        results_target = []
+                        n_elements = 0
+            i_end = i
+
+        _render_pending()
+        if (context is not None) and (len(source) > i_end):
+            marker = _form_marker(len(source) - i_end)
+            results_source.append(marker)
+            results_target.append(marker)
+
+        if results_source:
+            yield ''.join(results_source), ''.join(results_target)
+
+    @staticmethod
+    def batch(
+            pairs, alignment='Levenshtein', mode='Console', padding=True, context=None,
+            columns=None, n_jobs=None, chunk_size=64, as_completed=False,
+            ):
+        """Aligns and visualizes many pairs of sequences at once.
+        Identical pairs are aligned only once.
+        The unique pairs are split into chunks,
+        which are distributed to worker processes,
+        a few chunks per worker at a time.
+        A formatter is shared by all the pairs in a worker.
+
+        Args:
+            pairs (iterable[tuple]): Pairs of source and target.
+            alignment (str): Sequence alignment model name.
+                Defaults to 'Levenshtein'.
+            mode (str): Output mode. See visualize.
+                Defaults to 'Console'.
+            padding (bool): Determines whether to pad or not.
+                Defaults to True.
+            context (int): Number of matches shown before and after changes.
+                Defaults to None.
+            columns (int): Number of cells in a row of CompactHTMLTab table.
+                Defaults to None.
+            n_jobs (int): Number of worker processes.
+                If is None, the number of CPUs is used.
+                If is 1, pairs are visualized in this process.
+                Defaults to None.
+            chunk_size (int): Number of pairs in a chunk.
+                Defaults to 64.
+            as_completed (bool): Determines whether to return an iterator
+                of outputs in order of completion.
+                Defaults to False.
+
+        Returns:
+            outputs (list[str]): Outputs in order of the pairs.
+                If as_completed is True, iterator of (index, output) instead.
+        """
+        get_model(alignment)  # unknown names raise here, not in the workers
+        settings = {
+            'alignment': alignment,
+            'formatter': get_formatter(mode, columns=columns),
+            'padding': padding,
+            'context': context,
+            }
+        pairs = list(pairs)
+        if n_jobs is None:
+            n_jobs = os.cpu_count() or 1
+
+        # unique pairs and indices of the input pairs of each
+        pair2index = {}
+        indices_unique = []
+        for index, (source, target) in enumerate(pairs):
+            key = tuple(
+                sequence if isinstance(sequence, str) else tuple(sequence)
+                for sequence in [source, target]
+                )
+            if key not in pair2index:
+                pair2index[key] = len(indices_unique)
+                indices_unique.append([])
+            indices_unique[pair2index[key]].append(index)
+        pairs_unique = [pairs[indices[0]] for indices in indices_unique]
+        chunks = [
+            (start, pairs_unique[start:start+chunk_size])
+            for start in range(0, len(pairs_unique), chunk_size)
+            ]
+
+        results = _iter_batch_chunks(chunks, settings, n_jobs)
+        if as_completed:
+            return (
+                (index, output)
+                for start, outputs in results
+                for k, output in enumerate(outputs, start)
+                for index in indices_unique[k]
+                )
+
+        outputs_all = [None] * len(pairs)
+        for start, outputs in results:
+            for k, output in enumerate(outputs, start):
+                for index in indices_unique[k]:
+                    outputs_all[index] = output
+        return outputs_all
+
+
+def _build_model(Model, source, target, options, max_distance=None, keep_cost_table=False):
+    """Builds alignment model.
+    None is returned if the distance exceeds max_distance."""
+    if max_distance is not None:
+        distance = Model.measure(source, target, max_distance=max_distance, **options)
+        if distance > max_distance:
+            return None
+
+    model = Model(source, target, **options)
+    if Model in [Levenshtein, Damerau, LongestCommonSubsequence]:
+        model.build(keep_cost_table=keep_cost_table)
+    else:
+        model.build()
+    return model
+
+
+def _build_model_detached(Model, source, target, options, max_distance, keep_cost_table):
+    # sequences are not sent back from the worker
+    model = _build_model(Model, source, target, options, max_distance, keep_cost_table)
+    if model is not None:
+        model.source = None
+        model.target = None
+    return model
+
+
+_executor = None
+
+
+def get_executor(max_workers=None):
+    """Gets the process pool shared by the asynchronous API.
+    It is created at the first call,
+    and the number of worker processes is fixed then.
+
+    Args:
+        max_workers (int): Number of worker processes.
+            If None, the number of CPUs is used.
+            Defaults to None.
+
+    Returns:
+        executor (concurrent.futures.ProcessPoolExecutor): Process pool.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+    return _executor
+
+
+def shutdown_executor(cancel_futures=False):
+    """Shuts down the process pool shared by the asynchronous API.
+    The next call of get_executor creates a new one,
+    e.g. after a worker process died and the pool is broken.
+
+    Args:
+        cancel_futures (bool): Determines whether to cancel the tasks not started.
+            Defaults to False.
+    """
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(cancel_futures=cancel_futures)
+
+
+async def diff_and_render(
+        source, target, alignment='Levenshtein', mode='Console', padding=True, context=None,
+        columns=None, timeout=None, executor=None,
+        ):
+    """Aligns and visualizes two sequences without blocking the event loop.
+    Both alignment and formatting run in the executor.
+
+    Args:
+        source (iterable): Source sequence.
+        target (iterable): Target sequence.
+        alignment (str): Sequence alignment model name.
+            Defaults to 'Levenshtein'.
+        mode (str): Output mode. See DiffVis.visualize.
+            Defaults to 'Console'.
+        padding (bool): Determines whether to pad or not.
+            Defaults to True.
+        context (int): Number of matches shown before and after changes.
+            Defaults to None.
+        columns (int): Number of cells in a row of CompactHTMLTab table.
+            Defaults to None.
+        timeout (float): Time budget in seconds.
+            If None, waits until it finishes.
+            Defaults to None.
+        executor (concurrent.futures.Executor): Executor.
+            If None, the shared process pool of get_executor is used.
+            Defaults to None.
+
+    Returns:
+        output (str): Output.
+
+    Raises:
+        asyncio.TimeoutError: If it does not finish within timeout.
+    """
+    get_model(alignment)  # check the names before sending to the executor
+    get_formatter(mode, columns=columns)
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        executor or get_executor(), _diff_and_render,
+        source, target, alignment, mode, padding, context, columns,
+        )
+    return await asyncio.wait_for(future, timeout)
+
+
+def _diff_and_render(source, target, alignment, mode, padding, context, columns):
+    dv = DiffVis(source, target, alignment=alignment)
+    dv.build()
+    return dv.visualize(mode=mode, padding=padding, context=context, columns=columns)
+
+
+def _visualize_batch_chunk(chunk):
+    settings = get_worker_settings('batch')
+    start, pairs = chunk
+    outputs = []
+    for source, target in pairs:
+        dv = DiffVis(source, target, alignment=settings['alignment'])
+        dv.build()
+        outputs.append(dv.generate_comparison(
+            settings['formatter'],
+            padding=settings['padding'],
+            context=settings['context'],
+            ))
+    return start, outputs
+
+
+def _iter_batch_chunks(chunks, settings, n_jobs):
+    """Generates visualized chunks in order of completion,
+    keeping at most two chunks per worker submitted."""
+    executor = make_worker_pool('batch', settings, n_jobs)
+    if executor is None:
+        yield from map(_visualize_batch_chunk, chunks)
+        return
+
+    try:
+        chunks = iter(chunks)
+        futures = set()
+        while True:
+            for chunk in chunks:
+                futures.add(executor.submit(_visualize_batch_chunk, chunk))
+                if len(futures) >= 2 * n_jobs:
+                    break
+            if not futures:
+                break
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
 
 
 if __name__ == '__main__':
@@ -7,11 +7,47 @@ Formats outputs of DiffVis.
 """
 
 
+import re
 import html
 import unicodedata
 
 
-def _get_char_width(char):
+def get_formatter(mode, columns=None):
+    """Gets formatter of the output mode.
+
+    Args:
+        mode (str): Output mode. Console, HTML, HTMLTab,
+            CompactHTML, or CompactHTMLTab (case-insensitive).
+        columns (int): Number of cells in a row of CompactHTMLTab table.
+            If given, the table is paginated into blocks of rows of this width.
+            Defaults to None.
+
+    Returns:
+        formatter (Formatter): Formatter.
+
+    Raises:
+        ValueError: If the mode is unknown,
+            or columns is given with the other modes.
+    """
+    if (columns is not None) and (mode.lower() != 'compacthtmltab'):
+        raise ValueError(f'columns cannot be used with output mode: {mode}')
+    mode = mode.lower()
+    if mode in ['console']:
+        formatter = ConsoleFormatter()
+    elif mode in ['html']:
+        formatter = HTMLFormatter()
+    elif mode in ['htmltab']:
+        formatter = HTMLTabFormatter()
+    elif mode in ['compacthtml']:
+        formatter = CompactHTMLFormatter()
+    elif mode in ['compacthtmltab']:
+        formatter = CompactHTMLTabFormatter(columns=columns)
+    else:
+        raise ValueError(f'Unknown mode: {mode}')
+    return formatter
+
+
+def _measure_char_width(char):
     char_type = unicodedata.east_asian_width(char)
     if char_type in ['W', 'F']:
         return 2
@@ -19,6 +55,24 @@ def _get_char_width(char):
         return 1
 
 
+# widths of characters, precomputed for common code-point ranges
+# (Latin, CJK symbols and kana, CJK ideographs, and fullwidth forms)
+# and added for the others at the first use
+_CHAR_WIDTHS = {
+    chr(code_point): _measure_char_width(chr(code_point))
+    for start, end in [(0x0020, 0x0250), (0x3000, 0x3100), (0x4E00, 0xA000), (0xFF00, 0xFFF0)]
+    for code_point in range(start, end)
+    }
+
+
+def _get_char_width(char):
+    width = _CHAR_WIDTHS.get(char)
+    if width is None:
+        width = _measure_char_width(char)
+        _CHAR_WIDTHS[char] = width
+    return width
+
+
 def _pad_zenkaku_letter(letter):
     if letter in ['', ' ']:
         # zenkaku space
@@ -52,6 +106,74 @@ def _pad_sequence(text, length=0):
 
 
 class Formatter(object):
+    """Base of formatters.
+    Rendered fragments of elements are cached by (element, color, padded length),
+    because the same elements appear again and again.
+
+    Attributes:
+        MAX_FRAGMENTS (int): Maximum number of cached fragments.
+            The cache is cleared when it is full.
+        MERGE_RUNS (bool): Determines whether render_run merges elements into one piece.
+            If True, consecutive runs of the same color are given to render_run at once.
+            If False, each run is given separately,
+            so a run common to source and target is rendered only once.
+    """
+    MAX_FRAGMENTS = 65536
+    MERGE_RUNS = False
+
+    def render(self, text, color, length=None):
+        """Escape, pad, colorize, and arange element.
+
+        Args:
+            text (str): Element.
+            color (str): Color.
+                If None, the element is only escaped and padded.
+            length (int): Length to pad to.
+                If None, the element is not padded.
+                Defaults to None.
+
+        Returns:
+            fragment (str): Rendered element.
+        """
+        # created here, so that subclasses need not call __init__ of this class
+        fragments = self.__dict__.setdefault('_fragments', {})
+        key = (text, color, length)
+        fragment = fragments.get(key)
+        if fragment is None:
+            fragment = self.escape(text)
+            if length is not None:
+                fragment = self.pad(fragment, length)
+            if color is not None:
+                fragment = self.colorize(fragment, color)
+                fragment = self.form(fragment)
+            if len(fragments) >= self.MAX_FRAGMENTS:
+                fragments.clear()
+            fragments[key] = fragment
+        return fragment
+
+    def render_run(self, elements, color, padding=True, lengths=None):
+        """Render run of elements in the same color at once.
+
+        Args:
+            elements (iterable): Elements.
+            color (str): Color.
+                If None, the elements are only escaped and padded.
+            padding (bool): Determines whether to pad each element.
+                Defaults to True.
+            lengths (iterable[int]): Lengths to pad the elements to.
+                If None, each element is padded to its own length.
+                Defaults to None.
+
+        Returns:
+            fragment (str): Rendered elements.
+        """
+        render = self.render
+        if not padding:
+            return ''.join([render(text, color) for text in elements])
+        if lengths is None:
+            return ''.join([render(text, color, len(text)) for text in elements])
+        return ''.join([render(text, color, length) for text, length in zip(elements, lengths)])
+
     def escape(self, text):
         """Escape special sequence."""
         return text
@@ -75,6 +197,18 @@ class Formatter(object):
         """Concatenate outputs for comparison."""
         return '\n'.join([text1, text2])
 
+    def separate(self):
+        """Separator between blocks of comparison."""
+        return '\n\n'
+
+    def collapse(self, n_skipped):
+        """Marker of skipped matches."""
+        return f'[...{n_skipped}...]'
+
+    def header(self):
+        """Header written once before the whole output."""
+        return ''
+
 
 class HTMLFormatter(Formatter):
     COLOR_CODE = [
@@ -102,6 +236,9 @@ class HTMLFormatter(Formatter):
         text = f'{text1}<br>{text2}'
         return text
 
+    def separate(self):
+        return '<br><br>'
+
 
 class HTMLTabFormatter(Formatter):
     COLOR_CODE = [
@@ -139,6 +276,119 @@ class HTMLTabFormatter(Formatter):
         text = f'<table style="table-layout: fixed;">{text}</table>'
         return text
 
+    def separate(self):
+        return ''
+
+
+# cells made by compact HTML table formatter
+_CELL_PATTERN = re.compile(r'<td[^>]*>[^<]*</td>')
+
+
+class CompactHTMLFormatter(HTMLFormatter):
+    """HTML formatter with small output.
+    Colors are CSS classes defined once in a <style> block,
+    and consecutive elements of the same color are coalesced into one span.
+    The <style> block is given by header,
+    so write it before the outputs of concatenate.
+    """
+    CLASS_NAMES = {
+        'black': 'dk',
+        'green': 'dg',
+        'red': 'dr',
+        'yellow': 'dy',
+        'blue': 'db',
+        'purple': 'dp',
+        'cyan': 'dc',
+        'white': 'dw',
+        }
+    MERGE_RUNS = True
+
+    def colorize(self, text, color):
+        color_code = color.lower()
+        if color_code not in CompactHTMLFormatter.CLASS_NAMES:
+            raise ValueError(f'Invalid Color: {color}')
+        # escaped here, after padding
+        text = html.escape(text)
+        text = f'<span class="{CompactHTMLFormatter.CLASS_NAMES[color_code]}">{text}</span>'
+        return text
+
+    def render_run(self, elements, color, padding=True, lengths=None):
+        # colorized at once, so that the run is in one span
+        text = super().render_run(elements, None, padding=padding, lengths=lengths)
+        return self.form(self.colorize(text, color))
+
+    def header(self):
+        return f'<style>{self.styles()}</style>'
+
+    def styles(self):
+        """CSS of the classes."""
+        styles = ''.join(
+            f'.{class_name}{{color:{color_code}}}'
+            for color_code, class_name in CompactHTMLFormatter.CLASS_NAMES.items()
+            )
+        return styles
+
+
+class CompactHTMLTabFormatter(CompactHTMLFormatter):
+    """HTML table formatter with small output.
+    Colors are CSS classes of the cells defined once in a <style> block.
+
+    Args:
+        columns (int): Number of cells in a row.
+            If given, the table is paginated into blocks of rows of this width.
+            Defaults to None.
+    """
+    # each element is a cell
+    MERGE_RUNS = False
+    render_run = Formatter.render_run
+
+    def __init__(self, columns=None):
+        if (columns is not None) and (columns < 1):
+            raise ValueError('columns must be a positive integer.')
+        self.columns = columns
+
+    def pad(self, text, length=0):
+        return text
+
+    def colorize(self, text, color):
+        color_code = color.lower()
+        if color_code not in CompactHTMLFormatter.CLASS_NAMES:
+            raise ValueError(f'Invalid Color: {color}')
+        text = f'<td class="{CompactHTMLFormatter.CLASS_NAMES[color_code]}">{html.escape(text)}</td>'
+        return text
+
+    def form(self, text):
+        return text
+
+    def output(self, text):
+        text = f'<table class="dv"><tr>{text}</tr></table>'
+        return text
+
+    def concatenate(self, text1, text2):
+        if self.columns is None:
+            text = f'<tr>{text1}</tr><tr>{text2}</tr>'
+        else:
+            cells1 = _CELL_PATTERN.findall(text1)
+            cells2 = _CELL_PATTERN.findall(text2)
+            text = ''.join(
+                '<tbody><tr>{}</tr><tr>{}</tr></tbody>'.format(
+                    ''.join(cells1[k:k+self.columns]),
+                    ''.join(cells2[k:k+self.columns]),
+                    )
+                for k in range(0, len(cells1), self.columns)
+                )
+        text = f'<table class="dv">{text}</table>'
+        return text
+
+    def separate(self):
+        return ''
+
+    def styles(self):
+        styles = super().styles()
+        styles += '.dv{table-layout:fixed}.dv td{text-align:center}'
+        styles += '.dv tbody+tbody tr:first-child td{padding-top:1em}'
+        return styles
+
 
 class ConsoleFormatter(Formatter):
     COLOR_CODE = {
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+
+
+"""server.py
+
+Serves DiffVis locally over HTTP or standard input/output.
+Requests are aligned and visualized in the process pool of the asynchronous API,
+so that many requests are handled at once.
+Start it from diffvis.py, for example:
+
+    python -m DiffVis.diffvis --serve http --port 8000
+
+A request is a JSON object:
+
+    {"source": "kitten", "target": "sitting", "alignment": "Levenshtein",
+     "mode": "HTML", "padding": true, "context": null, "columns": null}
+
+Only source and target are required, and they are strings or lists of strings.
+Over HTTP, it is the body of POST, and the output is the body of the response.
+Over standard input/output, it is a line, and the response is a line of JSON
+with "output" or "error". Responses may be out of order,
+so "id" of the request (if any) is returned as it is.
+"""
+
+
+import sys
+import json
+import signal
+import asyncio
+import threading
+import traceback
+from concurrent.futures.process import BrokenProcessPool
+
+from .string_distance import get_model
+from .formatter import get_formatter
+from .diffvis import diff_and_render, get_executor, shutdown_executor
+
+
+MAX_REQUEST_SIZE = 16 * 1024 * 1024
+
+HTTP_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    504: 'Gateway Timeout',
+    }
+
+
+def parse_request(request, alignment='Levenshtein'):
+    """Checks request and makes arguments of diff_and_render.
+
+    Args:
+        request (dict): Request.
+        alignment (str): Alignment model name used if not requested.
+            Defaults to 'Levenshtein'.
+
+    Returns:
+        arguments (dict): Arguments of diff_and_render.
+
+    Raises:
+        ValueError: If the request is invalid.
+    """
+    if not isinstance(request, dict):
+        raise ValueError('Request must be a JSON object.')
+    arguments = {}
+    for key in ['source', 'target']:
+        sequence = request.get(key)
+        if isinstance(sequence, list) and all(isinstance(elem, str) for elem in sequence):
+            sequence = tuple(sequence)
+        elif not isinstance(sequence, str):
+            raise ValueError(f'{key} must be a string or a list of strings.')
+        arguments[key] = sequence
+    arguments['alignment'] = str(request.get('alignment', alignment))
+    arguments['mode'] = str(request.get('mode', 'Console'))
+    arguments['padding'] = bool(request.get('padding', True))
+    context = request.get('context')
+    if (context is not None) and not (_is_integer(context) and (context >= 0)):
+        raise ValueError('context must be a non-negative integer.')
+    arguments['context'] = context
+    columns = request.get('columns')
+    if (columns is not None) and not (_is_integer(columns) and (columns >= 1)):
+        raise ValueError('columns must be a positive integer.')
+    arguments['columns'] = columns
+    get_model(arguments['alignment'])
+    get_formatter(arguments['mode'], columns=columns)
+    return arguments
+
+
+def _is_integer(value):
+    # true and false of JSON are bool, which is a subclass of int
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+async def _render_request(arguments, timeout, max_workers):
+    """Runs diff_and_render in the shared process pool.
+    If a worker process died, the broken pool is shut down,
+    so that the next request gets a new one.
+    """
+    try:
+        return await diff_and_render(**arguments, timeout=timeout, executor=get_executor(max_workers))
+    except BrokenProcessPool:
+        shutdown_executor()
+        raise
+
+
+async def serve_http(host='127.0.0.1', port=8000, alignment='Levenshtein', timeout=None, max_workers=None):
+    """Serves DiffVis over HTTP until cancelled.
+    Connections are kept alive unless the client closes them.
+
+    Args:
+        host (str): Host name. Defaults to '127.0.0.1'.
+        port (int): Port number. Defaults to 8000.
+        alignment (str): Alignment model name used if not requested.
+            Defaults to 'Levenshtein'.
+        timeout (float): Time budget of each request in seconds.
+            Defaults to None.
+        max_workers (int): Number of worker processes.
+            Defaults to None (the number of CPUs).
+    """
+    get_executor(max_workers)
+
+    async def _respond(writer, status, body, content_type='text/plain; charset=utf-8', close=False):
+        body = body.encode('utf-8')
+        headers = [
+            f'HTTP/1.1 {status} {HTTP_REASONS[status]}',
+            f'Content-Type: {content_type}',
+            f'Content-Length: {len(body)}',
+            f'Connection: {"close" if close else "keep-alive"}',
+            ]
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def _handle(reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    await _respond(writer, 400, 'Invalid request line.', close=True)
+                    break
+                method, _, version = parts
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in [b'\r\n', b'\n', b'']:
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                close = (headers.get('connection', '').lower() == 'close') or (version == 'HTTP/1.0')
+
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_REQUEST_SIZE:
+                    await _respond(writer, 413, 'Request is too large.', close=True)
+                    break
+                body = await reader.readexactly(length)
+                if method != 'POST':
+                    await _respond(writer, 405, 'Use POST.', close=close)
+                else:
+                    try:
+                        arguments = parse_request(json.loads(body), alignment=alignment)
+                        output = await _render_request(arguments, timeout, max_workers)
+                    except ValueError as error:
+                        await _respond(writer, 400, str(error), close=close)
+                    except asyncio.TimeoutError:
+                        await _respond(writer, 504, 'Time budget exceeded.', close=close)
+                    except Exception:
+                        traceback.print_exc()
+                        await _respond(writer, 500, 'Internal error.', close=close)
+                    else:
+                        if arguments['mode'].lower() == 'console':
+                            content_type = 'text/plain; charset=utf-8'
+                        else:
+                            content_type = 'text/html; charset=utf-8'
+                        await _respond(writer, 200, output, content_type, close=close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(_handle, host, port, limit=MAX_REQUEST_SIZE)
+    print(f'Serving on http://{host}:{port}', file=sys.stderr, flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+async def serve_stdio(alignment='Levenshtein', timeout=None, max_workers=None):
+    """Serves DiffVis over standard input/output until the end of input.
+    Each line of input is a request, and each line of output is a response.
+
+    Args:
+        alignment (str): Alignment model name used if not requested.
+            Defaults to 'Levenshtein'.
+        timeout (float): Time budget of each request in seconds.
+            Defaults to None.
+        max_workers (int): Number of worker processes.
+            Defaults to None (the number of CPUs).
+    """
+    get_executor(max_workers)
+    loop = asyncio.get_running_loop()
+
+    async def _handle(line):
+        response = {}
+        try:
+            request = json.loads(line)
+            if isinstance(request, dict) and ('id' in request):
+                response['id'] = request['id']
+            arguments = parse_request(request, alignment=alignment)
+            response['output'] = await _render_request(arguments, timeout, max_workers)
+        except ValueError as error:
+            response['error'] = str(error)
+        except asyncio.TimeoutError:
+            response['error'] = 'Time budget exceeded.'
+        except Exception:
+            traceback.print_exc()
+            response['error'] = 'Internal error.'
+        sys.stdout.write(json.dumps(response, ensure_ascii=False) + '\n')
+        sys.stdout.flush()
+
+    # input is read in a daemon thread, because it may be a file (not a pipe),
+    # and a thread blocked in reading must not keep the server from stopping.
+    # The thread has a file object of its own, because forked worker processes
+    # close sys.stdin, and would wait forever for the lock held by the thread.
+    lines = asyncio.Queue()
+    try:
+        stdin = open(sys.stdin.fileno(), encoding=sys.stdin.encoding, closefd=False)
+    except (AttributeError, ValueError):
+        stdin = sys.stdin
+
+    def _read_lines():
+        try:
+            for line in iter(stdin.readline, ''):
+                loop.call_soon_threadsafe(lines.put_nowait, line)
+            loop.call_soon_threadsafe(lines.put_nowait, '')
+        except RuntimeError:
+            pass  # the event loop is closed
+
+    threading.Thread(target=_read_lines, daemon=True).start()
+
+    tasks = set()
+    while True:
+        line = await lines.get()
+        if not line:
+            break
+        if not line.strip():
+            continue
+        task = asyncio.create_task(_handle(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def run(protocol, host='127.0.0.1', port=8000, alignment='Levenshtein', timeout=None, max_workers=None):
+    """Runs the server until SIGTERM or SIGINT (or the end of input over stdio).
+    The worker processes are shut down before it returns.
+
+    Args:
+        protocol (str): 'http' or 'stdio'.
+        host (str): Host name (HTTP only). Defaults to '127.0.0.1'.
+        port (int): Port number (HTTP only). Defaults to 8000.
+        alignment (str): Alignment model name used if not requested.
+            Defaults to 'Levenshtein'.
+        timeout (float): Time budget of each request in seconds.
+            Defaults to None.
+        max_workers (int): Number of worker processes.
+            Defaults to None (the number of CPUs).
+    """
+    if protocol == 'http':
+        server = serve_http(host, port, alignment=alignment, timeout=timeout, max_workers=max_workers)
+    elif protocol == 'stdio':
+        server = serve_stdio(alignment=alignment, timeout=timeout, max_workers=max_workers)
+    else:
+        raise ValueError(f'Unknown protocol: {protocol}')
+    try:
+        asyncio.run(_serve_until_signal(server))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _serve_until_signal(server):
+    # SIGTERM and SIGINT stop the server,
+    # and the worker processes are shut down instead of being left orphaned
+    loop = asyncio.get_running_loop()
+    task = asyncio.current_task()
+    signals = []
+    for signum in [signal.SIGTERM, signal.SIGINT]:
+        try:
+            loop.add_signal_handler(signum, task.cancel)
+        except (NotImplementedError, RuntimeError):
+            # not supported (e.g. Windows, or not in the main thread)
+            continue
+        signals.append(signum)
+    try:
+        await server
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for signum in signals:
+            loop.remove_signal_handler(signum)
+        shutdown_executor(cancel_futures=True)
@@ -8,66 +8,148 @@ And sequence alignment is implemented as a by-product.
 
 Similarity:
     * Edit distance (Levenshtein distance)
+    * Optimal string alignment distance (restricted Damerau-Levenshtein distance)
     * Longest Common Subsequence (LCS)
+    * Shortest edit script (Myers' difference algorithm)
+
+Alignment in linear space:
+    * Hirschberg's algorithm (for Levenshtein distance)
+
+Alignment of large texts:
+    * Lines first, and then characters in replaced lines
+    * Semi-global alignment (the best matching span of long target)
+    * Anchored alignment (only between unique common k-mers)
+
+If NumPy is installed, cost tables are built row by row with NumPy
+into int32 arrays. Set USE_NUMPY to False to use pure Python.
+Rows shorter than NUMPY_MIN_LENGTH are calculated in pure Python,
+because overhead of NumPy for each row exceeds the gain.
+Distances without edit history are calculated by bit-parallel algorithms.
 """
 
 
+import os
 import sys
-import functools
+import array
+import math
+import heapq
+import bisect
+import itertools
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+USE_NUMPY = np is not None
+NUMPY_MIN_LENGTH = 32
 
 
 def main():
     import argparse
     parser = argparse.ArgumentParser(
         prog='string_distance.py',
-        usage='python string_distance.py <source> <target> -n -a',
-        description='Calculates distance between two strings',
+        usage='python string_distance.py {measure,search} ...',
+        description='Calculates distance between two strings, or searches the closest strings',
         epilog='end',
         add_help=True,
         )
-    parser.add_argument(
+    subparsers = parser.add_subparsers(
+        title='commands',
+        dest='command',
+        required=True,
+        )
+
+    parser_measure = subparsers.add_parser(
+        'measure',
+        usage='python string_distance.py measure <source> <target> -n -a',
+        description='Calculates distance between two strings',
+        help='calculate distance between two strings',
+        )
+    parser_measure.add_argument(
         'source',
         help='source string',
         action='store',
         )
-    parser.add_argument(
+    parser_measure.add_argument(
         'target',
         help='target string',
         action='store',
         )
-    parser.add_argument(
+    parser_measure.add_argument(
         '-n', '--normalize',
         help='flag to normalize distance',
         action='store_true',
         required=False,
         )
-    parser.add_argument(
+    parser_measure.add_argument(
         '-a', '--all',
         help='flag to output all the results',
         action='store_true',
         required=False,
         )
-    parser.add_argument(
+    parser_measure.add_argument(
         '-m', '--mode',
-        help='sequence alignment algorythm. Levenshtein or LCS can be used.',
+        help='sequence alignment algorythm. Levenshtein, Damerau, LCS, Hirschberg, Myers, LineLevenshtein, LineLCS, SemiGlobal, Anchored, or AnchoredLCS can be used.',
         action='store',
         required=False,
         default='Levenshtein',
         )
+    parser_measure.set_defaults(func=main_measure)
+
+    parser_search = subparsers.add_parser(
+        'search',
+        usage='python string_distance.py search <query> <corpus> -k 5',
+        description='Finds the closest strings to query in corpus file (one string per line)',
+        help='find the closest strings to query in corpus file',
+        )
+    parser_search.add_argument(
+        'query',
+        help='query string',
+        action='store',
+        )
+    parser_search.add_argument(
+        'corpus',
+        help='path to corpus file. - for stdin',
+        action='store',
+        )
+    parser_search.add_argument(
+        '-k', '--k',
+        help='number of results',
+        action='store',
+        type=int,
+        required=False,
+        default=1,
+        )
+    parser_search.add_argument(
+        '-r', '--raw',
+        help='flag to rank by raw (not normalized) distance',
+        action='store_true',
+        required=False,
+        )
+    parser_search.add_argument(
+        '-e', '--edit-history',
+        help='flag to output edit histories',
+        action='store_true',
+        required=False,
+        )
+    parser_search.set_defaults(func=main_search)
 
     args = parser.parse_args()
+    args.func(args)
+
+
+def main_measure(args):
     source = args.source
     target = args.target
     normalize = args.normalize
     output_all = args.all
     mode = args.mode
 
-    if mode in ['Levenshtein', 'EditDistance']:
-        Model = Levenshtein
-    elif mode in ['LongestCommonSubsequence', 'LCS']:
-        Model = LongestCommonSubsequence
-    else:
-        raise ValueError(f'Unknown mode: {mode}')
+    Model = get_model(mode)
 
     if not output_all:
         distance = Model.measure(source, target, normalize=normalize)
@@ -79,61 +161,320 @@ def main():
         print(f'Distance: {model.distance}')
         print(f'Normalized Distance: {model.normalized_distance:.3f}')
         print()
-        print(format_cost_table(source, target, model.cost_table))
-        print()
+        if model.cost_table is not None:
+            print(format_cost_table(source, target, model.cost_table))
+            print()
         print(format_edit_history(model.edit_history))
     return
 
 
-def format_cost_table(source, target, cost_table):
+def main_search(args):
+    if args.corpus == '-':
+        corpus = [line.rstrip('\n') for line in sys.stdin]
+    else:
+        with open(args.corpus, encoding='utf-8') as f:
+            corpus = [line.rstrip('\n') for line in f]
+
+    results = search_nearest(
+        args.query, corpus,
+        k=args.k,
+        normalize=not args.raw,
+        with_edit_history=args.edit_history,
+        )
+    for result in results:
+        index, distance = result[0], result[1]
+        print(f'{index}\t{distance:.3f}\t{corpus[index]}')
+        if args.edit_history:
+            print('\t' + ' '.join(result[2] or ()))
+
+
+def get_model(alignment):
+    """Gets sequence alignment model from its name.
+
+    Args:
+        alignment (str): Sequence alignment model name.
+
+    Returns:
+        Model (type): Sequence alignment model.
+    """
+    if alignment in ['Levenshtein', 'EditDistance']:
+        Model = Levenshtein
+    elif alignment in ['Damerau', 'DamerauLevenshtein', 'OSA', 'OptimalStringAlignment']:
+        Model = Damerau
+    elif alignment in ['LongestCommonSubsequence', 'LCS']:
+        Model = LongestCommonSubsequence
+    elif alignment in ['Hirschberg']:
+        Model = Hirschberg
+    elif alignment in ['Myers', 'MyersDiff']:
+        Model = Myers
+    elif alignment in ['SemiGlobal', 'Substring']:
+        Model = SemiGlobal
+    elif alignment in ['Hierarchical', 'LineLevenshtein']:
+        Model = Hierarchical
+    elif alignment in ['HierarchicalLCS', 'LineLCS']:
+        Model = HierarchicalLCS
+    elif alignment in ['Anchored', 'AnchoredLevenshtein']:
+        Model = Anchored
+    elif alignment in ['AnchoredLCS', 'Patience']:
+        Model = AnchoredLCS
+    else:
+        raise ValueError(f'Unknown alignment mode: {alignment}')
+    return Model
+
+
+_worker_settings = {}
+
+
+def make_worker_pool(name, settings, n_jobs):
+    """Makes process pool whose workers keep settings shared by all the tasks,
+    so that the settings are sent once per worker, not with every task.
+    Tasks get the settings by get_worker_settings(name).
+
+    Args:
+        name (str): Name of the settings.
+        settings (dict): Settings.
+        n_jobs (int): Number of worker processes.
+            If is 1, the settings are kept in this process
+            to run the tasks here, and no pool is made.
+
+    Returns:
+        executor (concurrent.futures.ProcessPoolExecutor): Process pool.
+            None if n_jobs is 1.
+    """
+    if n_jobs == 1:
+        _set_worker_settings(name, settings)
+        return None
+    executor = ProcessPoolExecutor(
+        max_workers=n_jobs,
+        initializer=_set_worker_settings,
+        initargs=(name, settings),
+        )
+    return executor
+
+
+def _set_worker_settings(name, settings):
+    _worker_settings[name] = settings
+
+
+def get_worker_settings(name):
+    """Gets settings kept by make_worker_pool in this process."""
+    return _worker_settings[name]
+
+
+def pairwise_distances(sequences, alignment='Levenshtein', normalize=False, n_jobs=None):
+    """Measures distances between all the pairs of sequences.
+    Only the upper triangle is calculated, split into chunks of rows
+    which are distributed to worker processes.
+
+    Args:
+        sequences (list): Sequences.
+        alignment (str): Sequence alignment model name.
+            Defaults to Levenshtein.
+        normalize (bool): Determines whether to normalize distances.
+            Defaults to False.
+        n_jobs (int): Number of worker processes.
+            If is None, the number of CPUs is used.
+            If is 1, distances are measured in this process.
+            Defaults to None.
+
+    Returns:
+        distances (numpy.ndarray or array.array):
+            Symmetric (N x N) distance matrix.
+            If NumPy is not installed, flattened to array.array('d') in row-major order.
+    """
+    Model = get_model(alignment)
+    sequences = list(sequences)
+    size = len(sequences)
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+
+    if np is not None:
+        distances = np.zeros((size, size), dtype=np.float64)
+    else:
+        distances = array.array('d', bytes(8 * size * size))
+
+    # rows near the top have more pairs, so chunks are cut by the number of pairs
+    n_chunks = max(1, 4 * n_jobs)
+    n_pairs_chunk = max(1, size * (size-1) // 2 // n_chunks)
+    chunks = []
+    row_start, n_pairs = 0, 0
+    for i in range(size):
+        n_pairs += size - i - 1
+        if (n_pairs >= n_pairs_chunk) or (i == size-1):
+            chunks.append((row_start, i+1))
+            row_start, n_pairs = i+1, 0
+
+    settings = {'sequences': sequences, 'Model': Model, 'normalize': normalize}
+    executor = make_worker_pool('pairwise', settings, n_jobs)
+    if executor is None:
+        results = map(_measure_pairwise_rows, chunks)
+    else:
+        with executor:
+            results = list(executor.map(_measure_pairwise_rows, chunks))
+
+    for (row_start, row_end), rows in zip(chunks, results):
+        for i, row in zip(range(row_start, row_end), rows):
+            if np is not None:
+                distances[i, i+1:] = row
+                distances[i+1:, i] = row
+                continue
+            for j, distance in zip(range(i+1, size), row):
+                distances[i*size+j] = distances[j*size+i] = distance
+    return distances
+
+
+def _measure_pairwise_rows(rows):
+    settings = get_worker_settings('pairwise')
+    sequences = settings['sequences']
+    Model = settings['Model']
+    normalize = settings['normalize']
+    results = []
+    for i in range(*rows):
+        results.append([
+            Model.measure(sequences[i], sequences[j], normalize=normalize)
+            for j in range(i+1, len(sequences))
+            ])
+    return results
+
+
+def search_nearest(query, corpus, k=1, normalize=True, with_edit_history=False):
+    """Finds k sequences closest to query in corpus by Levenshtein distance.
+    Candidates are examined in ascending order of difference of lengths,
+    which is a lower bound of distance.
+    Once k candidates are found, a candidate is skipped if a lower bound
+    by difference of element counts exceeds the k-th best distance so far,
+    and otherwise its distance is measured with the k-th best distance as upper bound.
+    The search stops when the difference of lengths exceeds the k-th best distance.
+
+    Args:
+        query (iterable): Query sequence.
+        corpus (list): Candidate sequences.
+            Elements must be hashable.
+        k (int): Number of results. Defaults to 1.
+        normalize (bool): Determines whether to rank by normalized distance.
+            Defaults to True.
+        with_edit_history (bool): Determines whether to make edit histories of the results.
+            Defaults to False.
+
+    Returns:
+        results (list[tuple]): (index, distance) of the closest sequences,
+            sorted by distance and index.
+            If with_edit_history is True, (index, distance, edit_history).
+    """
+    if k < 1:
+        return []
+
+    len_query = len(query)
+    bounds = []
+    for index, candidate in enumerate(corpus):
+        len_candidate = len(candidate)
+        bound = abs(len_query - len_candidate)
+        if normalize and bound:
+            bound /= max(len_query, len_candidate)
+        bounds.append((bound, index))
+    bounds.sort()
+
+    # max heap of (-distance, -index) for k best candidates
+    best = []
+    count_query = Counter(query)
+    for bound, index in bounds:
+        if (len(best) == k) and (bound > -best[0][0]):
+            break
+        candidate = corpus[index]
+        len_max = max(len_query, len(candidate))
+        max_distance = None
+        if len(best) == k:
+            max_distance = -best[0][0]
+            if normalize:
+                # tolerance for rounding error of the normalized distance (e.g. 13/23*23)
+                max_distance = math.floor(max_distance * len_max + 1e-9)
+            count_candidate = Counter(candidate)
+            excess_query = sum((count_query - count_candidate).values())
+            excess_candidate = sum((count_candidate - count_query).values())
+            if max(excess_query, excess_candidate) > max_distance:
+                continue
+        distance = Levenshtein.measure(query, candidate, max_distance=max_distance)
+        if (max_distance is not None) and (distance > max_distance):
+            continue
+        if normalize and len_max:
+            distance /= len_max
+        if len(best) < k:
+            heapq.heappush(best, (-distance, -index))
+        elif (distance, index) < (-best[0][0], -best[0][1]):
+            heapq.heapreplace(best, (-distance, -index))
+
+    results = sorted((-distance, -index) for distance, index in best)
+    results = [(index, distance) for distance, index in results]
+    if with_edit_history:
+        for r, (index, distance) in enumerate(results):
+            model = Levenshtein(query, corpus[index])
+            model.build()
+            results[r] = (index, distance, model.edit_history)
+    return results
+
+
+def format_cost_table(source, target, cost_table, rows=None, columns=None):
     """Formats cost table.
+    Only a window of the table can be formatted,
+    and the table can be given as rows generated one by one,
+    so that the whole table is not kept for large sequences.
 
     Args:
         source (string): Source string.
         target (string): Target string.
-        cost_table (tuple[tuple[int]]): Padded cost table.
+        cost_table (iterable): Padded cost table, or its rows generated one by one.
+            Rows after the window are not taken.
+        rows (slice): Rows to format (0 to len(source)).
+            Defaults to None (all the rows).
+        columns (slice): Columns to format (0 to len(target)).
+            Defaults to None (all the columns).
 
     Returns:
         result (str): Formatted cost table.
     """
     # error handling
-    __max_len_source_elem = max([len(elem) for elem in source])
-    __max_len_target_elem = max([len(elem) for elem in target])
+    __max_len_source_elem = max([len(elem) for elem in source], default=0)
+    __max_len_target_elem = max([len(elem) for elem in target], default=0)
     if max(__max_len_source_elem, __max_len_target_elem) < 1:
         raise ValueError('Elements of source and target sequences must be 1 or 0.')
 
-    # settings
+    # window
     m, n = len(source), len(target)
-    column_width = max(max([len(str(elem)) for elem in row]) for row in cost_table)
+    row_start, row_stop, _ = (rows or slice(None)).indices(m+1)
+    column_start, column_stop, _ = (columns or slice(None)).indices(n+1)
+    window = []
+    for i, row in enumerate(cost_table):
+        if i >= row_stop:
+            break
+        if i >= row_start:
+            window.append((i, list(row[column_start:column_stop])))
+
+    # settings
+    labels_row = ['' if i == 0 else source[i-1] for i in range(row_start, row_stop)]
+    labels_column = ['' if j == 0 else target[j-1] for j in range(column_start, column_stop)]
+    column_width = max(
+        [len(str(value)) for _, row in window for value in row]
+        + [len(str(label)) for label in labels_row + labels_column],
+        default=1,
+        )
     column_width += 2
     cell_form = '{:>' + str(column_width) + '}'
-    line = '\n' + '-' * ((column_width+1) * (n+2) + 1) + '\n'
+    line = '-' * ((column_width+1) * (column_stop-column_start+1) + 1)
 
     # generate
-    result = 'Cost Table'
+    results = ['Cost Table', line]
 
     # add target string
-    result += line
-    result += '|' + cell_form.format('') + '|'
-    result += cell_form.format('') + '|'
-    for j in range(n):
-        result += cell_form.format(target[j]) + '|'
-    result += line
+    cells = [cell_form.format('')] + [cell_form.format(label) for label in labels_column]
+    results.append('|' + '|'.join(cells) + '|')
+    results.append(line)
 
     # add source string and cost table
-    result += '|' + cell_form.format('') + '|'
-    for j in range(n+1):
-        value = cost_table[0][j]
-        result += cell_form.format(value) + '|'
-    result += line
-
-    for i in range(1, m+1):
-        result += '|' + cell_form.format(source[i-1]) + '|'
-        for j in range(n+1):
-            value = cost_table[i][j]
-            result += cell_form.format(value) + '|'
-        result += line
-    result = result[:-1]  # delete last \n
+    for label, (_, row) in zip(labels_row, window):
+        cells = [cell_form.format(label)] + [cell_form.format(value) for value in row]
+        results.append('|' + '|'.join(cells) + '|')
+        results.append(line)
+    result = '\n'.join(results)
     return result
 
 
@@ -187,31 +528,14 @@ def extract_common_parts(source, target, edit_history, blank='<blank>'):
     Args:
         source (iterable): Source sequence.
         target (iterable): Target sequence.
-        edit_history (tuple): Edit hitory.
+        edit_history (EditScript): Edit hitory.
         blank (str): String representing blank.
 
     Returns:
         common_parts (list): Common parts of the input sequences.
             Uncommon parts are filled with blank.
     """
-    common_parts = []
-    i, j = 0, 0
-    for operation in edit_history:
-        if operation == 'match':
-            common_parts.append(source[i])
-            i += 1
-            j += 1
-        elif operation == 'replace':
-            common_parts.append(blank)
-            i += 1
-            j += 1
-        elif operation == 'delete':
-            common_parts.append(blank)
-            i += 1
-        elif operation == 'insert':
-            common_parts.append(blank)
-            j += 1
-        common_parts = delete_consecutive_duplicates(common_parts, string=blank)
+    common_parts = list(iter_common_parts(source, target, edit_history, blank=blank))
 
     # if has only blank, return empty string
     if common_parts == [blank]:
@@ -219,283 +543,1003 @@ def extract_common_parts(source, target, edit_history, blank='<blank>'):
     return common_parts
 
 
-class Levenshtein(object):
-    """Calculates Levenshtein distance
-    and makes edit history from cost table.
+def iter_common_parts(source, target, edit_history, blank='<blank>'):
+    """Generates common parts between two sequences in one pass of edit history.
+    Consecutive blanks are merged into one
+    (if blank is empty, all the consecutive duplicates are merged
+    as delete_consecutive_duplicates does).
+
+    Args:
+        source (iterable): Source sequence.
+        target (iterable): Target sequence.
+        edit_history (EditScript): Edit hitory.
+        blank (str): String representing blank.
+
+    Yields:
+        elem: Element of common parts or blank.
+    """
+    i = 0
+    has_last = False
+    last = None
+    for operation, length in iter_runs(edit_history):
+        step_source = EditScript.OPERATION2STEP[operation][0]
+        if operation == 'match':
+            elems = source[i:i+length]
+        else:
+            # consecutive blanks are merged into one
+            elems = (blank,)
+        i += step_source * length
+
+        for elem in elems:
+            if has_last and (elem == last) and ((not blank) or (elem == blank)):
+                continue
+            yield elem
+            has_last = True
+            last = elem
+
+
+class EditScript(object):
+    """Edit history stored as runs of the same operation.
+    Each run is a pair of operation code (array('B')) and length (array('I')).
+    It can be used in place of a tuple of operation names:
+    iteration yields the names, and len(), indexing, count(),
+    and comparison with tuples are supported.
+
+    Args:
+        runs (iterable[tuple[str, int]]): Pairs of operation name and run length.
 
     Attributes:
-        EDIT2COST (dict): Mapping from edit operation to its cost.
+        OPERATIONS (tuple[str]): Operation names indexed by operation code.
+        OPERATION2STEP (dict): Mapping from operation name
+            to the numbers of source and target elements it consumes.
+        codes (array.array): Operation code of each run.
+        lengths (array.array): Length of each run.
     """
-    EDIT2COST = {
-        'match': 0,
-        'insert': 1,
-        'delete': 1,
-        'replace': 1,
+    OPERATIONS = ('match', 'replace', 'delete', 'insert', 'transpose')
+    OPERATION2CODE = {operation: code for code, operation in enumerate(OPERATIONS)}
+    OPERATION2STEP = {
+        'match': (1, 1),
+        'replace': (1, 1),
+        'delete': (1, 0),
+        'insert': (0, 1),
+        'transpose': (2, 2),
         }
-    def __init__(self, source, target):
-        self.source = source
-        self.target = target
-        self.cost_table = None
-        self.distance = None
-        self.normalized_distance = None
-        self.edit_history = None
+    __slots__ = ('codes', 'lengths', '_counts', '_length', '_offsets')
+
+    def __init__(self, runs=()):
+        self.codes = array.array('B')
+        self.lengths = array.array('I')
+        self._counts = [0] * len(EditScript.OPERATIONS)
+        self._length = 0
+        self._offsets = None
+        for operation, length in runs:
+            self.append(operation, length)
+
+    @classmethod
+    def from_operations(cls, operations):
+        """Makes edit script from operation names such as tuple of them."""
+        edit_script = cls()
+        for operation, group in itertools.groupby(operations):
+            edit_script.append(operation, sum(1 for _ in group))
+        return edit_script
+
+    def to_tuple(self):
+        """Converts to tuple of operation names."""
+        return tuple(self)
+
+    def to_bytes(self):
+        """Serializes to bytes: number of runs, codes, and lengths (little endian)."""
+        lengths = array.array('I', self.lengths)
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+        return len(self.codes).to_bytes(4, 'little') + self.codes.tobytes() + lengths.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Deserializes from bytes made by to_bytes."""
+        n_runs = int.from_bytes(data[:4], 'little')
+        codes = array.array('B', data[4:4+n_runs])
+        lengths = array.array('I', data[4+n_runs:])
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+        edit_script = cls()
+        operations = EditScript.OPERATIONS
+        for code, length in zip(codes, lengths):
+            edit_script.append(operations[code], length)
+        return edit_script
+
+    def append(self, operation, length=1):
+        """Appends operations, merging them into the last run if possible."""
+        if length <= 0:
+            return
+        code = EditScript.OPERATION2CODE[operation]
+        if self.codes and (self.codes[-1] == code):
+            self.lengths[-1] += length
+        else:
+            self.codes.append(code)
+            self.lengths.append(length)
+        self._counts[code] += length
+        self._length += length
+        self._offsets = None
+
+    def extend(self, edit_history):
+        """Appends edit history (edit script or operation names)."""
+        for operation, length in iter_runs(edit_history):
+            self.append(operation, length)
+
+    def runs(self):
+        """Generates pairs of operation name and run length."""
+        operations = EditScript.OPERATIONS
+        for code, length in zip(self.codes, self.lengths):
+            yield operations[code], length
+
+    def count(self, operation):
+        """Counts the operation without expanding the runs."""
+        code = EditScript.OPERATION2CODE.get(operation)
+        if code is None:
+            return 0
+        return self._counts[code]
 
-    def build(self):
-        self.cost_table = Levenshtein.build_cost_table(self.source, self.target)
-        self.edit_history = Levenshtein.trace_back(self.source, self.target, self.cost_table)
-        self.distance = Levenshtein.measure(
-            self.source, self.target,
-            cost_table=self.cost_table,
-            normalize=False,
-            )
-        self.normalized_distance = Levenshtein.measure(
-            self.source, self.target,
-            cost_table=self.cost_table,
-            normalize=True,
-            )
+    def __iter__(self):
+        operations = EditScript.OPERATIONS
+        for code, length in zip(self.codes, self.lengths):
+            yield from itertools.repeat(operations[code], length)
 
-    @staticmethod
-    def measure(seq1, seq2, cost_table=None, edit_history=None, normalize=False,):
-        """Measures Levenshtein distance between two input sequences.
+    def __len__(self):
+        return self._length
 
-        Args:
-            seq1 (iterable): Source sequence.
-            seq2 (iterable): Target sequence.
-            cost_table (tuple[tuple]): Cost table.
-                If is None, newly built.
-                Defaults to None.
-            edit_history (tuple): History of edition.
-                This is not used for the calculation.
-                Defaults to None.
-            normalize (bool):
-                Determines whether to normalize Levenshtein distance,
-                deviding by longer length of the input two sequences.
-                Defaults to False.
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return EditScript.from_operations(self.to_tuple()[index])
+        if index < 0:
+            index += self._length
+        if not (0 <= index < self._length):
+            raise IndexError('edit script index out of range')
+        if self._offsets is None:
+            self._offsets = list(itertools.accumulate(self.lengths))
+        return EditScript.OPERATIONS[self.codes[bisect.bisect_right(self._offsets, index)]]
 
-        Returns:
-            distance (float): Levenshtein distance.
-        """
-        m, n = len(seq1), len(seq2)
-        len_max = max(m, n)
-        if len_max == 0:
-            return 0
+    def __eq__(self, other):
+        if isinstance(other, EditScript):
+            return (self.codes == other.codes) and (self.lengths == other.lengths)
+        if isinstance(other, (tuple, list)):
+            return (self._length == len(other)) and (self.to_tuple() == tuple(other))
+        return NotImplemented
 
-        if not cost_table:
-            cost_table = Levenshtein.build_cost_table(seq1, seq2)
+    __hash__ = None
 
-        distance = cost_table[m][n]
-        if normalize:
-            distance /= len_max
-        return distance
+    def __getstate__(self):
+        return self.codes, self.lengths, self._counts, self._length
 
-    @staticmethod
-    def init_cost_table(m, n):
-        """Initializes cost table (((m+1) x (n+1)) matrix).
+    def __setstate__(self, state):
+        self.codes, self.lengths, self._counts, self._length = state
+        self._offsets = None
 
-        Args:
-            m (int): Length of source sequence.
-            n (int): Length of target sequence.
+    def __repr__(self):
+        return f'EditScript({list(self.runs())})'
 
-        Returns:
-            cost_table (list[list]): Cost table.
-        """
-        cost_table = [[0] * (n+1) for _ in range(m+1)]
 
-        for i in range(m+1):
-            cost_table[i][0] = i * Levenshtein.EDIT2COST['insert']
+def iter_runs(edit_history):
+    """Generates runs of the same operation from edit history.
 
-        for j in range(n+1):
-            cost_table[0][j] = j * Levenshtein.EDIT2COST['delete']
+    Args:
+        edit_history (EditScript or iterable[str]): Edit history.
 
-        return cost_table
+    Yields:
+        operation (str): Operation name.
+        length (int): Length of the run.
+    """
+    if isinstance(edit_history, EditScript):
+        yield from edit_history.runs()
+        return
+    for operation, group in itertools.groupby(edit_history):
+        yield operation, sum(1 for _ in group)
 
-    @staticmethod
-    def build_cost_table(source, target):
-        """Builds cost table.
+
+def iter_hunks(edit_history, context=3):
+    """Generates hunks, which are changed parts of edit history
+    with at most context matches around them.
+    Matches out of the hunks are skipped without being expanded.
+
+    Args:
+        edit_history (EditScript): Edit history.
+        context (int): Number of matches kept before and after changes.
+            Defaults to 3.
+
+    Yields:
+        i (int): Start position of the hunk in source sequence.
+        j (int): Start position of the hunk in target sequence.
+        hunk (EditScript): Edit history of the hunk.
+    """
+    runs = list(iter_runs(edit_history))
+    i, j = 0, 0
+    hunk = None
+    for k, (operation, length) in enumerate(runs):
+        if operation != 'match':
+            if hunk is None:
+                hunk = EditScript()
+                i_hunk, j_hunk = i, j
+            hunk.append(operation, length)
+            step_source, step_target = EditScript.OPERATION2STEP[operation]
+            i += step_source * length
+            j += step_target * length
+            continue
+
+        head = 0 if hunk is None else context
+        tail = 0 if k == len(runs) - 1 else context
+        if head + tail >= length:
+            if hunk is None:
+                hunk = EditScript()
+                i_hunk, j_hunk = i, j
+            hunk.append('match', length)
+        else:
+            if hunk is not None:
+                hunk.append('match', head)
+                yield i_hunk, j_hunk, hunk
+                hunk = None
+            if tail:
+                hunk = EditScript()
+                i_hunk, j_hunk = i + length - tail, j + length - tail
+                hunk.append('match', tail)
+        i += length
+        j += length
+
+    if hunk is not None:
+        yield i_hunk, j_hunk, hunk
+
+
+def use_numpy(n):
+    """Determines whether rows of cost table are calculated with NumPy.
+
+    Args:
+        n (int): Length of target sequence (row).
+
+    Returns:
+        use (bool): True if NumPy is used.
+    """
+    return USE_NUMPY and (n >= NUMPY_MIN_LENGTH)
+
+
+def find_common_affixes(source, target):
+    """Finds the lengths of common prefix and common suffix.
+    The suffix does not overlap the prefix.
+
+    Args:
+        source (iterable): Source sequence.
+        target (iterable): Target sequence.
+
+    Returns:
+        prefix (int): Length of common prefix.
+        suffix (int): Length of common suffix.
+    """
+    m, n = len(source), len(target)
+    len_min = min(m, n)
+    prefix = 0
+    while (prefix < len_min) and (source[prefix] == target[prefix]):
+        prefix += 1
+    suffix = 0
+    while (suffix < len_min - prefix) and (source[m-suffix-1] == target[n-suffix-1]):
+        suffix += 1
+    return prefix, suffix
+
+
+class Vocabulary(object):
+    """Interns tokens to small integer ids.
+    Sequences encoded by the same vocabulary can be compared by the ids,
+    which is faster than comparing tokens (e.g. words) themselves,
+    and the encoded sequences can be used by NumPy backend directly.
+    The vocabulary grows as new tokens come,
+    so it can be shared among many pairs of sequences.
+
+    Attributes:
+        token2id (dict): Mapping from token to id.
+        tokens (list): Tokens indexed by id.
+    """
+    def __init__(self):
+        self.token2id = {}
+        self.tokens = []
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, token):
+        return token in self.token2id
+
+    def add(self, token):
+        """Adds token if new and returns its id."""
+        token_id = self.token2id.get(token)
+        if token_id is None:
+            token_id = len(self.tokens)
+            self.token2id[token] = token_id
+            self.tokens.append(token)
+        return token_id
+
+    def encode(self, sequence):
+        """Maps tokens of the sequence to ids.
 
         Args:
-            source (iterable): Source sequence.
-            target (iterable): Target sequence.
+            sequence (iterable): Sequence of hashable tokens.
 
         Returns:
-            cost_table (tuple[tuple[int]]): Cost table.
+            ids (list[int]): Ids of the tokens.
+                List is used rather than array.array,
+                because indexing list does not make new int objects.
         """
-        m, n = len(source), len(target)
-        cost_table = Levenshtein.init_cost_table(m, n)
-        for i in range(1, m+1):
-            for j in range(1, n+1):
-                cost_insert = cost_table[i-1][j] + Levenshtein.EDIT2COST['insert']
-                cost_delete =  cost_table[i][j-1] + Levenshtein.EDIT2COST['delete']
-                cost = 0 if (source[i-1] == target[j-1]) else Levenshtein.EDIT2COST['replace']
-                cost_replace = cost_table[i-1][j-1] + cost
-                cost_table[i][j] = min(cost_insert, cost_delete, cost_replace)
-        cost_table = tuple([tuple(row) for row in cost_table])
-        return cost_table
+        token2id = self.token2id
+        add = self.add
+        ids = [token2id[token] if token in token2id else add(token) for token in sequence]
+        return ids
 
-    @staticmethod
-    def pad_cost_table(cost_table):
-        """Pads cost table with sys.maxsize
-        to make stopper for search_edit_path.
+    def decode(self, ids):
+        """Maps ids back to tokens.
 
         Args:
-            cost_table (tuple[tuple[int]]): Cost table.
+            ids (iterable[int]): Ids of tokens.
 
         Returns:
-            cost_table (tuple[tuple[int]]): Padded cost table.
+            sequence (list): Tokens.
         """
-        padded_table = []
-        for k in range(len(cost_table)):
-            padded_table.append(list(cost_table[k]) + [sys.maxsize])
-        padded_table.append([sys.maxsize]*len(cost_table[0]))
-        cost_table = tuple([tuple(row) for row in padded_table])
-        return cost_table
+        tokens = self.tokens
+        sequence = [tokens[token_id] for token_id in ids]
+        return sequence
 
-    @staticmethod
-    def trace_back(source, target, cost_table):
-        """Traces back cost table and make edit history.
+
+class CostModel(object):
+    """Costs of edit operations for Levenshtein distance.
+    Substitution costs can be given for each pair of symbols (elements).
+    The symbols having such costs are interned first,
+    and their costs are kept in a dense matrix indexed by the ids,
+    so the inner loop of alignment only indexes a row of costs.
+    Other pairs cost 0 if equal, and replace otherwise.
+    Unit costs are treated as same as default Levenshtein,
+    so the fast algorithms (bit-parallel etc.) are still used.
+
+    Args:
+        insert (int or float): Cost of insertion. Defaults to 1.
+        delete (int or float): Cost of deletion. Defaults to 1.
+        replace (int or float): Cost of replacement. Defaults to 1.
+        substitutions (dict): Mapping from pair of symbols
+            (source element, target element) to cost of the replacement.
+            Pairs of equal symbols always cost 0.
+            Defaults to None.
+
+    Attributes:
+        edit2cost (dict): Mapping from edit operation to its cost.
+        substitutions (dict): Mapping from pair of symbols to cost of the replacement.
+        vocabulary (Vocabulary): Vocabulary of the symbols in substitutions.
+        matrix (list[list]): Substitution costs between the symbols in substitutions.
+    """
+    def __init__(self, insert=1, delete=1, replace=1, substitutions=None):
+        self.edit2cost = {
+            'match': 0,
+            'insert': insert,
+            'delete': delete,
+            'replace': replace,
+            }
+        self.substitutions = dict(substitutions or {})
+        self.vocabulary = Vocabulary()
+        for symbol1, symbol2 in self.substitutions:
+            self.vocabulary.add(symbol1)
+            self.vocabulary.add(symbol2)
+
+        size = len(self.vocabulary)
+        self.matrix = [[replace] * size for _ in range(size)]
+        for k in range(size):
+            self.matrix[k][k] = 0
+        for (symbol1, symbol2), cost in self.substitutions.items():
+            if symbol1 != symbol2:
+                self.matrix[self.vocabulary.add(symbol1)][self.vocabulary.add(symbol2)] = cost
+        self._n_symbols = size
+        self._matrix_numpy = None
+
+    def __repr__(self):
+        costs = self.edit2cost
+        substitutions = sorted(
+            (repr(symbol1), repr(symbol2), cost)
+            for (symbol1, symbol2), cost in self.substitutions.items()
+            )
+        return (
+            f'CostModel(insert={costs["insert"]!r}, delete={costs["delete"]!r}, '
+            f'replace={costs["replace"]!r}, substitutions={substitutions!r})'
+            )
+
+    def is_unit(self):
+        """Checks whether all the edit operations except match cost 1."""
+        costs = self.edit2cost
+        if not (costs['insert'] == costs['delete'] == costs['replace'] == 1):
+            return False
+        return all(
+            cost == 1
+            for (symbol1, symbol2), cost in self.substitutions.items()
+            if symbol1 != symbol2
+            )
+
+    def is_integral(self):
+        """Checks whether all the costs are integers."""
+        costs = list(self.edit2cost.values()) + list(self.substitutions.values())
+        return all(isinstance(cost, int) for cost in costs)
+
+    def encode(self, source, target):
+        """Maps elements of source and target to ids of symbols.
+        Symbols in substitutions have their own ids in the vocabulary.
+        The other symbols are numbered from the number of those symbols
+        only within this call, so the cost model is never changed
+        and can be shared among threads.
 
         Args:
             source (iterable): Source sequence.
             target (iterable): Target sequence.
-            cost_table (tuple[tuple[int]]): Cost table.
 
         Returns:
-            edit_history (tuple): History of edition.
+            source_ids (list[int]): Ids of source elements.
+            target_ids (list[int]): Ids of target elements.
         """
-        cost_table = Levenshtein.pad_cost_table(cost_table)
-        m = len(cost_table) - 1
-        n = len(cost_table[0]) - 1
-        edit_history = Levenshtein.search_edit_path(cost_table, m, n)
-        if edit_history:
-            edit_history = tuple(edit_history)
-        return edit_history
+        token2id = self.vocabulary.token2id
+        local2id = {}
+
+        def _encode(sequence):
+            ids = []
+            for elem in sequence:
+                symbol = token2id.get(elem)
+                if symbol is None:
+                    symbol = local2id.get(elem)
+                    if symbol is None:
+                        symbol = self._n_symbols + len(local2id)
+                        local2id[elem] = symbol
+                ids.append(symbol)
+            return ids
+
+        return _encode(source), _encode(target)
+
+    def substitution_cost(self, symbol1, symbol2):
+        """Gets cost of replacing symbol1 (id) with symbol2 (id)."""
+        if symbol1 == symbol2:
+            return 0
+        if (symbol1 < self._n_symbols) and (symbol2 < self._n_symbols):
+            return self.matrix[symbol1][symbol2]
+        return self.edit2cost['replace']
 
-    @staticmethod
-    @functools.lru_cache(maxsize=None)
-    def search_edit_path(cost_table, m, n, i=0, j=0):
-        """Searchs lowest cost path of edition.
-        This method is called recursively,
-        so is speeded up by memoization.
+    def substitution_row(self, symbol, target_ids):
+        """Gets costs of replacing the symbol with each element of target.
 
         Args:
-            cost_table (tuple[tuple[int]]): Cost table.
-            m (int): Length of source sequence.
-            n (int): Length of target sequence.
-            i (int): Row index of cost table.
-            j (int): Column index of cost table.
+            symbol (int): Id of source element.
+            target_ids (list[int] or numpy.ndarray): Ids of target elements.
 
         Returns:
-            edit_history (list): History of edition.
+            costs (list or numpy.ndarray): Costs of the replacements.
         """
-        # reach end of the strings
-        if (i+1 == m) and (j+1 == n):
-            return []
-
-        # get cost
-        cost_current = cost_table[i][j]
-        cost_insert = cost_table[i][j+1]
-        cost_delete = cost_table[i+1][j]
-        cost_replace = cost_table[i+1][j+1]
-
-        # check path
-        has_passed_wrong_path = (
-            (cost_insert < cost_current)
-            or (cost_delete < cost_current)
-            or (cost_replace < cost_current)
-            )
-        if has_passed_wrong_path:
-            message = 'has passed wrong path:  '
-            message += 'i = {}, j = {}, cur: {}, ins: {}, del: {}, rep: {}'.format(
-                i, j, cost_current, cost_insert, cost_delete, cost_replace
-                )
-            #print(message)
-            return None
+        cost_replace = self.edit2cost['replace']
+        n_symbols = self._n_symbols
+        if (np is not None) and isinstance(target_ids, np.ndarray):
+            dtype = np.int32 if self.is_integral() else np.float64
+            costs = np.where(target_ids == symbol, 0, cost_replace).astype(dtype)
+            if symbol < n_symbols:
+                if self._matrix_numpy is None:
+                    self._matrix_numpy = np.array(self.matrix, dtype=dtype).reshape(n_symbols, n_symbols)
+                is_special = target_ids < n_symbols
+                costs[is_special] = self._matrix_numpy[symbol][target_ids[is_special]]
+            return costs
+
+        if symbol < n_symbols:
+            costs_special = self.matrix[symbol]
+            return [
+                costs_special[elem] if elem < n_symbols else cost_replace
+                for elem in target_ids
+                ]
+        return [0 if elem == symbol else cost_replace for elem in target_ids]
+
+    def sum_costs(self, source_ids, target_ids, edit_history):
+        """Sums costs of the operations in edit history.
 
-        # check not out of table
-        #if (i+1 < m) and (j+1 < n):
-        if cost_replace != sys.maxsize:
-            ret = Levenshtein.search_edit_path(cost_table, m, n, i+1, j+1)
-            if ret != None:
-                if cost_replace == cost_current:
-                    return ['match'] + ret
-                else:
-                    return ['replace'] + ret
+        Args:
+            source_ids (list[int]): Ids of source elements.
+            target_ids (list[int]): Ids of target elements.
+            edit_history (EditScript): History of edition.
 
-        # check not out of table and invalid pass
-        #if (i+1 < m) and (cost_delete > cost_current):
-        if (cost_delete != sys.maxsize) and (cost_delete > cost_current):
-            ret = Levenshtein.search_edit_path(cost_table, m, n, i+1, j)
-            if ret != None:
-                return ['delete'] + ret
+        Returns:
+            cost (int or float): Total cost.
+        """
+        cost = 0
+        i, j = 0, 0
+        for operation, length in iter_runs(edit_history):
+            if operation == 'replace':
+                for k in range(length):
+                    cost += self.substitution_cost(source_ids[i+k], target_ids[j+k])
+            elif operation != 'match':
+                cost += length * self.edit2cost[operation]
+            if operation != 'insert':
+                i += length
+            if operation != 'delete':
+                j += length
+        return cost
+
+
+def is_weighted(cost_model):
+    """Checks whether the cost model needs weighted alignment."""
+    return (cost_model is not None) and (not cost_model.is_unit())
+
+
+def encode_sequences(source, target):
+    """Maps elements of two sequences to integer ids for NumPy backend.
+    Equal elements are mapped to the same id.
 
-        # check not out of table and invalid pass
-        #if (j+1 < n) and (cost_insert > cost_current):
-        if (cost_insert != sys.maxsize) and (cost_insert > cost_current):
-            ret = Levenshtein.search_edit_path(cost_table, m, n, i, j+1)
-            if ret != None:
-                return ['insert'] + ret
+    Args:
+        source (iterable): Source sequence.
+        target (iterable): Target sequence.
 
+    Returns:
+        source_ids (numpy.ndarray): Ids of source elements.
+        target_ids (numpy.ndarray): Ids of target elements.
+    """
+    if isinstance(source, str) and isinstance(target, str):
+        source_ids = np.frombuffer(source.encode('utf-32-le', 'surrogatepass'), dtype='<u4').astype(np.int64)
+        target_ids = np.frombuffer(target.encode('utf-32-le', 'surrogatepass'), dtype='<u4').astype(np.int64)
+        return source_ids, target_ids
+
+    vocabulary = {}
+    source_ids = np.fromiter(
+        (vocabulary.setdefault(elem, len(vocabulary)) for elem in source),
+        dtype=np.int64, count=len(source),
+        )
+    target_ids = np.fromiter(
+        (vocabulary.setdefault(elem, len(vocabulary)) for elem in target),
+        dtype=np.int64, count=len(target),
+        )
+    return source_ids, target_ids
 
-class LongestCommonSubsequence(object):
-    """Solves longest common subsequence problem."""
-    def __init__(self, source, target):
-        self.source = source
-        self.target = target
-        self.cost_table = None
-        self.distance = None
-        self.normalized_distance = None
+
+def build_match_masks(sequence):
+    """Makes bit masks of the positions of each element for bit-parallel algorithms.
+    Elements (characters or tokens) are used as the keys of the masks,
+    so memory is proportional to the number of distinct elements.
+
+    Args:
+        sequence (iterable): Sequence.
+
+    Returns:
+        masks (dict): Mapping from element to bit mask.
+            i-th bit is 1 if i-th element of the sequence equals the key.
+    """
+    masks = {}
+    bit = 1
+    for elem in sequence:
+        masks[elem] = masks.get(elem, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def iter_bit_parallel_row(seq1, seq2, transposition=False, free_start=False):
+    """Generates the last row of Levenshtein's cost table with unit costs
+    by Myers' bit-parallel algorithm (in Hyyrö's formulation).
+    A column of cost table is held as bit vectors of vertical differences,
+    so it runs in O(ceil(m/w) * n) word operations where m is the length of seq1.
+
+    Args:
+        seq1 (iterable): Source sequence, held in bit vectors.
+        seq2 (iterable): Target sequence, scanned element by element.
+        transposition (bool): Determines whether transposition of adjacent elements
+            costs 1 as in optimal string alignment distance (Hyyrö's extension).
+            Transpositions are found from the diagonal bits of the previous column
+            and the match masks of the current and previous elements.
+            Defaults to False.
+        free_start (bool): Determines whether the first row is all 0,
+            that is, leading part of seq2 can be skipped without cost.
+            Defaults to False.
+
+    Yields:
+        cost (int): Cost of the last row at each column (0 to len(seq2)).
+    """
+    m = len(seq1)
+    distance = m
+    yield distance
+    if m == 0:
+        for j in range(1, len(seq2)+1):
+            yield 0 if free_start else j
+        return
+
+    masks = build_match_masks(seq1)
+    mask_all = (1 << m) - 1
+    bit_last = 1 << (m-1)
+    carry = 0 if free_start else 1
+    positive = mask_all
+    negative = 0
+    diagonal = 0
+    match_prev = 0
+    for elem in seq2:
+        match_elem = masks.get(elem, 0)
+        match = match_elem | negative
+        diagonal_next = (((match & positive) + positive) ^ positive) | match
+        if transposition:
+            diagonal_next |= (((~diagonal) & match_elem) << 1) & match_prev
+            match_prev = match_elem
+        diagonal = diagonal_next & mask_all
+        horizontal_positive = negative | (~(diagonal | positive) & mask_all)
+        horizontal_negative = positive & diagonal
+        if horizontal_positive & bit_last:
+            distance += 1
+        elif horizontal_negative & bit_last:
+            distance -= 1
+        horizontal_positive = (horizontal_positive << 1) | carry
+        horizontal_negative = horizontal_negative << 1
+        positive = (horizontal_negative | ~(diagonal | horizontal_positive)) & mask_all
+        negative = horizontal_positive & diagonal & mask_all
+        yield distance
+
+
+def stitch_common_affixes(edit_history, prefix, suffix):
+    """Adds matches of common prefix and suffix to edit history of the rest.
+
+    Args:
+        edit_history (EditScript): History of edition except common prefix and suffix.
+        prefix (int): Length of common prefix.
+        suffix (int): Length of common suffix.
+
+    Returns:
+        edit_history (EditScript): History of edition of the whole sequences.
+    """
+    if (prefix == 0) and (suffix == 0):
+        return edit_history
+    edit_script = EditScript()
+    edit_script.append('match', prefix)
+    edit_script.extend(edit_history or ())
+    edit_script.append('match', suffix)
+    return edit_script
+
+
+class Trimmed(object):
+    """Base of the models making edit history from cost table.
+    Common prefix and suffix are excluded from the alignment,
+    and cost table of the whole sequences is built when it is accessed.
+    Subclasses implement build_cost_table, iter_rows, trace_back, and measure
+    as static methods.
+    """
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self._cost_table = None
+        self.distance = None
+        self.normalized_distance = None
         self.edit_history = None
 
-    def build(self):
-        self.cost_table = LongestCommonSubsequence.build_cost_table(self.source, self.target)
-        self.edit_history = LongestCommonSubsequence.trace_back(self.source, self.target, self.cost_table)
-        self.distance = LongestCommonSubsequence.measure(
+    @property
+    def cost_table(self):
+        if (self._cost_table is None) and (self.edit_history is not None):
+            self._cost_table = type(self).build_cost_table(self.source, self.target)
+        return self._cost_table
+
+    def iter_cost_table(self):
+        """Generates rows of cost table of the whole sequences.
+        If the cost table is not kept, it is recalculated keeping only a few rows at once.
+
+        Returns:
+            rows (iterable): Rows of cost table.
+        """
+        if self._cost_table is not None:
+            return iter(self._cost_table)
+        return type(self).iter_rows(self.source, self.target)
+
+    def build(self, keep_cost_table=True):
+        """Builds edit history.
+
+        Args:
+            keep_cost_table (bool): Determines whether to keep the cost table built.
+                If False, it is rebuilt when accessed.
+                Defaults to True.
+        """
+        Model = type(self)
+        m, n = len(self.source), len(self.target)
+        prefix, suffix = find_common_affixes(self.source, self.target)
+        source = self.source[prefix:m-suffix]
+        target = self.target[prefix:n-suffix]
+        cost_table = Model.build_cost_table(source, target)
+        edit_history = Model.trace_back(source, target, cost_table)
+        self.edit_history = stitch_common_affixes(edit_history, prefix, suffix)
+        if keep_cost_table and (prefix == 0) and (suffix == 0):
+            self._cost_table = cost_table
+
+        self.distance = Model.measure(
             self.source, self.target,
             edit_history=self.edit_history,
             normalize=False,
             )
-        self.normalized_distance = LongestCommonSubsequence.measure(
+        self.normalized_distance = Model.measure(
             self.source, self.target,
             edit_history=self.edit_history,
             normalize=True,
             )
 
+
+class Levenshtein(Trimmed):
+    """Calculates Levenshtein distance
+    and makes edit history from cost table.
+    If weighted cost model is given, the costs are taken from it.
+
+    Attributes:
+        EDIT2COST (dict): Mapping from edit operation to its cost.
+        WORD_SIZE (int): Number of bits in a machine word of big integers.
+        COLUMN_COST (int): Time of a column of bit-parallel calculation
+            besides the words of its bit vectors, in units of a word operation.
+        CELL_COST (int): Time of a cell of banded calculation,
+            in units of a word operation.
+    """
+    EDIT2COST = {
+        'match': 0,
+        'insert': 1,
+        'delete': 1,
+        'replace': 1,
+        }
+    # calibrated by timing both loops in CPython on random strings:
+    # a column costs about 1.25 cells plus 1/16 cell for each word of the shorter sequence
+    WORD_SIZE = 64
+    COLUMN_COST = 20
+    CELL_COST = 16
+    def __init__(self, source, target, cost_model=None):
+        super().__init__(source, target)
+        self.cost_model = cost_model
+
+    @property
+    def cost_table(self):
+        if not is_weighted(self.cost_model):
+            return super().cost_table
+        if (self._cost_table is None) and (self.edit_history is not None):
+            self._cost_table = Levenshtein.build_cost_table_weighted(
+                *self.cost_model.encode(self.source, self.target),
+                self.cost_model,
+                )
+        return self._cost_table
+
+    def iter_cost_table(self):
+        if (self._cost_table is None) and is_weighted(self.cost_model):
+            return Levenshtein.iter_rows_weighted(
+                *self.cost_model.encode(self.source, self.target),
+                self.cost_model,
+                )
+        return super().iter_cost_table()
+
+    def build(self, keep_cost_table=True):
+        if is_weighted(self.cost_model):
+            self.build_weighted(keep_cost_table=keep_cost_table)
+            return
+        super().build(keep_cost_table=keep_cost_table)
+
+    def build_weighted(self, keep_cost_table=True):
+        """Builds cost table and edit history with the weighted cost model.
+
+        Args:
+            keep_cost_table (bool): Determines whether to keep the cost table built.
+                Defaults to True.
+        """
+        cost_model = self.cost_model
+        source_ids, target_ids = cost_model.encode(self.source, self.target)
+        m, n = len(source_ids), len(target_ids)
+        prefix, suffix = find_common_affixes(source_ids, target_ids)
+        source_ids = source_ids[prefix:m-suffix]
+        target_ids = target_ids[prefix:n-suffix]
+        cost_table = Levenshtein.build_cost_table_weighted(source_ids, target_ids, cost_model)
+        edit_history = Levenshtein.trace_back_weighted(source_ids, target_ids, cost_table, cost_model)
+        self.edit_history = stitch_common_affixes(edit_history, prefix, suffix)
+        if keep_cost_table and (prefix == 0) and (suffix == 0):
+            self._cost_table = cost_table
+
+        distance = cost_table[m-prefix-suffix][n-prefix-suffix]
+        if (np is not None) and isinstance(distance, np.generic):
+            distance = distance.item()
+        self.distance = distance
+        self.normalized_distance = distance / max(m, n, 1)
+
     @staticmethod
-    def measure(seq1, seq2, cost_table=None, edit_history=None, normalize=False,):
-        """Measures edit distance between two input sequences.
+    def measure(
+            seq1, seq2, cost_table=None, edit_history=None,
+            normalize=False, max_distance=None, cost_model=None,
+            ):
+        """Measures Levenshtein distance between two input sequences.
 
         Args:
             seq1 (iterable): Source sequence.
             seq2 (iterable): Target sequence.
             cost_table (tuple[tuple]): Cost table.
-                This is not used for the calculation if edit_history is input.
+                If is None, distance is calculated by bit-parallel algorithm
+                (or cost table is newly built if edit costs are not unit).
                 Defaults to None.
-            edit_history (tuple): History of edition.
-                If is None, newly built.
+            edit_history (EditScript): History of edition.
+                Used if cost_table is None.
                 Defaults to None.
             normalize (bool):
-                Determines whether to normalize edit distance,
+                Determines whether to normalize Levenshtein distance,
                 deviding by longer length of the input two sequences.
                 Defaults to False.
+            max_distance (int): Upper bound of distance.
+                If given without cost_table nor edit_history, only the diagonal band
+                where the distance can be within it is calculated
+                (unless bit-parallel algorithm is expected to be faster).
+                If distance exceeds it, max_distance + 1 is returned.
+                Defaults to None.
+            cost_model (CostModel): Costs of edit operations.
+                If is None or has unit costs, EDIT2COST is used.
+                Defaults to None.
 
         Returns:
-            distance (float): Edit distance.
+            distance (float): Levenshtein distance.
         """
         m, n = len(seq1), len(seq2)
         len_max = max(m, n)
         if len_max == 0:
             return 0
 
-        if not edit_history:
-            if not cost_table:
-                cost_table = LongestCommonSubsequence.build_cost_table(seq1, seq2)
-            edit_history = LongestCommonSubsequence.trace_back(seq1, seq2, cost_table)
-
-        distance = len([operation for operation in edit_history if operation != 'match'])
+        if is_weighted(cost_model):
+            distance = Levenshtein.measure_weighted(seq1, seq2, cost_model, cost_table, edit_history)
+        elif cost_table is not None:
+            distance = cost_table[m][n]
+        elif edit_history:
+            distance = Levenshtein.sum_costs(edit_history)
+        elif (max_distance is not None) and Levenshtein.is_band_narrow(m, n, max_distance):
+            distance = Levenshtein.measure_banded(seq1, seq2, max_distance)
+        elif Levenshtein.has_unit_cost():
+            distance = Levenshtein.measure_bit_parallel(seq1, seq2)
+        else:
+            distance = Levenshtein.build_cost_table(seq1, seq2)[m][n]
+        if (np is not None) and isinstance(distance, np.generic):
+            distance = distance.item()
+
+        if (max_distance is not None) and (distance > max_distance):
+            distance = max_distance + 1
         if normalize:
             distance /= len_max
         return distance
 
+    @staticmethod
+    def measure_weighted(seq1, seq2, cost_model, cost_table=None, edit_history=None):
+        """Measures Levenshtein distance with weighted cost model.
+        If neither cost_table nor edit_history is given,
+        cost table is calculated keeping only one row at once.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+            cost_model (CostModel): Costs of edit operations.
+            cost_table (tuple[tuple]): Cost table. Defaults to None.
+            edit_history (EditScript): History of edition. Defaults to None.
+
+        Returns:
+            distance (float): Levenshtein distance.
+        """
+        m, n = len(seq1), len(seq2)
+        if cost_table is not None:
+            return cost_table[m][n]
+        source_ids, target_ids = cost_model.encode(seq1, seq2)
+        if edit_history:
+            return cost_model.sum_costs(source_ids, target_ids, edit_history)
+        for row in Levenshtein.iter_rows_weighted(source_ids, target_ids, cost_model):
+            pass
+        return row[n]
+
+    @staticmethod
+    def sum_costs(edit_history):
+        """Sums costs of the operations in edit history.
+
+        Args:
+            edit_history (EditScript): History of edition.
+
+        Returns:
+            cost (int): Total cost.
+        """
+        return sum(
+            cost * edit_history.count(operation)
+            for operation, cost in Levenshtein.EDIT2COST.items()
+            )
+
+    @staticmethod
+    def has_unit_cost():
+        """Checks whether all the edit operations except match cost 1."""
+        costs = Levenshtein.EDIT2COST
+        return (
+            (costs['match'] == 0)
+            and (costs['insert'] == costs['delete'] == costs['replace'] == 1)
+            )
+
+    @staticmethod
+    def is_band_narrow(m, n, max_distance):
+        """Estimates whether banded calculation is faster than bit-parallel one.
+        Banded calculation is always used if edit costs are not unit.
+
+        Args:
+            m (int): Length of source sequence.
+            n (int): Length of target sequence.
+            max_distance (int): Upper bound of distance.
+
+        Returns:
+            is_narrow (bool): True if banded calculation should be used.
+        """
+        if not Levenshtein.has_unit_cost():
+            return True
+        len_min, len_max = min(m, n), max(m, n)
+        cost_band = (2*max_distance + 1) * len_min * Levenshtein.CELL_COST
+        n_words = -(-len_min // Levenshtein.WORD_SIZE)
+        cost_bit_parallel = len_max * (Levenshtein.COLUMN_COST + n_words)
+        return cost_band < cost_bit_parallel
+
+    @staticmethod
+    def measure_bit_parallel(seq1, seq2):
+        """Measures Levenshtein distance with unit costs
+        by Myers' bit-parallel algorithm (see iter_bit_parallel_row).
+        The shorter sequence is held in bit vectors,
+        so it runs in O(ceil(m/w) * n) word operations
+        where m is the length of the shorter sequence.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+
+        Returns:
+            distance (int): Levenshtein distance.
+        """
+        if len(seq1) > len(seq2):
+            seq1, seq2 = seq2, seq1
+        for distance in iter_bit_parallel_row(seq1, seq2):
+            pass
+        return distance
+
+    @staticmethod
+    def measure_banded(seq1, seq2, max_distance):
+        """Measures Levenshtein distance if it is within max_distance
+        by Ukkonen's cut-off.
+        Paths within max_distance cannot leave the diagonal band
+        of width 2k+1 (k = max_distance for unit costs),
+        so only the band is calculated, keeping one row of it.
+        The calculation stops as soon as the minimum of a row exceeds max_distance.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+            max_distance (int): Upper bound of distance.
+
+        Returns:
+            distance (int): Levenshtein distance.
+                max_distance + 1 if the distance exceeds max_distance.
+        """
+        cost_insert = Levenshtein.EDIT2COST['insert']
+        cost_delete = Levenshtein.EDIT2COST['delete']
+        cost_replace = Levenshtein.EDIT2COST['replace']
+        m, n = len(seq1), len(seq2)
+        exceeded = max_distance + 1
+        cost_min = min(cost_insert, cost_delete)
+        if cost_min > 0:
+            width = int(max_distance // cost_min)
+        else:
+            width = max(m, n)
+        if abs(m - n) > width:
+            return exceeded
+
+        # k-th element of a row i is the cell (i, i+k-width)
+        size = 2*width + 1
+        row = [exceeded] * size
+        for k in range(width, min(size, width+n+1)):
+            row[k] = min((k-width) * cost_delete, exceeded)
+
+        for i in range(1, m+1):
+            elem = seq1[i-1]
+            row_prev = row
+            row = [exceeded] * size
+            row_min = exceeded
+            for k in range(max(0, width-i), min(size, width+n-i+1)):
+                j = i + k - width
+                if j == 0:
+                    cost = i * cost_insert
+                else:
+                    cost = row_prev[k] if (elem == seq2[j-1]) else row_prev[k] + cost_replace
+                    if k > 0:
+                        cost = min(cost, row[k-1] + cost_delete)
+                if k+1 < size:
+                    cost = min(cost, row_prev[k+1] + cost_insert)
+                if cost < exceeded:
+                    row[k] = cost
+                    if cost < row_min:
+                        row_min = cost
+            if row_min >= exceeded:
+                return exceeded
+        return row[n - m + width]
+
     @staticmethod
     def init_cost_table(m, n):
         """Initializes cost table (((m+1) x (n+1)) matrix).
@@ -508,6 +1552,13 @@ class LongestCommonSubsequence(object):
             cost_table (list[list]): Cost table.
         """
         cost_table = [[0] * (n+1) for _ in range(m+1)]
+
+        for i in range(m+1):
+            cost_table[i][0] = i * Levenshtein.EDIT2COST['insert']
+
+        for j in range(n+1):
+            cost_table[0][j] = j * Levenshtein.EDIT2COST['delete']
+
         return cost_table
 
     @staticmethod
@@ -520,60 +1571,1650 @@ class LongestCommonSubsequence(object):
 
         Returns:
             cost_table (tuple[tuple[int]]): Cost table.
+                numpy.ndarray if NumPy is used.
         """
+        if use_numpy(len(target)):
+            return Levenshtein.build_cost_table_numpy(source, target)
+
         m, n = len(source), len(target)
-        cost_table = LongestCommonSubsequence.init_cost_table(m, n)
-        for i in range(m):
-            for j in range(n):
-                if source[i] == target[j]:
-                    cost_table[i+1][j+1] = cost_table[i][j] + 1
-                else:
-                    cost_table[i+1][j+1] = max(cost_table[i][j+1], cost_table[i+1][j])
+        cost_table = Levenshtein.init_cost_table(m, n)
+        for i in range(1, m+1):
+            for j in range(1, n+1):
+                cost_insert = cost_table[i-1][j] + Levenshtein.EDIT2COST['insert']
+                cost_delete =  cost_table[i][j-1] + Levenshtein.EDIT2COST['delete']
+                cost = 0 if (source[i-1] == target[j-1]) else Levenshtein.EDIT2COST['replace']
+                cost_replace = cost_table[i-1][j-1] + cost
+                cost_table[i][j] = min(cost_insert, cost_delete, cost_replace)
         cost_table = tuple([tuple(row) for row in cost_table])
         return cost_table
 
     @staticmethod
-    def trace_back(source, target, cost_table):
-        """Traces cost table back and make edit history.
+    def build_cost_table_numpy(source, target):
+        """Builds cost table with NumPy.
+        Each row is calculated at once:
+        costs from the upper row are taken first,
+        and then deletions along the row are resolved by cumulative minimum.
 
         Args:
             source (iterable): Source sequence.
             target (iterable): Target sequence.
-            cost_table (tuple[tuple[int]]): Cost table.
 
         Returns:
-            edit_history (tuple): History of edition.
+            cost_table (numpy.ndarray): Cost table.
         """
         m, n = len(source), len(target)
-        i, j = m, n
+        source_ids, target_ids = encode_sequences(source, target)
+        costs = [Levenshtein.EDIT2COST[key] for key in ['insert', 'delete', 'replace']]
+        dtype = np.int32 if all(isinstance(cost, int) for cost in costs) else np.float64
+        cost_table = np.empty((m+1, n+1), dtype=dtype)
+        cost_table[0] = np.arange(n+1) * Levenshtein.EDIT2COST['delete']
+        for i in range(1, m+1):
+            cost_table[i] = Levenshtein._build_next_row_numpy(
+                cost_table[i-1], source_ids[i-1] == target_ids, i,
+                )
+        return cost_table
+
+    @staticmethod
+    def iter_rows(source, target):
+        """Generates rows of cost table keeping only one row at once.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Yields:
+            row (list[int]): Row of cost table.
+                numpy.ndarray if NumPy is used.
+        """
+        cost_insert = Levenshtein.EDIT2COST['insert']
+        cost_delete = Levenshtein.EDIT2COST['delete']
+        cost_replace = Levenshtein.EDIT2COST['replace']
+        m, n = len(source), len(target)
+        if use_numpy(n):
+            source_ids, target_ids = encode_sequences(source, target)
+            costs = [cost_insert, cost_delete, cost_replace]
+            dtype = np.int32 if all(isinstance(cost, int) for cost in costs) else np.float64
+            row = np.arange(n+1, dtype=dtype) * cost_delete
+            yield row
+            for i in range(1, m+1):
+                row = Levenshtein._build_next_row_numpy(row, source_ids[i-1] == target_ids, i)
+                yield row
+            return
+
+        row = [j * cost_delete for j in range(n+1)]
+        yield row
+        for i in range(1, m+1):
+            elem = source[i-1]
+            row_prev = row
+            row = [i * cost_insert] * (n+1)
+            for j in range(1, n+1):
+                cost = row_prev[j-1] if (elem == target[j-1]) else row_prev[j-1] + cost_replace
+                row[j] = min(cost, row_prev[j] + cost_insert, row[j-1] + cost_delete)
+            yield row
+
+    @staticmethod
+    def _build_next_row_numpy(row_prev, is_equal, i):
+        cost_insert = Levenshtein.EDIT2COST['insert']
+        cost_delete = Levenshtein.EDIT2COST['delete']
+        cost_replace = Levenshtein.EDIT2COST['replace']
+        row = np.empty_like(row_prev)
+        row[0] = i * cost_insert
+        np.minimum(
+            row_prev[1:] + cost_insert,
+            row_prev[:-1] + np.where(is_equal, 0, cost_replace),
+            out=row[1:],
+            )
+        offset = np.arange(len(row), dtype=row.dtype) * cost_delete
+        row = np.minimum.accumulate(row - offset) + offset
+        return row
+
+    @staticmethod
+    def iter_rows_weighted(source_ids, target_ids, cost_model):
+        """Generates rows of cost table with weighted cost model.
+        Unlike EDIT2COST, moving down (consuming source element) costs deletion,
+        and moving right (consuming target element) costs insertion,
+        as named in edit history.
+        Substitution costs for a source element are taken as one row
+        from the cost model, and reused for the same elements.
+
+        Args:
+            source_ids (list[int]): Ids of source elements.
+            target_ids (list[int]): Ids of target elements.
+            cost_model (CostModel): Costs of edit operations.
+
+        Yields:
+            row (list): Row of cost table.
+                numpy.ndarray if NumPy is used.
+        """
+        cost_insert = cost_model.edit2cost['insert']
+        cost_delete = cost_model.edit2cost['delete']
+        n = len(target_ids)
+        substitution_rows = {}
+        if use_numpy(n):
+            target_ids = np.asarray(target_ids, dtype=np.int64)
+            dtype = np.int32 if cost_model.is_integral() else np.float64
+            offset = np.arange(n+1, dtype=dtype) * cost_insert
+            row = offset.copy()
+            yield row
+            for i, symbol in enumerate(source_ids, 1):
+                if symbol not in substitution_rows:
+                    substitution_rows[symbol] = cost_model.substitution_row(symbol, target_ids)
+                row_prev = row
+                row = np.empty_like(row_prev)
+                row[0] = i * cost_delete
+                np.minimum(
+                    row_prev[1:] + cost_delete,
+                    row_prev[:-1] + substitution_rows[symbol],
+                    out=row[1:],
+                    )
+                row = np.minimum.accumulate(row - offset) + offset
+                yield row
+            return
+
+        row = [j * cost_insert for j in range(n+1)]
+        yield row
+        for i, symbol in enumerate(source_ids, 1):
+            if symbol not in substitution_rows:
+                substitution_rows[symbol] = cost_model.substitution_row(symbol, target_ids)
+            row_prev = row
+            cost_left = i * cost_delete
+            row = [cost_left]
+            for cost_diagonal, cost_up, cost_replace in zip(
+                    row_prev, itertools.islice(row_prev, 1, None), substitution_rows[symbol],
+                    ):
+                cost = cost_diagonal + cost_replace
+                if cost_up + cost_delete < cost:
+                    cost = cost_up + cost_delete
+                if cost_left + cost_insert < cost:
+                    cost = cost_left + cost_insert
+                row.append(cost)
+                cost_left = cost
+            yield row
+
+    @staticmethod
+    def build_cost_table_weighted(source_ids, target_ids, cost_model):
+        """Builds cost table with weighted cost model.
+
+        Args:
+            source_ids (list[int]): Ids of source elements.
+            target_ids (list[int]): Ids of target elements.
+            cost_model (CostModel): Costs of edit operations.
+
+        Returns:
+            cost_table (tuple[tuple]): Cost table.
+                numpy.ndarray if NumPy is used.
+        """
+        rows = Levenshtein.iter_rows_weighted(source_ids, target_ids, cost_model)
+        if use_numpy(len(target_ids)):
+            return np.array(list(rows))
+        cost_table = tuple([tuple(row) for row in rows])
+        return cost_table
+
+    @staticmethod
+    def trace_back_weighted(source_ids, target_ids, cost_table, cost_model):
+        """Traces back cost table built with weighted cost model.
+        From the end of the table, replacement (match), deletion,
+        and insertion are taken in this order if the cost is consistent.
+
+        Args:
+            source_ids (list[int]): Ids of source elements.
+            target_ids (list[int]): Ids of target elements.
+            cost_table (tuple[tuple]): Cost table.
+            cost_model (CostModel): Costs of edit operations.
+
+        Returns:
+            edit_history (EditScript): History of edition.
+        """
+        cost_delete = cost_model.edit2cost['delete']
+        i, j = len(source_ids), len(target_ids)
         edit_history = []
-        while (i >= 1) and (j >= 1):
-            if source[i-1] == target[j-1]:
-                edit_history.append('match')
-                i -= 1
-                j -= 1
-            elif cost_table[i-1][j] > cost_table[i][j-1]:
+        while (i > 0) or (j > 0):
+            cost = cost_table[i][j]
+            if (i > 0) and (j > 0):
+                symbol1, symbol2 = source_ids[i-1], target_ids[j-1]
+                cost_replace = cost_model.substitution_cost(symbol1, symbol2)
+                if math.isclose(cost, cost_table[i-1][j-1] + cost_replace, abs_tol=1e-9):
+                    edit_history.append('match' if symbol1 == symbol2 else 'replace')
+                    i -= 1
+                    j -= 1
+                    continue
+            if (i > 0) and math.isclose(cost, cost_table[i-1][j] + cost_delete, abs_tol=1e-9):
                 edit_history.append('delete')
                 i -= 1
-            elif cost_table[i-1][j] < cost_table[i][j-1]:
-                edit_history.append('insert')
-                j -= 1
             else:
-                edit_history.append('replace')
-                i -= 1
+                edit_history.append('insert')
                 j -= 1
+        edit_history.reverse()
+        edit_history = EditScript.from_operations(edit_history)
+        return edit_history
 
-            # if i or j is 0
-            if (i != 0) and (j == 0):
-                edit_history.extend(['delete'] * i)
-            elif (i == 0) and (j != 0):
-                edit_history.extend(['insert'] * j)
+    @staticmethod
+    def trace_back(source, target, cost_table):
+        """Traces back cost table and make edit history.
 
-        edit_history.reverse()
-        if edit_history:
-            edit_history = tuple(edit_history)
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+            cost_table (tuple[tuple[int]]): Cost table.
+
+        Returns:
+            edit_history (EditScript): History of edition.
+        """
+        m, n = len(source), len(target)
+        edit_history = Levenshtein.search_edit_path(cost_table, m, n)
+        if edit_history is not None:
+            edit_history = EditScript.from_operations(edit_history)
+        return edit_history
+
+    @staticmethod
+    def search_edit_path(cost_table, m, n):
+        """Searchs lowest cost path of edition.
+        First, the cost table is swept back from (m, n)
+        to mark the cells from which (m, n) can be reached.
+        Then the path is walked forward from (0, 0) through the marked cells,
+        taking replacement (match), deletion, and insertion in this order.
+        No recursion and no state kept between calls are needed.
+
+        Args:
+            cost_table (tuple[tuple[int]]): Cost table.
+            m (int): Length of source sequence.
+            n (int): Length of target sequence.
+
+        Returns:
+            edit_history (list): History of edition.
+                None if no path is found.
+        """
+        # mark cells from which the end of the table is reachable
+        if (np is not None) and isinstance(cost_table, np.ndarray):
+            reachable = Levenshtein._mark_reachable_numpy(cost_table, m, n)
+        else:
+            reachable = Levenshtein._mark_reachable(cost_table, m, n)
+
+        if not reachable[0][0]:
+            return None
+
+        # walk forward through the marked cells
+        edit_history = []
+        i, j = 0, 0
+        while (i < m) or (j < n):
+            cost_current = cost_table[i][j]
+            if (i < m) and (j < n) and reachable[i+1][j+1]:
+                if cost_table[i+1][j+1] == cost_current:
+                    edit_history.append('match')
+                else:
+                    edit_history.append('replace')
+                i += 1
+                j += 1
+            elif (i < m) and reachable[i+1][j] and (cost_table[i+1][j] > cost_current):
+                edit_history.append('delete')
+                i += 1
+            else:
+                edit_history.append('insert')
+                j += 1
         return edit_history
 
+    @staticmethod
+    def _mark_reachable(cost_table, m, n):
+        reachable = [bytearray(n+1) for _ in range(m+1)]
+        reachable[m][n] = 1
+        for i in range(m, -1, -1):
+            row = cost_table[i]
+            reachable_row = reachable[i]
+            if i < m:
+                row_next = cost_table[i+1]
+                reachable_next = reachable[i+1]
+            for j in range(n, -1, -1):
+                if (i == m) and (j == n):
+                    continue
+                cost_current = row[j]
+
+                # check path
+                if (j < n) and (row[j+1] < cost_current):
+                    continue
+                if (i < m) and (row_next[j] < cost_current):
+                    continue
+                if (i < m) and (j < n) and (row_next[j+1] < cost_current):
+                    continue
+
+                if (i < m) and (j < n) and reachable_next[j+1]:
+                    reachable_row[j] = 1
+                elif (i < m) and reachable_next[j] and (row_next[j] > cost_current):
+                    reachable_row[j] = 1
+                elif (j < n) and reachable_row[j+1] and (row[j+1] > cost_current):
+                    reachable_row[j] = 1
+        return reachable
+
+    @staticmethod
+    def _mark_reachable_numpy(cost_table, m, n):
+        # reachable[i][j] = C[j] or (E[j] and reachable[i][j+1]) is solved along the row
+        # by comparing the nearest C and the nearest broken E on the right side
+        index = np.arange(n+1)
+        reachable = np.zeros((m+1, n+1), dtype=bool)
+        for i in range(m, -1, -1):
+            row = cost_table[i]
+            is_valid = np.ones(n+1, dtype=bool)
+            is_valid[:-1] &= (row[1:] >= row[:-1])
+            can_finish = np.zeros(n+1, dtype=bool)
+            if i < m:
+                row_next = cost_table[i+1]
+                reachable_next = reachable[i+1]
+                is_valid &= (row_next >= row)
+                is_valid[:-1] &= (row_next[1:] >= row[:-1])
+                can_finish[:-1] = reachable_next[1:]
+                can_finish |= reachable_next & (row_next > row)
+            can_insert = np.zeros(n+1, dtype=bool)
+            can_insert[:-1] = (row[1:] > row[:-1])
+            can_finish &= is_valid
+            can_insert &= is_valid
+            if i == m:
+                can_finish[n] = True
+
+            nearest_finish = np.where(can_finish, index, n+1)
+            nearest_finish = np.minimum.accumulate(nearest_finish[::-1])[::-1]
+            nearest_break = np.where(can_insert, n+1, index)
+            nearest_break = np.minimum.accumulate(nearest_break[::-1])[::-1]
+            reachable[i] = (nearest_finish <= nearest_break)
+        return reachable
+
+
+class Damerau(Trimmed):
+    """Calculates optimal string alignment distance
+    (restricted Damerau-Levenshtein distance),
+    in which swap of two adjacent elements is one edit operation ('transpose').
+    Elements once transposed are not edited again.
+    Cost table has the same form as Levenshtein's one.
+
+    Attributes:
+        EDIT2COST (dict): Mapping from edit operation to its cost.
+            Moving down in cost table (consuming source element) costs deletion,
+            and moving right (consuming target element) costs insertion.
+    """
+    EDIT2COST = {
+        'match': 0,
+        'insert': 1,
+        'delete': 1,
+        'replace': 1,
+        'transpose': 1,
+        }
+    @staticmethod
+    def measure(seq1, seq2, cost_table=None, edit_history=None, normalize=False, max_distance=None):
+        """Measures optimal string alignment distance between two input sequences.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+            cost_table (tuple[tuple]): Cost table.
+                If is None, distance is calculated by bit-parallel algorithm
+                (or only the last rows of cost table if edit costs are not unit).
+                Defaults to None.
+            edit_history (EditScript): History of edition.
+                Used if cost_table is None.
+                Defaults to None.
+            normalize (bool):
+                Determines whether to normalize the distance,
+                deviding by longer length of the input two sequences.
+                Defaults to False.
+            max_distance (int): Upper bound of distance.
+                If distance exceeds it, max_distance + 1 is returned.
+                Defaults to None.
+
+        Returns:
+            distance (float): Optimal string alignment distance.
+        """
+        m, n = len(seq1), len(seq2)
+        len_max = max(m, n)
+        if len_max == 0:
+            return 0
+
+        if cost_table is not None:
+            distance = cost_table[m][n]
+        elif edit_history:
+            distance = Damerau.sum_costs(edit_history)
+        elif Damerau.has_unit_cost():
+            distance = Damerau.measure_bit_parallel(seq1, seq2)
+        else:
+            for row in Damerau.iter_rows(seq1, seq2):
+                pass
+            distance = row[n]
+        if (np is not None) and isinstance(distance, np.generic):
+            distance = distance.item()
+
+        if (max_distance is not None) and (distance > max_distance):
+            distance = max_distance + 1
+        if normalize:
+            distance /= len_max
+        return distance
+
+    @staticmethod
+    def sum_costs(edit_history):
+        """Sums costs of the operations in edit history.
+
+        Args:
+            edit_history (EditScript): History of edition.
+
+        Returns:
+            cost (int): Total cost.
+        """
+        return sum(
+            cost * edit_history.count(operation)
+            for operation, cost in Damerau.EDIT2COST.items()
+            )
+
+    @staticmethod
+    def has_unit_cost():
+        """Checks whether all the edit operations except match cost 1."""
+        costs = Damerau.EDIT2COST
+        return (
+            (costs['match'] == 0)
+            and (costs['insert'] == costs['delete'] == costs['replace'] == costs['transpose'] == 1)
+            )
+
+    @staticmethod
+    def measure_bit_parallel(seq1, seq2):
+        """Measures optimal string alignment distance with unit costs
+        by Hyyrö's extension of Myers' bit-parallel algorithm
+        (see iter_bit_parallel_row).
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+
+        Returns:
+            distance (int): Optimal string alignment distance.
+        """
+        if len(seq1) > len(seq2):
+            seq1, seq2 = seq2, seq1
+        for distance in iter_bit_parallel_row(seq1, seq2, transposition=True):
+            pass
+        return distance
+
+    @staticmethod
+    def iter_rows(source, target):
+        """Generates rows of cost table keeping only three rows at once.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Yields:
+            row (list[int]): Row of cost table.
+                numpy.ndarray if NumPy is used.
+        """
+        cost_insert = Damerau.EDIT2COST['insert']
+        cost_delete = Damerau.EDIT2COST['delete']
+        cost_replace = Damerau.EDIT2COST['replace']
+        cost_transpose = Damerau.EDIT2COST['transpose']
+        m, n = len(source), len(target)
+        if use_numpy(n):
+            source_ids, target_ids = encode_sequences(source, target)
+            costs = [cost_insert, cost_delete, cost_replace, cost_transpose]
+            dtype = np.int32 if all(isinstance(cost, int) for cost in costs) else np.float64
+            offset = np.arange(n+1, dtype=dtype) * cost_insert
+            row = offset.copy()
+            row_prev = None
+            yield row
+            for i in range(1, m+1):
+                row_prev2, row_prev = row_prev, row
+                row = np.empty_like(row_prev)
+                row[0] = i * cost_delete
+                np.minimum(
+                    row_prev[1:] + cost_delete,
+                    row_prev[:-1] + np.where(source_ids[i-1] == target_ids, 0, cost_replace),
+                    out=row[1:],
+                    )
+                if i >= 2:
+                    is_swapped = (target_ids[:-1] == source_ids[i-1]) & (target_ids[1:] == source_ids[i-2])
+                    np.minimum(
+                        row[2:],
+                        np.where(is_swapped, row_prev2[:-2] + cost_transpose, row[2:]),
+                        out=row[2:],
+                        )
+                row = np.minimum.accumulate(row - offset) + offset
+                yield row
+            return
+
+        row = [j * cost_insert for j in range(n+1)]
+        row_prev = None
+        yield row
+        for i in range(1, m+1):
+            elem = source[i-1]
+            elem_prev = source[i-2] if i >= 2 else None
+            row_prev2, row_prev = row_prev, row
+            row = [i * cost_delete] * (n+1)
+            for j in range(1, n+1):
+                cost = row_prev[j-1] if (elem == target[j-1]) else row_prev[j-1] + cost_replace
+                cost = min(cost, row_prev[j] + cost_delete, row[j-1] + cost_insert)
+                if (i >= 2) and (j >= 2) and (elem == target[j-2]) and (elem_prev == target[j-1]):
+                    cost = min(cost, row_prev2[j-2] + cost_transpose)
+                row[j] = cost
+            yield row
+
+    @staticmethod
+    def build_cost_table(source, target):
+        """Builds cost table.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Returns:
+            cost_table (tuple[tuple[int]]): Cost table.
+                numpy.ndarray if NumPy is used.
+        """
+        rows = Damerau.iter_rows(source, target)
+        if use_numpy(len(target)):
+            return np.array(list(rows))
+        cost_table = tuple([tuple(row) for row in rows])
+        return cost_table
+
+    @staticmethod
+    def trace_back(source, target, cost_table):
+        """Traces back cost table and make edit history.
+        From the end of the table, replacement (match), transposition,
+        deletion, and insertion are taken in this order if the cost is consistent.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+            cost_table (tuple[tuple[int]]): Cost table.
+
+        Returns:
+            edit_history (EditScript): History of edition.
+        """
+        cost_delete = Damerau.EDIT2COST['delete']
+        cost_replace = Damerau.EDIT2COST['replace']
+        cost_transpose = Damerau.EDIT2COST['transpose']
+        i, j = len(source), len(target)
+        edit_history = []
+        while (i > 0) or (j > 0):
+            cost = cost_table[i][j]
+            if (i > 0) and (j > 0):
+                is_equal = (source[i-1] == target[j-1])
+                cost_diagonal = cost_table[i-1][j-1] + (0 if is_equal else cost_replace)
+                if math.isclose(cost, cost_diagonal, abs_tol=1e-9):
+                    edit_history.append('match' if is_equal else 'replace')
+                    i -= 1
+                    j -= 1
+                    continue
+            if (
+                    (i > 1) and (j > 1)
+                    and (source[i-1] == target[j-2]) and (source[i-2] == target[j-1])
+                    and math.isclose(cost, cost_table[i-2][j-2] + cost_transpose, abs_tol=1e-9)
+                    ):
+                edit_history.append('transpose')
+                i -= 2
+                j -= 2
+            elif (i > 0) and math.isclose(cost, cost_table[i-1][j] + cost_delete, abs_tol=1e-9):
+                edit_history.append('delete')
+                i -= 1
+            else:
+                edit_history.append('insert')
+                j -= 1
+        edit_history.reverse()
+        edit_history = EditScript.from_operations(edit_history)
+        return edit_history
+
+
+class LongestCommonSubsequence(Trimmed):
+    """Solves longest common subsequence problem."""
+    @staticmethod
+    def measure(seq1, seq2, cost_table=None, edit_history=None, normalize=False, max_distance=None):
+        """Measures edit distance between two input sequences.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+            cost_table (tuple[tuple]): Cost table.
+                This is not used for the calculation if edit_history is input.
+                Defaults to None.
+            edit_history (EditScript): History of edition.
+                If is None, newly built.
+                Defaults to None.
+            normalize (bool):
+                Determines whether to normalize edit distance,
+                deviding by longer length of the input two sequences.
+                Defaults to False.
+            max_distance (int): Upper bound of distance.
+                If distance exceeds it, max_distance + 1 is returned.
+                If even the lower bound by the length of longest common subsequence
+                exceeds it, cost table is not built.
+                Defaults to None.
+
+        Returns:
+            distance (float): Edit distance.
+        """
+        m, n = len(seq1), len(seq2)
+        len_max = max(m, n)
+        if len_max == 0:
+            return 0
+
+        if (max_distance is not None) and (abs(m - n) > max_distance):
+            distance = max_distance + 1
+        elif (
+                (max_distance is not None) and (not edit_history) and (cost_table is None)
+                and (len_max - LongestCommonSubsequence.measure_length(seq1, seq2) > max_distance)
+                ):
+            # each element of the longer sequence is matched at most once,
+            # so unmatched ones are lower bound of distance, known without cost table
+            distance = max_distance + 1
+        else:
+            if not edit_history:
+                if cost_table is None:
+                    cost_table = LongestCommonSubsequence.build_cost_table(seq1, seq2)
+                edit_history = LongestCommonSubsequence.trace_back(seq1, seq2, cost_table)
+            distance = len(edit_history) - edit_history.count('match')
+
+        if (max_distance is not None) and (distance > max_distance):
+            distance = max_distance + 1
+        if normalize:
+            distance /= len_max
+        return distance
+
+    @staticmethod
+    def measure_length(seq1, seq2):
+        """Measures the length of longest common subsequence
+        by bit-parallel algorithm (Allison-Dix, Hyyrö).
+        It runs in O(ceil(m/w) * n) word operations
+        where m is the length of the shorter sequence.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+
+        Returns:
+            length (int): Length of longest common subsequence.
+        """
+        if len(seq1) > len(seq2):
+            seq1, seq2 = seq2, seq1
+        m = len(seq1)
+        if m == 0:
+            return 0
+
+        masks = build_match_masks(seq1)
+        mask_all = (1 << m) - 1
+        row = mask_all
+        for elem in seq2:
+            match = row & masks.get(elem, 0)
+            row = ((row + match) | (row - match)) & mask_all
+        length = m - bin(row).count('1')
+        return length
+
+    @staticmethod
+    def init_cost_table(m, n):
+        """Initializes cost table (((m+1) x (n+1)) matrix).
+
+        Args:
+            m (int): Length of source sequence.
+            n (int): Length of target sequence.
+
+        Returns:
+            cost_table (list[list]): Cost table.
+        """
+        cost_table = [[0] * (n+1) for _ in range(m+1)]
+        return cost_table
+
+    @staticmethod
+    def build_cost_table(source, target):
+        """Builds cost table.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Returns:
+            cost_table (tuple[tuple[int]]): Cost table.
+                numpy.ndarray if NumPy is used.
+        """
+        if use_numpy(len(target)):
+            return LongestCommonSubsequence.build_cost_table_numpy(source, target)
+
+        m, n = len(source), len(target)
+        cost_table = LongestCommonSubsequence.init_cost_table(m, n)
+        for i in range(m):
+            for j in range(n):
+                if source[i] == target[j]:
+                    cost_table[i+1][j+1] = cost_table[i][j] + 1
+                else:
+                    cost_table[i+1][j+1] = max(cost_table[i][j+1], cost_table[i+1][j])
+        cost_table = tuple([tuple(row) for row in cost_table])
+        return cost_table
+
+    @staticmethod
+    def iter_rows(source, target):
+        """Generates rows of cost table keeping only one row at once.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Yields:
+            row (list[int]): Row of cost table.
+                numpy.ndarray if NumPy is used.
+        """
+        m, n = len(source), len(target)
+        if use_numpy(n):
+            source_ids, target_ids = encode_sequences(source, target)
+            row = np.zeros(n+1, dtype=np.int32)
+            yield row
+            for i in range(1, m+1):
+                row_prev = row
+                row = np.zeros_like(row_prev)
+                np.maximum.accumulate(
+                    np.where(source_ids[i-1] == target_ids, row_prev[:-1] + 1, row_prev[1:]),
+                    out=row[1:],
+                    )
+                yield row
+            return
+
+        row = [0] * (n+1)
+        yield row
+        for i in range(1, m+1):
+            elem = source[i-1]
+            row_prev = row
+            row = [0] * (n+1)
+            for j in range(1, n+1):
+                if elem == target[j-1]:
+                    row[j] = row_prev[j-1] + 1
+                else:
+                    row[j] = max(row_prev[j], row[j-1])
+            yield row
+
+    @staticmethod
+    def build_cost_table_numpy(source, target):
+        """Builds cost table with NumPy.
+        Each row is calculated at once by cumulative maximum.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Returns:
+            cost_table (numpy.ndarray): Cost table.
+        """
+        m, n = len(source), len(target)
+        source_ids, target_ids = encode_sequences(source, target)
+        cost_table = np.zeros((m+1, n+1), dtype=np.int32)
+        for i in range(1, m+1):
+            row_prev = cost_table[i-1]
+            row = cost_table[i]
+            np.maximum.accumulate(
+                np.where(source_ids[i-1] == target_ids, row_prev[:-1] + 1, row_prev[1:]),
+                out=row[1:],
+                )
+        return cost_table
+
+    @staticmethod
+    def trace_back(source, target, cost_table):
+        """Traces cost table back and make edit history.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+            cost_table (tuple[tuple[int]]): Cost table.
+
+        Returns:
+            edit_history (EditScript): History of edition.
+        """
+        m, n = len(source), len(target)
+        i, j = m, n
+        edit_history = []
+        while (i >= 1) and (j >= 1):
+            if source[i-1] == target[j-1]:
+                edit_history.append('match')
+                i -= 1
+                j -= 1
+            elif cost_table[i-1][j] > cost_table[i][j-1]:
+                edit_history.append('delete')
+                i -= 1
+            elif cost_table[i-1][j] < cost_table[i][j-1]:
+                edit_history.append('insert')
+                j -= 1
+            else:
+                edit_history.append('replace')
+                i -= 1
+                j -= 1
+
+        # if i or j is 0
+        edit_history.extend(['delete'] * i)
+        edit_history.extend(['insert'] * j)
+
+        edit_history.reverse()
+        edit_history = EditScript.from_operations(edit_history)
+        return edit_history
+
+
+class Hirschberg(object):
+    """Aligns two sequences in linear space by Hirschberg's algorithm.
+    Edit history is the same kind as Levenshtein's one,
+    but cost table is not materialized.
+
+    Attributes:
+        MAX_TABLE_SIZE (int): Maximum size of cost table
+            built directly instead of dividing the sequences.
+    """
+    MAX_TABLE_SIZE = 4096
+    def __init__(self, source, target, cost_model=None):
+        self.source = source
+        self.target = target
+        self.cost_model = cost_model
+        self.cost_table = None
+        self.distance = None
+        self.normalized_distance = None
+        self.edit_history = None
+
+    def build(self):
+        self.edit_history = Hirschberg.align(self.source, self.target, cost_model=self.cost_model)
+        self.distance = Hirschberg.measure(
+            self.source, self.target,
+            edit_history=self.edit_history,
+            normalize=False,
+            cost_model=self.cost_model,
+            )
+        self.normalized_distance = Hirschberg.measure(
+            self.source, self.target,
+            edit_history=self.edit_history,
+            normalize=True,
+            cost_model=self.cost_model,
+            )
+
+    @staticmethod
+    def measure(
+            seq1, seq2, cost_table=None, edit_history=None,
+            normalize=False, max_distance=None, cost_model=None,
+            ):
+        """Measures Levenshtein distance between two input sequences
+        in linear space.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+            cost_table (tuple[tuple]): Cost table.
+                Used if edit_history is None.
+                Defaults to None.
+            edit_history (EditScript): History of edition.
+                If both edit_history and cost_table are None,
+                distance is calculated by bit-parallel algorithm
+                (or only the last row of cost table if edit costs are not unit).
+                Defaults to None.
+            normalize (bool):
+                Determines whether to normalize Levenshtein distance,
+                deviding by longer length of the input two sequences.
+                Defaults to False.
+            max_distance (int): Upper bound of distance.
+                If distance exceeds it, max_distance + 1 is returned.
+                Defaults to None.
+            cost_model (CostModel): Costs of edit operations.
+                If is None or has unit costs, Levenshtein.EDIT2COST is used.
+                Defaults to None.
+
+        Returns:
+            distance (float): Levenshtein distance.
+        """
+        if is_weighted(cost_model):
+            return Levenshtein.measure(
+                seq1, seq2,
+                cost_table=cost_table,
+                edit_history=edit_history,
+                normalize=normalize,
+                max_distance=max_distance,
+                cost_model=cost_model,
+                )
+
+        m, n = len(seq1), len(seq2)
+        len_max = max(m, n)
+        if len_max == 0:
+            return 0
+
+        if edit_history:
+            distance = Levenshtein.sum_costs(edit_history)
+        elif cost_table is not None:
+            distance = cost_table[m][n]
+        elif (max_distance is not None) and Levenshtein.is_band_narrow(m, n, max_distance):
+            distance = Levenshtein.measure_banded(seq1, seq2, max_distance)
+        elif Levenshtein.has_unit_cost():
+            distance = Levenshtein.measure_bit_parallel(seq1, seq2)
+        else:
+            distance = Hirschberg.build_last_row(seq1, seq2)[n]
+        if (np is not None) and isinstance(distance, np.generic):
+            distance = distance.item()
+
+        if (max_distance is not None) and (distance > max_distance):
+            distance = max_distance + 1
+
+        if normalize:
+            distance /= len_max
+        return distance
+
+    @staticmethod
+    def build_last_row(source, target, cost_model=None):
+        """Builds the last row of Levenshtein's cost table
+        keeping only two rows at once.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+            cost_model (CostModel): Weighted costs of edit operations.
+                If given, source and target must be ids of the elements.
+                Defaults to None.
+
+        Returns:
+            row (list[int]): Last row of cost table.
+                numpy.ndarray if NumPy is used.
+        """
+        if is_weighted(cost_model):
+            rows = Levenshtein.iter_rows_weighted(source, target, cost_model)
+        else:
+            rows = Levenshtein.iter_rows(source, target)
+        for row in rows:
+            pass
+        return row
+
+    @staticmethod
+    def align(source, target, cost_model=None):
+        """Makes edit history dividing source sequence into halves recursively.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+            cost_model (CostModel): Costs of edit operations.
+                Defaults to None.
+
+        Returns:
+            edit_history (EditScript): History of edition.
+        """
+        edit_history = EditScript()
+        if is_weighted(cost_model):
+            source, target = cost_model.encode(source, target)
+        else:
+            cost_model = None
+        Hirschberg._align(source, target, edit_history, cost_model)
+        return edit_history
+
+    @staticmethod
+    def _align(source, target, edit_history, cost_model=None):
+        m, n = len(source), len(target)
+        if (m <= 1) or (n <= 1) or ((m+1) * (n+1) <= Hirschberg.MAX_TABLE_SIZE):
+            if cost_model is not None:
+                cost_table = Levenshtein.build_cost_table_weighted(source, target, cost_model)
+                edit_history.extend(
+                    Levenshtein.trace_back_weighted(source, target, cost_table, cost_model)
+                    )
+                return
+            cost_table = Levenshtein.build_cost_table(source, target)
+            edit_history.extend(Levenshtein.search_edit_path(cost_table, m, n))
+            return
+
+        # find the column where the optimal path crosses the middle row
+        mid = m // 2
+        row_upper = Hirschberg.build_last_row(source[:mid], target, cost_model)
+        row_lower = Hirschberg.build_last_row(source[mid:][::-1], target[::-1], cost_model)
+        if (np is not None) and isinstance(row_upper, np.ndarray):
+            split = int(np.argmin(row_upper + row_lower[::-1]))
+        else:
+            split = min(range(n+1), key=lambda j: row_upper[j] + row_lower[n-j])
+
+        Hirschberg._align(source[:mid], target[:split], edit_history, cost_model)
+        Hirschberg._align(source[mid:], target[split:], edit_history, cost_model)
+
+
+class Myers(object):
+    """Finds the shortest edit script by Myers' O(ND) difference algorithm.
+    Only match, delete, and insert are used as edit operations,
+    and distance is the number of deleted and inserted elements.
+    Cost table is not materialized.
+    """
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self.cost_table = None
+        self.distance = None
+        self.normalized_distance = None
+        self.edit_history = None
+
+    def build(self):
+        self.edit_history = Myers.trace_back(self.source, self.target)
+        self.distance = Myers.measure(
+            self.source, self.target,
+            edit_history=self.edit_history,
+            normalize=False,
+            )
+        self.normalized_distance = Myers.measure(
+            self.source, self.target,
+            edit_history=self.edit_history,
+            normalize=True,
+            )
+
+    @staticmethod
+    def measure(seq1, seq2, cost_table=None, edit_history=None, normalize=False, max_distance=None):
+        """Measures the length of the shortest edit script.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+            cost_table (tuple[tuple]): Cost table.
+                This is not used for the calculation.
+                Defaults to None.
+            edit_history (EditScript): History of edition.
+                If is None, only the furthest reaching paths are searched.
+                Defaults to None.
+            normalize (bool):
+                Determines whether to normalize distance,
+                deviding by longer length of the input two sequences.
+                Defaults to False.
+            max_distance (int): Upper bound of distance.
+                If given, the search stops when the number of edition exceeds it,
+                and max_distance + 1 is returned.
+                Defaults to None.
+
+        Returns:
+            distance (float): Length of the shortest edit script.
+        """
+        m, n = len(seq1), len(seq2)
+        len_max = max(m, n)
+        if len_max == 0:
+            return 0
+
+        if edit_history:
+            distance = len(edit_history) - edit_history.count('match')
+        else:
+            trace = Myers.search_paths(seq1, seq2, max_distance=max_distance)
+            distance = (max_distance + 1) if (trace is None) else (len(trace) - 1)
+
+        if (max_distance is not None) and (distance > max_distance):
+            distance = max_distance + 1
+        if normalize:
+            distance /= len_max
+        return distance
+
+    @staticmethod
+    def search_paths(source, target, max_distance=None):
+        """Searchs the furthest reaching paths on each diagonal
+        increasing the number of edition until reaching the end of both sequences.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+            max_distance (int): Maximum number of edition to search.
+                Defaults to None.
+
+        Returns:
+            trace (list[list[int]]): Row indices reached by d edition,
+                stored from diagonal -d to d for each d.
+                None if the end is not reached within max_distance.
+        """
+        m, n = len(source), len(target)
+        offset = m + n + 1
+        furthest = [0] * (2*offset + 1)
+        trace = []
+        d_max = m + n
+        if max_distance is not None:
+            d_max = min(d_max, max_distance)
+        for d in range(d_max+1):
+            reached = []
+            for k in range(-d, d+1, 2):
+                if (k == -d) or ((k != d) and (furthest[offset+k-1] < furthest[offset+k+1])):
+                    i = furthest[offset+k+1]
+                else:
+                    i = furthest[offset+k-1] + 1
+                j = i - k
+                while (i < m) and (j < n) and (source[i] == target[j]):
+                    i += 1
+                    j += 1
+                furthest[offset+k] = i
+                reached.append(i)
+                if (i >= m) and (j >= n):
+                    trace.append(reached)
+                    return trace
+            trace.append(reached)
+        return None
+
+    @staticmethod
+    def trace_back(source, target):
+        """Traces the furthest reaching paths back and make edit history.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Returns:
+            edit_history (EditScript): History of edition.
+        """
+        trace = Myers.search_paths(source, target)
+        i, j = len(source), len(target)
+        runs = []
+        for d in range(len(trace)-1, 0, -1):
+            reached = trace[d-1]
+            k = i - j
+            if (k == -d) or ((k != d) and (reached[(k-1+d-1)//2] < reached[(k+1+d-1)//2])):
+                k_prev = k + 1
+                i_prev = reached[(k_prev+d-1)//2]
+                j_prev = i_prev - k_prev
+                i_start, j_start = i_prev, j_prev + 1
+                operation = 'insert'
+            else:
+                k_prev = k - 1
+                i_prev = reached[(k_prev+d-1)//2]
+                j_prev = i_prev - k_prev
+                i_start, j_start = i_prev + 1, j_prev
+                operation = 'delete'
+            runs.append(('match', i - i_start))
+            runs.append((operation, 1))
+            i, j = i_prev, j_prev
+        runs.append(('match', i))
+
+        runs.reverse()
+        edit_history = EditScript(runs)
+        return edit_history
+
+
+class SemiGlobal(object):
+    """Finds the span of target which source matches best (semi-global alignment).
+    Leading and trailing parts of target out of the span are free,
+    and distance is Levenshtein distance between source and the span.
+    The span is found keeping only one column of cost table,
+    and then only the span is aligned by Levenshtein.
+    Edit history covers the whole target:
+    the parts out of the span are leading and trailing runs of insert.
+
+    Attributes:
+        span (tuple[int, int]): Start and end positions of the span in target.
+    """
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self.cost_table = None
+        self.distance = None
+        self.normalized_distance = None
+        self.edit_history = None
+        self.span = None
+
+    def build(self):
+        _, start, end = SemiGlobal.search(self.source, self.target)
+        model = Levenshtein(self.source, self.target[start:end])
+        model.build()
+        edit_history = EditScript()
+        edit_history.append('insert', start)
+        edit_history.extend(model.edit_history)
+        edit_history.append('insert', len(self.target) - end)
+        self.edit_history = edit_history
+        self.span = (start, end)
+
+        self.distance = SemiGlobal.measure(
+            self.source, self.target,
+            edit_history=self.edit_history,
+            normalize=False,
+            )
+        self.normalized_distance = SemiGlobal.measure(
+            self.source, self.target,
+            edit_history=self.edit_history,
+            normalize=True,
+            )
+
+    @staticmethod
+    def measure(seq1, seq2, cost_table=None, edit_history=None, normalize=False, max_distance=None):
+        """Measures Levenshtein distance between seq1 and its best matching span in seq2.
+
+        Args:
+            seq1 (iterable): Source sequence (query).
+            seq2 (iterable): Target sequence (text).
+            cost_table (tuple[tuple]): Cost table.
+                This is not used for the calculation.
+                Defaults to None.
+            edit_history (EditScript): History of edition.
+                If is None, only the span is searched.
+                Defaults to None.
+            normalize (bool):
+                Determines whether to normalize distance,
+                deviding by longer length of seq1 and the span.
+                Defaults to False.
+            max_distance (int): Upper bound of distance.
+                If distance exceeds it, max_distance + 1 is returned.
+                Defaults to None.
+
+        Returns:
+            distance (float): Levenshtein distance to the span.
+        """
+        if edit_history:
+            start, end, edit_history_span = SemiGlobal.find_span(edit_history)
+            distance = Levenshtein.sum_costs(edit_history_span)
+        else:
+            distance, start, end = SemiGlobal.search(seq1, seq2)
+        len_max = max(len(seq1), end - start)
+        if len_max == 0:
+            return 0
+
+        if (max_distance is not None) and (distance > max_distance):
+            distance = max_distance + 1
+        if normalize:
+            distance /= len_max
+        return distance
+
+    @staticmethod
+    def find_span(edit_history):
+        """Finds the span from edit history,
+        excluding leading and trailing runs of insert.
+
+        Args:
+            edit_history (EditScript): History of edition of the whole sequences.
+
+        Returns:
+            start (int): Start position of the span in target.
+            end (int): End position of the span in target.
+            edit_history (EditScript): History of edition in the span.
+        """
+        runs = list(iter_runs(edit_history))
+        start = 0
+        if runs and (runs[0][0] == 'insert'):
+            if len(runs) == 1:
+                # source is empty, and so is the span
+                return 0, 0, EditScript()
+            start = runs.pop(0)[1]
+        if runs and (runs[-1][0] == 'insert'):
+            runs.pop()
+        edit_history_span = EditScript(runs)
+        end = start + sum(
+            EditScript.OPERATION2STEP[operation][1] * length
+            for operation, length in runs
+            )
+        return start, end, edit_history_span
+
+    @staticmethod
+    def search(seq1, seq2):
+        """Searches the span of seq2 closest to seq1 in linear space.
+        First, the end is found as the leftmost column
+        where the last row of cost table with free start is minimum.
+        Then the start is found as the shortest span ending there,
+        by aligning both sequences reversed from the end.
+
+        Args:
+            seq1 (iterable): Source sequence (query).
+            seq2 (iterable): Target sequence (text).
+
+        Returns:
+            distance (int): Levenshtein distance between seq1 and the span.
+            start (int): Start position of the span in seq2.
+            end (int): End position of the span in seq2.
+        """
+        distance, end = None, 0
+        for j, cost in enumerate(SemiGlobal.iter_last_row(seq1, seq2, free_start=True)):
+            if (distance is None) or (cost < distance):
+                distance, end = cost, j
+
+        length = 0
+        for j, cost in enumerate(SemiGlobal.iter_last_row(seq1[::-1], seq2[end-1::-1] if end else seq2[:0])):
+            if cost == distance:
+                length = j
+                break
+        return distance, end - length, end
+
+    @staticmethod
+    def iter_last_row(seq1, seq2, free_start=False):
+        """Generates the last row of Levenshtein's cost table column by column,
+        keeping only one column.
+        Myers' bit-parallel algorithm is used if edit costs are unit.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+            free_start (bool): Determines whether the first row is all 0,
+                that is, leading part of seq2 can be skipped without cost.
+                Defaults to False.
+
+        Yields:
+            cost (int): Cost of the last row at each column (0 to len(seq2)).
+        """
+        m = len(seq1)
+        if not Levenshtein.has_unit_cost():
+            cost_insert = Levenshtein.EDIT2COST['insert']
+            cost_delete = Levenshtein.EDIT2COST['delete']
+            cost_replace = Levenshtein.EDIT2COST['replace']
+            column = [i * cost_insert for i in range(m+1)]
+            yield column[m]
+            for elem in seq2:
+                column_prev = column
+                column = [0 if free_start else column_prev[0] + cost_delete] * (m+1)
+                for i in range(1, m+1):
+                    cost = column_prev[i-1] if (seq1[i-1] == elem) else column_prev[i-1] + cost_replace
+                    column[i] = min(cost, column_prev[i] + cost_delete, column[i-1] + cost_insert)
+                yield column[m]
+            return
+
+        yield from iter_bit_parallel_row(seq1, seq2, free_start=free_start)
+
+
+class Segmented(object):
+    """Base of the models aligning elements only in segments of sequences
+    by the inner model, so alignment of large sequences takes less time.
+    Distance is the inner model's one measured from the edit history,
+    so it can be larger than the one of the inner model for the whole sequences.
+    Subclasses implement align returning the edit history first,
+    and may override set_segments to keep the other results of align.
+
+    Attributes:
+        Inner (type): Alignment model for elements in segments.
+    """
+    Inner = Levenshtein
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+        self.cost_table = None
+        self.distance = None
+        self.normalized_distance = None
+        self.edit_history = None
+
+    def build(self):
+        Model = type(self)
+        self.edit_history, *segments = Model.align(self.source, self.target)
+        self.set_segments(*segments)
+        self.distance = Model.measure(
+            self.source, self.target,
+            edit_history=self.edit_history,
+            normalize=False,
+            )
+        self.normalized_distance = Model.measure(
+            self.source, self.target,
+            edit_history=self.edit_history,
+            normalize=True,
+            )
+
+    def set_segments(self, *segments):
+        """Keeps results of align other than the edit history.
+        They are discarded here, so subclasses override this to keep them.
+        """
+
+    @classmethod
+    def measure(cls, seq1, seq2, cost_table=None, edit_history=None, normalize=False, max_distance=None):
+        """Measures distance between two input sequences
+        aligning elements only in segments by the inner model.
+
+        Args:
+            seq1 (iterable): Source sequence.
+            seq2 (iterable): Target sequence.
+            cost_table (tuple[tuple]): Cost table.
+                This is not used for the calculation.
+                Defaults to None.
+            edit_history (EditScript): History of edition.
+                If is None, newly built.
+                Defaults to None.
+            normalize (bool):
+                Determines whether to normalize distance,
+                deviding by longer length of the input two sequences.
+                Defaults to False.
+            max_distance (int): Upper bound of distance.
+                If distance exceeds it, max_distance + 1 is returned.
+                Defaults to None.
+
+        Returns:
+            distance (float): Distance.
+        """
+        if not edit_history:
+            edit_history = cls.align(seq1, seq2)[0]
+        distance = cls.Inner.measure(
+            seq1, seq2,
+            edit_history=edit_history,
+            normalize=normalize,
+            max_distance=max_distance,
+            )
+        return distance
+
+
+class Hierarchical(Segmented):
+    """Aligns lines first, and then aligns elements (characters)
+    only in blocks of lines replaced with other lines.
+    Lines are interned to integer ids and aligned by Myers' algorithm,
+    so unchanged lines cost almost nothing even in large texts.
+    Edit history is made of elements of the whole sequences:
+    matched lines become runs of match,
+    and replaced blocks have edit history of the inner model.
+
+    Attributes:
+        Inner (type): Alignment model for elements in replaced blocks.
+        SEPARATOR (str): Element at the end of line.
+        line_edit_history (EditScript): History of edition of the lines.
+        blocks (list[tuple[int, int]]): Start and end positions in source
+            of the blocks whose elements are aligned by the inner model.
+    """
+    SEPARATOR = '\n'
+    def __init__(self, source, target):
+        super().__init__(source, target)
+        self.line_edit_history = None
+        self.blocks = None
+
+    def set_segments(self, line_edit_history, blocks):
+        self.line_edit_history = line_edit_history
+        self.blocks = blocks
+
+    @classmethod
+    def split_lines(cls, sequence):
+        """Splits sequence into lines keeping the separators.
+
+        Args:
+            sequence (iterable): Sequence.
+
+        Returns:
+            lines (list[tuple[int, int]]): Start and end positions of the lines.
+        """
+        if isinstance(sequence, str):
+            lengths = [len(line) for line in sequence.split(cls.SEPARATOR)]
+            lengths = [length + 1 for length in lengths[:-1]] + lengths[-1:]
+        else:
+            lengths = []
+            length = 0
+            for elem in sequence:
+                length += 1
+                if elem == cls.SEPARATOR:
+                    lengths.append(length)
+                    length = 0
+            lengths.append(length)
+        if lengths[-1] == 0:
+            lengths.pop()
+
+        lines = []
+        start = 0
+        for length in lengths:
+            lines.append((start, start+length))
+            start += length
+        return lines
+
+    @classmethod
+    def align(cls, source, target):
+        """Aligns lines, and then elements in replaced blocks.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Returns:
+            edit_history (EditScript): History of edition of the elements.
+            line_edit_history (EditScript): History of edition of the lines.
+            blocks (list[tuple[int, int]]): Start and end positions in source
+                of the blocks aligned by the inner model.
+        """
+        lines_source = cls.split_lines(source)
+        lines_target = cls.split_lines(target)
+        vocabulary = Vocabulary()
+        if isinstance(source, str) and isinstance(target, str):
+            line_ids_source = vocabulary.encode(source[start:end] for start, end in lines_source)
+            line_ids_target = vocabulary.encode(target[start:end] for start, end in lines_target)
+        else:
+            line_ids_source = vocabulary.encode(tuple(source[start:end]) for start, end in lines_source)
+            line_ids_target = vocabulary.encode(tuple(target[start:end]) for start, end in lines_target)
+        line_edit_history = Myers.trace_back(line_ids_source, line_ids_target)
+
+        edit_history = EditScript()
+        blocks = []
+        i, j = 0, 0
+        block_start = (0, 0)
+        for operation, length in itertools.chain(line_edit_history.runs(), [('match', 0)]):
+            if operation == 'delete':
+                i += length
+                continue
+            if operation == 'insert':
+                j += length
+                continue
+
+            # align elements in the block of deleted and inserted lines
+            i_start, j_start = block_start
+            start_source = lines_source[i_start][0] if i_start < i else 0
+            end_source = lines_source[i-1][1] if i_start < i else 0
+            start_target = lines_target[j_start][0] if j_start < j else 0
+            end_target = lines_target[j-1][1] if j_start < j else 0
+            if (start_source < end_source) and (start_target < end_target):
+                model = cls.Inner(source[start_source:end_source], target[start_target:end_target])
+                model.build()
+                edit_history.extend(model.edit_history)
+                blocks.append((start_source, end_source))
+            else:
+                edit_history.append('delete', end_source - start_source)
+                edit_history.append('insert', end_target - start_target)
+
+            if length > 0:
+                edit_history.append('match', lines_source[i+length-1][1] - lines_source[i][0])
+            i += length
+            j += length
+            block_start = (i, j)
+        return edit_history, line_edit_history, blocks
+
+
+class HierarchicalLCS(Hierarchical):
+    """Aligns lines first, and then solves longest common subsequence problem
+    only in blocks of lines replaced with other lines.
+    """
+    Inner = LongestCommonSubsequence
+
+
+class Anchored(Segmented):
+    """Aligns elements only between anchors,
+    which are k-mers found exactly once in both sequences (patience-style).
+    Anchors are found by hash indexes of k-mers,
+    and the longest chain of them in the same order in both sequences is kept,
+    so moved or repeated blocks do not confuse the alignment.
+    Elements between consecutive anchors are aligned by the inner model,
+    and so alignment of large sequences takes almost linear time.
+
+    Attributes:
+        Inner (type): Alignment model for elements between anchors.
+        K (int): Length of k-mers of strings.
+            A character is rarely unique, but a token is,
+            so elements of other sequences are anchors by themselves.
+        anchors (list[tuple[int, int, int]]): Start positions in source and target,
+            and lengths of the anchored matches.
+    """
+    K = 8
+    def __init__(self, source, target):
+        super().__init__(source, target)
+        self.anchors = None
+
+    def set_segments(self, anchors):
+        self.anchors = anchors
+
+    @classmethod
+    def find_anchors(cls, source, target):
+        """Finds anchors, unique common k-mers in the same order in both sequences.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Returns:
+            anchors (list[tuple[int, int, int]]): Start positions in source and target,
+                and lengths of the anchored matches.
+                Overlapping k-mers on the same diagonal are merged.
+        """
+        k = cls.K if isinstance(source, str) and isinstance(target, str) else 1
+
+        def _index(sequence):
+            # position of k-mer, or -1 if it is not unique
+            positions = {}
+            if k == 1:
+                kmers = sequence
+            else:
+                kmers = (sequence[i:i+k] for i in range(len(sequence)-k+1))
+            for i, kmer in enumerate(kmers):
+                positions[kmer] = -1 if kmer in positions else i
+            return positions
+
+        positions_source = _index(source)
+        positions_target = _index(target)
+        # unique k-mers keep the order of their first insertion, so pairs are sorted by source position
+        pairs = [
+            (i, positions_target[kmer])
+            for kmer, i in positions_source.items()
+            if (i >= 0) and (positions_target.get(kmer, -1) >= 0)
+            ]
+
+        # longest increasing subsequence of target positions (patience sorting)
+        tails = []
+        indices_tail = []
+        indices_prev = []
+        for index, (_, j) in enumerate(pairs):
+            if tails and (j > tails[-1]):
+                # fast path for similar sequences
+                position = len(tails)
+            else:
+                position = bisect.bisect_left(tails, j)
+            indices_prev.append(indices_tail[position-1] if position > 0 else -1)
+            if position == len(tails):
+                tails.append(j)
+                indices_tail.append(index)
+            else:
+                tails[position] = j
+                indices_tail[position] = index
+        chain = []
+        index = indices_tail[-1] if indices_tail else -1
+        while index >= 0:
+            chain.append(pairs[index])
+            index = indices_prev[index]
+        chain.reverse()
+
+        anchors = []
+        i_end, j_end = 0, 0
+        for i, j in chain:
+            if anchors and (i - j == anchors[-1][0] - anchors[-1][1]) and (i <= i_end):
+                i_start, j_start, _ = anchors[-1]
+                anchors[-1] = (i_start, j_start, i + k - i_start)
+            elif (i >= i_end) and (j >= j_end):
+                anchors.append((i, j, k))
+            else:
+                continue
+            i_end, j_end = i + k, j + k
+        return anchors
+
+    @classmethod
+    def align(cls, source, target):
+        """Aligns elements between anchors.
+
+        Args:
+            source (iterable): Source sequence.
+            target (iterable): Target sequence.
+
+        Returns:
+            edit_history (EditScript): History of edition.
+            anchors (list[tuple[int, int, int]]): Start positions in source and target,
+                and lengths of the anchored matches.
+        """
+        anchors = cls.find_anchors(source, target)
+        edit_history = EditScript()
+        i_end, j_end = 0, 0
+        for i, j, length in itertools.chain(anchors, [(len(source), len(target), 0)]):
+            if (i_end < i) and (j_end < j):
+                model = cls.Inner(source[i_end:i], target[j_end:j])
+                model.build()
+                edit_history.extend(model.edit_history)
+            else:
+                edit_history.append('delete', i - i_end)
+                edit_history.append('insert', j - j_end)
+            edit_history.append('match', length)
+            i_end, j_end = i + length, j + length
+        return edit_history, anchors
+
+
+class AnchoredLCS(Anchored):
+    """Solves longest common subsequence problem only between anchors,
+    which are k-mers found exactly once in both sequences.
+    """
+    Inner = LongestCommonSubsequence
+
 
 if __name__ == '__main__':
     main()
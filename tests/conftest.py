@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+
+"""Imports the repository as DiffVis package,
+whatever the name of the directory it is cloned into."""
+
+
+import os
+import sys
+import importlib.util
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'DiffVis' not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        'DiffVis', os.path.join(ROOT, '__init__.py'), submodule_search_locations=[ROOT],
+        )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['DiffVis'] = module
+    spec.loader.exec_module(module)
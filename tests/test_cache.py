@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+
+from DiffVis.cache import AlignmentCache, make_key
+from DiffVis.diffvis import DiffVis
+from DiffVis.string_distance import EditScript, CostModel
+
+
+def test_make_key():
+    key = make_key('abc', 'abd', 'Levenshtein')
+    assert key == make_key('abc', 'abd', 'Levenshtein')
+    assert key != make_key('abd', 'abc', 'Levenshtein')
+    assert key != make_key('abc', 'abd', 'LCS')
+    # boundary between source and target is kept
+    assert make_key('ab', 'c', 'Levenshtein') != make_key('a', 'bc', 'Levenshtein')
+    assert key != make_key(['abc'], ['abd'], 'Levenshtein')
+    # unit costs are same as no cost model
+    assert key == make_key('abc', 'abd', 'Levenshtein', CostModel())
+    assert key != make_key('abc', 'abd', 'Levenshtein', CostModel(replace=3))
+
+
+def test_alignment_cache(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    edit_history = EditScript([('match', 2), ('replace', 1)])
+    cache = AlignmentCache(path=path, max_memory_entries=2)
+    assert cache.get('a') is None
+    cache.set('a', edit_history)
+    cache.set('b', ('match', 'insert'))
+    cache.set('c', edit_history)
+    assert cache.get('b') == ('match', 'insert')
+    assert cache.disk_usage()[0] == 3
+    cache.close()
+
+    # shared on disk
+    cache = AlignmentCache(path=path)
+    assert cache.get('a') == edit_history
+    assert (cache.hits, cache.misses) == (1, 0)
+    cache.clear()
+    assert cache.get('a') is None
+    assert cache.disk_usage() == (0, 0)
+    cache.close()
+
+
+def test_alignment_cache_eviction(tmp_path):
+    edit_history = EditScript([('match', 2), ('replace', 1)])
+    cache = AlignmentCache(max_memory_entries=2)
+    for key in 'abc':
+        cache.set(key, edit_history)
+    # least recently used one is evicted
+    assert cache.get('a') is None
+    assert cache.get('c') == edit_history
+
+    size = len(edit_history.to_bytes())
+    cache = AlignmentCache(path=str(tmp_path / 'cache.db'), max_disk_size=2*size)
+    for key in 'abc':
+        cache.set(key, edit_history)
+    assert cache.disk_usage() == (2, 2*size)
+    cache.close()
+
+
+def test_cache_copies_edit_history(tmp_path):
+    for path in [None, str(tmp_path / 'cache.db')]:
+        cache = AlignmentCache(path=path)
+        dv = DiffVis('kitten', 'sitting', cache=cache)
+        dv.build()
+        expected = list(dv.edit_history)
+        dv.edit_history.append('insert')
+        for _ in range(2):
+            dv = DiffVis('kitten', 'sitting', cache=cache)
+            dv.build()
+            assert list(dv.edit_history) == expected
+            dv.edit_history.append('insert')
+        assert cache.hits == 2
+        cache.close()
+
+
+def test_cache_hierarchical():
+    source = 'abc\ndef\nghi\n'
+    target = 'abc\ndxf\nghi\n'
+    cache = AlignmentCache()
+    outputs = []
+    for _ in range(2):
+        dv = DiffVis(source, target, alignment='LineLCS', cache=cache)
+        dv.build()
+        outputs.append(dv.visualize(mode='console'))
+    assert outputs[0] == outputs[1]
+    # matches in the replaced block are highlighted, unlike plain LCS
+    dv = DiffVis(source, target, alignment='LCS')
+    dv.build()
+    assert outputs[0] != dv.visualize(mode='console')
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+
+import io
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from DiffVis import diffvis
+from DiffVis.diffvis import DiffVis, make_template
+from DiffVis.string_distance import Levenshtein, Vocabulary, CostModel
+
+
+def test_visualize_chunks():
+    dv = DiffVis('kitten sitting on the mat', 'sitting kitten on a mat')
+    dv.build()
+    source_row, target_row = dv.visualize().split('\n')
+    file = io.StringIO()
+    dv.visualize(file=file, chunk_size=5)
+    chunks = file.getvalue().split('\n\n')
+    assert len(chunks) == (len(dv.edit_history) + 4) // 5
+    rows = [chunk.split('\n') for chunk in chunks]
+    assert ''.join(row[0] for row in rows) == source_row
+    assert ''.join(row[1] for row in rows) == target_row
+
+    file = io.StringIO()
+    assert dv.visualize(mode='HTML', file=file) is None
+    assert file.getvalue() == dv.visualize(mode='HTML')
+
+
+def test_make_template():
+    sequences = ['the cat sat', 'the bat sat', 'the cat sit']
+    assert make_template(sequences, return_str=True, blank='*') == 'the *at s*t'
+    assert make_template([list('abc'), list('axc'), list('ac')]) == ['a', '<blank>', 'c']
+    assert make_template(['abc']) == list('abc')
+
+
+def test_visualize_context():
+    source = 'a' * 30 + 'b' + 'a' * 30
+    target = 'a' * 30 + 'x' + 'a' * 30
+    dv = DiffVis(source, target)
+    dv.build()
+    assert dv.visualize(padding=False, context=100) == dv.visualize(padding=False)
+    output = dv.visualize(padding=False, context=2)
+    # skipped matches are summarized, and two matches are kept around the change
+    assert output.count('[...28...]') == 4
+    assert output.count('a') == 8
+
+
+def test_tokens():
+    source = 'the cat sat on the mat'.split()
+    target = 'the dog sat on a mat'.split()
+    vocabulary = Vocabulary()
+    dv = DiffVis(source, target, vocabulary=vocabulary)
+    dv.build()
+    model = Levenshtein(source, target)
+    model.build()
+    assert list(dv.edit_history) == list(model.edit_history)
+    assert 'mat' in vocabulary
+    assert 'cat' in dv.visualize(mode='HTML', padding=False)
+
+
+def test_cost_model():
+    cost_model = CostModel(replace=3)
+    dv = DiffVis('kitten', 'sitting', cost_model=cost_model)
+    dv.build()
+    # replacing costs more than deleting and inserting
+    assert 'replace' not in list(dv.edit_history)
+    assert dv.distance() == 5
+    with pytest.raises(ValueError):
+        DiffVis('kitten', 'sitting', alignment='LCS', cost_model=cost_model)
+
+
+def test_semi_global_span():
+    dv = DiffVis('needle', 'haystack with a neadle in it', alignment='SemiGlobal')
+    dv.build()
+    assert dv.span == (16, 22)
+    assert dv.distance() == 1
+    # only the span of target is shown
+    assert dv.visualize(padding=False).split('\n')[1].count('\033[0m') == 6
+
+
+def test_format_cost_table():
+    dv = DiffVis('kitten', 'sitting')
+    with pytest.raises(ValueError, match='build'):
+        dv.format_cost_table()
+    dv.build()
+    # the table is not kept, and rows are recalculated for the window
+    assert dv._model._cost_table is None
+    assert dv.format_cost_table() == dv.format_cost_table(rows=slice(None), columns=slice(None))
+    window = dv.format_cost_table(rows=slice(2, 4), columns=slice(1, 3))
+    assert window.split('\n')[4:7:2] == ['|  i|  2|  1|', '|  t|  3|  2|']
+    assert list(dv._model.iter_cost_table()) == [list(row) for row in dv.cost_table]
+    for alignment in ['Myers', 'Hirschberg', 'SemiGlobal', 'LineLCS', 'Anchored']:
+        dv = DiffVis('kitten', 'sitting', alignment=alignment)
+        dv.build()
+        with pytest.raises(ValueError, match=r'alignment mode: \w+'):
+            dv.format_cost_table()
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_batch(n_jobs):
+    pairs = [('kitten', 'sitting'), ('flaw', 'lawn'), ('kitten', 'sitting'), ('', 'abc')]
+    expected = []
+    for source, target in pairs:
+        dv = DiffVis(source, target)
+        dv.build()
+        expected.append(dv.visualize(mode='HTML', context=1))
+    outputs = DiffVis.batch(pairs, mode='HTML', context=1, n_jobs=n_jobs, chunk_size=1)
+    assert outputs == expected
+    completed = DiffVis.batch(pairs, mode='HTML', context=1, n_jobs=n_jobs, as_completed=True)
+    assert sorted(completed) == list(enumerate(expected))
+    with pytest.raises(ValueError):
+        DiffVis.batch(pairs, mode='Unknown')
+
+
+def test_abuild():
+    dv = DiffVis('kitten', 'sitting')
+    dv.build()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        built = DiffVis('kitten', 'sitting')
+        asyncio.run(built.abuild(executor=executor))
+        assert built.edit_history == dv.edit_history
+        assert built.visualize(mode='HTML') == dv.visualize(mode='HTML')
+        # the distance 3 exceeds max_distance
+        skipped = DiffVis('kitten', 'sitting')
+        asyncio.run(skipped.abuild(max_distance=2, executor=executor))
+        assert skipped.edit_history is None
+
+
+def test_abuild_timeout(monkeypatch):
+    released = threading.Event()
+
+    def _build_model_detached(*args):
+        released.wait(10)
+
+    monkeypatch.setattr(diffvis, '_build_model_detached', _build_model_detached)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        dv = DiffVis('kitten', 'sitting')
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(dv.abuild(timeout=0.1, executor=executor))
+        released.set()
+    assert dv.edit_history is None
+
+
+def test_diff_and_render_timeout(monkeypatch):
+    released = threading.Event()
+
+    def _diff_and_render(*args):
+        released.wait(10)
+        return ''
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        output = asyncio.run(diffvis.diff_and_render('kitten', 'sitting', mode='HTML', executor=executor))
+        dv = DiffVis('kitten', 'sitting')
+        dv.build()
+        assert output == dv.visualize(mode='HTML')
+        monkeypatch.setattr(diffvis, '_diff_and_render', _diff_and_render)
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(diffvis.diff_and_render('kitten', 'sitting', timeout=0.1, executor=executor))
+        released.set()
+    with pytest.raises(ValueError):
+        asyncio.run(diffvis.diff_and_render('kitten', 'sitting', mode='Unknown'))
+
+
+def test_diff_and_render_cancel(monkeypatch):
+    started = threading.Event()
+    released = threading.Event()
+    calls = []
+
+    def _diff_and_render(source, *args):
+        calls.append(source)
+        started.set()
+        released.wait(10)
+        return source
+
+    async def _cancel_queued(executor):
+        running = asyncio.create_task(diffvis.diff_and_render('a', 'b', executor=executor))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 10)
+        # the only worker is busy, so this one waits in the queue
+        queued = asyncio.create_task(diffvis.diff_and_render('c', 'd', executor=executor))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        released.set()
+        return await running
+
+    monkeypatch.setattr(diffvis, '_diff_and_render', _diff_and_render)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert asyncio.run(_cancel_queued(executor)) == 'a'
+    assert calls == ['a']
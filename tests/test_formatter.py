@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+
+import pytest
+
+from DiffVis import diffvis
+from DiffVis.diffvis import DiffVis
+from DiffVis.formatter import Formatter, ConsoleFormatter, CompactHTMLTabFormatter
+
+
+class BracketFormatter(Formatter):
+    # custom formatter with its own __init__, not calling the base one
+    def __init__(self, bracket):
+        self.bracket = bracket
+
+    def colorize(self, text, color):
+        return f'{self.bracket[0]}{color}:{text}{self.bracket[1]}'
+
+
+def test_custom_formatter():
+    dv = DiffVis('kitten', 'sitting')
+    dv.build()
+    output = dv.generate_comparison(BracketFormatter('[]'), padding=False)
+    assert output.split('\n')[0] == '[red:k][green:i][green:t][green:t][red:e][green:n][green:]'
+
+
+def test_console_formatter():
+    dv = DiffVis('kitten', 'sitting')
+    dv.build()
+    assert dv.visualize(mode='console') == dv.generate_comparison(ConsoleFormatter())
+
+
+def test_render_run():
+    formatter = ConsoleFormatter()
+    elements = ['ab', 'c', 'ab']
+    for padding in [True, False]:
+        expected = ''.join(
+            formatter.render(text, 'green', len(text) if padding else None) for text in elements)
+        assert formatter.render_run(elements, 'green', padding=padding) == expected
+
+
+def test_fragment_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(Formatter, 'MAX_FRAGMENTS', 4)
+    formatter = BracketFormatter('[]')
+    for i in range(10):
+        assert formatter.render(str(i), 'red') == f'[red:{i}]'
+        assert len(formatter._fragments) <= 4
+
+
+def test_compact_html():
+    dv = DiffVis(list('a<&b'), list('a<&c'))
+    dv.build()
+    output = dv.visualize(mode='CompactHTML', padding=False)
+    # special characters are escaped, and runs of the same color are in one span
+    body = output.split('</style>')[1]
+    assert body == (
+        '<span class="dg">a&lt;&amp;</span><span class="dr">b</span><br>'
+        '<span class="dg">a&lt;&amp;</span><span class="db">c</span>'
+        )
+    # paddings of deleted elements are in the same span as the matches around them
+    dv = DiffVis('aXYb', 'ab')
+    dv.build()
+    body = dv.visualize(mode='CompactHTML', padding=False).split('</style>')[1]
+    assert body == (
+        '<span class="dg">a</span><span class="dr">XY</span><span class="dg">b</span><br>'
+        '<span class="dg">ab</span>'
+        )
+
+
+def test_compact_html_tab_columns():
+    dv = DiffVis('kitten', 'sitting')
+    dv.build()
+    output = dv.generate_comparison(CompactHTMLTabFormatter(columns=3))
+    blocks = output.split('</style>')[1].split('<tbody>')[1:]
+    assert len(blocks) == (len(dv.edit_history) + 2) // 3
+    for block in blocks:
+        rows = block.split('</tr>')[:2]
+        assert all(1 <= row.count('<td') <= 3 for row in rows)
+
+
+def test_columns(monkeypatch, capsys):
+    dv = DiffVis('kitten', 'sitting')
+    dv.build()
+    expected = dv.generate_comparison(CompactHTMLTabFormatter(columns=3))
+    assert dv.visualize(mode='CompactHTMLTab', columns=3) == expected
+    assert DiffVis.batch([('kitten', 'sitting')], mode='CompactHTMLTab', columns=3, n_jobs=1) == [expected]
+    monkeypatch.setattr('sys.argv', ['diffvis.py', 'kitten', 'sitting', '-p', '-o', 'CompactHTMLTab', '--columns', '3'])
+    diffvis.main()
+    assert capsys.readouterr().out == expected + '\n'
+    with pytest.raises(ValueError, match='columns'):
+        dv.visualize(mode='HTML', columns=3)
+    with pytest.raises(ValueError, match='columns'):
+        dv.visualize(mode='CompactHTMLTab', columns=0)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+
+import io
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import asyncio
+import threading
+import subprocess
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from DiffVis import diffvis, server
+from DiffVis.diffvis import DiffVis
+from DiffVis.server import parse_request
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def executor():
+    yield
+    diffvis.shutdown_executor(cancel_futures=True)
+
+
+def visualize(source, target, mode):
+    dv = DiffVis(source, target)
+    dv.build()
+    return dv.visualize(mode=mode)
+
+
+def test_parse_request():
+    arguments = parse_request({'source': 'kitten', 'target': ['s', 'it']}, alignment='Damerau')
+    assert arguments == {
+        'source': 'kitten', 'target': ('s', 'it'), 'alignment': 'Damerau',
+        'mode': 'Console', 'padding': True, 'context': None, 'columns': None,
+        }
+    arguments = parse_request({
+        'source': 'a', 'target': 'b', 'alignment': 'LCS', 'mode': 'CompactHTMLTab',
+        'padding': False, 'context': 0, 'columns': 8,
+        })
+    assert (arguments['context'], arguments['columns']) == (0, 8)
+
+    for request in [
+            ['kitten', 'sitting'],
+            {'source': 'kitten'},
+            {'source': 'kitten', 'target': 1},
+            {'source': 'kitten', 'target': ['s', 1]},
+            {'source': 'kitten', 'target': 'sitting', 'context': -1},
+            {'source': 'kitten', 'target': 'sitting', 'context': 1.5},
+            {'source': 'kitten', 'target': 'sitting', 'context': True},
+            {'source': 'kitten', 'target': 'sitting', 'mode': 'CompactHTMLTab', 'columns': 0},
+            {'source': 'kitten', 'target': 'sitting', 'mode': 'CompactHTMLTab', 'columns': True},
+            {'source': 'kitten', 'target': 'sitting', 'mode': 'HTML', 'columns': 8},
+            {'source': 'kitten', 'target': 'sitting', 'alignment': 'Unknown'},
+            {'source': 'kitten', 'target': 'sitting', 'mode': 'Unknown'},
+            ]:
+        with pytest.raises(ValueError):
+            parse_request(request)
+
+
+def test_serve_stdio(monkeypatch):
+    requests = [
+        {'id': 1, 'source': 'kitten', 'target': 'sitting', 'mode': 'HTML'},
+        {'id': 2, 'source': 'flaw', 'target': 'lawn'},
+        {'id': 3, 'source': 'kitten', 'target': 'sitting', 'context': True},
+        ]
+    lines = [json.dumps(request) for request in requests] + ['', '{"id": 4,']
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('\n'.join(lines) + '\n'))
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    asyncio.run(server.serve_stdio(max_workers=1))
+    responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert len(responses) == 4
+    by_id = {response.get('id'): response for response in responses}
+    assert by_id[1] == {'id': 1, 'output': visualize('kitten', 'sitting', 'HTML')}
+    assert by_id[2] == {'id': 2, 'output': visualize('flaw', 'lawn', 'Console')}
+    assert set(by_id[3]) == {'id', 'error'}
+    # the id of invalid JSON is unknown
+    assert set(by_id[None]) == {'error'}
+
+
+def test_serve_stdio_internal_error(monkeypatch):
+    async def diff_and_render(**kwargs):
+        raise RuntimeError('failed')
+
+    stdout = io.StringIO()
+    monkeypatch.setattr(server, 'diff_and_render', diff_and_render)
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('{"id": 1, "source": "a", "target": "b"}\n'))
+    monkeypatch.setattr(sys, 'stdout', stdout)
+    asyncio.run(server.serve_stdio(max_workers=1))
+    assert json.loads(stdout.getvalue()) == {'id': 1, 'error': 'Internal error.'}
+
+
+async def _post(port, requests):
+    # sends requests on one connection and returns (status, body) of each
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    try:
+        for method, body in requests:
+            body = body.encode('utf-8')
+            writer.write(
+                f'{method} / HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode('latin-1')
+                + body
+                )
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line == b'\r\n':
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers['content-length']))
+            responses.append((status, body.decode('utf-8')))
+    finally:
+        writer.close()
+    return responses
+
+
+def _serve_http(requests, **kwargs):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    async def _run():
+        task = asyncio.create_task(server.serve_http(port=port, max_workers=1, **kwargs))
+        try:
+            for _ in range(100):
+                try:
+                    _, writer = await asyncio.open_connection('127.0.0.1', port)
+                    writer.close()
+                    break
+                except OSError:
+                    await asyncio.sleep(0.05)
+            return await _post(port, requests)
+        finally:
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    return asyncio.run(_run())
+
+
+def test_serve_http():
+    responses = _serve_http([
+        ('POST', json.dumps({'source': 'kitten', 'target': 'sitting', 'mode': 'HTML'})),
+        ('GET', ''),
+        ('POST', '{"source": "kitten"'),
+        ('POST', json.dumps({'source': 'kitten', 'target': 'sitting', 'context': False})),
+        ('POST', json.dumps({'source': 'flaw', 'target': 'lawn'})),
+        ])
+    assert [status for status, _ in responses] == [200, 405, 400, 400, 200]
+    assert responses[0][1] == visualize('kitten', 'sitting', 'HTML')
+    assert responses[4][1] == visualize('flaw', 'lawn', 'Console')
+
+
+def test_serve_http_internal_error(monkeypatch):
+    errors = [BrokenProcessPool('a worker died'), RuntimeError('failed')]
+
+    async def diff_and_render(**kwargs):
+        raise errors.pop(0)
+
+    monkeypatch.setattr(server, 'diff_and_render', diff_and_render)
+    broken = diffvis.get_executor(1)
+    body = json.dumps({'source': 'kitten', 'target': 'sitting'})
+    responses = _serve_http([('POST', body), ('POST', body)])
+    assert [status for status, _ in responses] == [500, 500]
+    # the broken pool is replaced with a new one
+    assert diffvis.get_executor() is not broken
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='/proc is needed')
+def test_terminate():
+    # the server is started with the repository imported as DiffVis package
+    code = (
+        'import sys, importlib.util\n'
+        f'spec = importlib.util.spec_from_file_location("DiffVis", {os.path.join(ROOT, "__init__.py")!r}, '
+        f'submodule_search_locations=[{ROOT!r}])\n'
+        'module = importlib.util.module_from_spec(spec)\n'
+        'sys.modules["DiffVis"] = module\n'
+        'spec.loader.exec_module(module)\n'
+        'from DiffVis.server import run\n'
+        'run("stdio", max_workers=2)\n'
+        )
+    process = subprocess.Popen(
+        [sys.executable, '-c', code],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+    # the server is killed if it does not respond
+    timer = threading.Timer(30, process.kill)
+    timer.start()
+    try:
+        process.stdin.write(json.dumps({'source': 'kitten', 'target': 'sitting'}) + '\n')
+        process.stdin.flush()
+        assert 'output' in json.loads(process.stdout.readline())
+        workers = _children(process.pid)
+        assert workers
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=10)
+    finally:
+        timer.cancel()
+        process.kill()
+        process.wait()
+    time_limit = time.perf_counter() + 10
+    while any(os.path.exists(f'/proc/{pid}') for pid in workers) and (time.perf_counter() < time_limit):
+        time.sleep(0.05)
+    assert not any(os.path.exists(f'/proc/{pid}') for pid in workers)
+
+
+def _children(pid):
+    children = []
+    for name in os.listdir('/proc'):
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                stat = f.read()
+        except (OSError, ValueError):
+            continue
+        # the parent pid follows the command name in parentheses and the state
+        if int(stat.rpartition(')')[2].split()[1]) == pid:
+            children.append(int(name))
+    return children
@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+
+
+import random
+import pickle
+
+import pytest
+
+from DiffVis import string_distance
+from DiffVis.string_distance import (
+    Levenshtein, Damerau, LongestCommonSubsequence, Hirschberg, Myers,
+    Segmented, Hierarchical, HierarchicalLCS, SemiGlobal, Anchored, AnchoredLCS,
+    find_common_affixes, pairwise_distances, search_nearest,
+    delete_consecutive_duplicates, iter_common_parts, EditScript, iter_hunks, Vocabulary,
+    CostModel,
+    )
+
+
+def levenshtein_brute_force(source, target):
+    m, n = len(source), len(target)
+    table = [[i + j if i * j == 0 else 0 for j in range(n+1)] for i in range(m+1)]
+    for i in range(1, m+1):
+        for j in range(1, n+1):
+            table[i][j] = min(
+                table[i-1][j] + 1,
+                table[i][j-1] + 1,
+                table[i-1][j-1] + (source[i-1] != target[j-1]),
+                )
+    return table[m][n]
+
+
+def weighted_brute_force(source, target, insert, delete, replace, substitutions):
+    m, n = len(source), len(target)
+    table = [[0] * (n+1) for _ in range(m+1)]
+    for i in range(1, m+1):
+        table[i][0] = table[i-1][0] + delete
+    for j in range(1, n+1):
+        table[0][j] = table[0][j-1] + insert
+    for i in range(1, m+1):
+        for j in range(1, n+1):
+            if source[i-1] == target[j-1]:
+                cost = 0
+            else:
+                cost = substitutions.get((source[i-1], target[j-1]), replace)
+            table[i][j] = min(
+                table[i-1][j] + delete,
+                table[i][j-1] + insert,
+                table[i-1][j-1] + cost,
+                )
+    return table[m][n]
+
+
+def osa_brute_force(source, target):
+    m, n = len(source), len(target)
+    table = [[i + j if i * j == 0 else 0 for j in range(n+1)] for i in range(m+1)]
+    for i in range(1, m+1):
+        for j in range(1, n+1):
+            table[i][j] = min(
+                table[i-1][j] + 1,
+                table[i][j-1] + 1,
+                table[i-1][j-1] + (source[i-1] != target[j-1]),
+                )
+            if (i > 1) and (j > 1) and (source[i-1] == target[j-2]) and (source[i-2] == target[j-1]):
+                table[i][j] = min(table[i][j], table[i-2][j-2] + 1)
+    return table[m][n]
+
+
+def lcs_brute_force(source, target):
+    m, n = len(source), len(target)
+    table = [[0] * (n+1) for _ in range(m+1)]
+    for i in range(1, m+1):
+        for j in range(1, n+1):
+            if source[i-1] == target[j-1]:
+                table[i][j] = table[i-1][j-1] + 1
+            else:
+                table[i][j] = max(table[i-1][j], table[i][j-1])
+    return table[m][n]
+
+
+def apply_edit_history(source, target, edit_history):
+    """Checks that edit history transforms source into target,
+    and returns the number of operations of each kind."""
+    counts = {}
+    i, j = 0, 0
+    for operation in edit_history:
+        counts[operation] = counts.get(operation, 0) + 1
+        if operation == 'match':
+            assert source[i] == target[j]
+            i, j = i+1, j+1
+        elif operation == 'replace':
+            assert source[i] != target[j]
+            i, j = i+1, j+1
+        elif operation == 'delete':
+            i += 1
+        elif operation == 'insert':
+            j += 1
+        elif operation == 'transpose':
+            assert (source[i], source[i+1]) == (target[j+1], target[j])
+            i, j = i+2, j+2
+    assert (i, j) == (len(source), len(target))
+    return counts
+
+
+def random_pairs(n_pairs, seed=0, alphabet='abc', max_length=8):
+    rand = random.Random(seed)
+    for _ in range(n_pairs):
+        source = ''.join(rand.choice(alphabet) for _ in range(rand.randrange(max_length)))
+        target = ''.join(rand.choice(alphabet) for _ in range(rand.randrange(max_length)))
+        yield source, target
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'python'])
+def use_numpy(request, monkeypatch):
+    if request.param and (string_distance.np is None):
+        pytest.skip('NumPy is not installed')
+    monkeypatch.setattr(string_distance, 'USE_NUMPY', request.param)
+    # NumPy is used even for short rows
+    monkeypatch.setattr(string_distance, 'NUMPY_MIN_LENGTH', 0)
+    return request.param
+
+
+@pytest.fixture
+def small_tables(monkeypatch):
+    # Hirschberg divides even short sequences
+    monkeypatch.setattr(Hirschberg, 'MAX_TABLE_SIZE', 4)
+
+
+def test_trace_back_long_narrow(use_numpy):
+    # trace back must not recurse nor keep states for 50k elements
+    rand = random.Random(0)
+    source = [rand.choice('abcd') for _ in range(50000)]
+    target = list('abcd')
+    model = Levenshtein(source, target)
+    model.build()
+    counts = apply_edit_history(source, target, model.edit_history)
+    assert model.distance == len(source) - len(target) + counts.get('replace', 0)
+    assert model.distance == Levenshtein.measure(source, target)
+
+
+def test_levenshtein(use_numpy, small_tables):
+    for source, target in random_pairs(300):
+        distance = levenshtein_brute_force(source, target)
+        assert Levenshtein.measure(source, target) == distance
+        for Model in [Levenshtein, Hirschberg]:
+            model = Model(source, target)
+            model.build()
+            counts = apply_edit_history(source, target, model.edit_history)
+            assert counts.get('replace', 0) + counts.get('delete', 0) + counts.get('insert', 0) == distance
+            assert model.distance == distance
+
+
+def test_hirschberg_long(use_numpy, small_tables):
+    rand = random.Random(1)
+    for _ in range(5):
+        source = ''.join(rand.choice('abc') for _ in range(rand.randrange(100, 150)))
+        target = ''.join(rand.choice('abc') for _ in range(rand.randrange(100, 150)))
+        distance = levenshtein_brute_force(source, target)
+        model = Hirschberg(source, target)
+        model.build()
+        counts = apply_edit_history(source, target, model.edit_history)
+        assert len(model.edit_history) - counts.get('match', 0) == distance
+        assert model.distance == distance
+
+
+def test_hirschberg_last_row(use_numpy):
+    for source, target in random_pairs(100, seed=7):
+        cost_table = Levenshtein.build_cost_table(source, target)
+        row = Hirschberg.build_last_row(source, target)
+        assert list(row) == list(cost_table[len(source)])
+
+
+def test_bit_parallel():
+    # longer than a machine word, and tokens other than characters
+    rand = random.Random(4)
+    for _ in range(20):
+        source = [rand.choice(['ab', 'cd', 'ef']) for _ in range(rand.randrange(50, 150))]
+        target = [rand.choice(['ab', 'cd', 'ef']) for _ in range(rand.randrange(50, 150))]
+        assert Levenshtein.measure_bit_parallel(source, target) == levenshtein_brute_force(source, target)
+        assert LongestCommonSubsequence.measure_length(source, target) == lcs_brute_force(source, target)
+        assert Damerau.measure_bit_parallel(source, target) == osa_brute_force(source, target)
+
+
+def test_max_distance():
+    # distances just under, at, and just over max_distance,
+    # with both banded and bit-parallel calculations chosen by the lengths
+    for source, target in random_pairs(200, seed=10, alphabet='ab', max_length=40):
+        distance = levenshtein_brute_force(source, target)
+        for max_distance in [distance - 1, distance, distance + 1]:
+            if max_distance < 0:
+                continue
+            expected = min(distance, max_distance + 1)
+            assert Levenshtein.measure_banded(source, target, max_distance) == expected
+            assert Levenshtein.measure(source, target, max_distance=max_distance) == expected
+            assert Hirschberg.measure(source, target, max_distance=max_distance) == expected
+
+
+def test_longest_common_subsequence_max_distance():
+    for source, target in random_pairs(300, seed=8):
+        distance = LongestCommonSubsequence.measure(source, target)
+        for max_distance in range(distance + 2):
+            expected = min(distance, max_distance + 1)
+            assert LongestCommonSubsequence.measure(source, target, max_distance=max_distance) == expected
+
+
+def test_narrow_table_in_python():
+    # rows shorter than NUMPY_MIN_LENGTH are calculated without NumPy
+    source = 'abcd' * 1000
+    for Model in [Levenshtein, Damerau, LongestCommonSubsequence]:
+        assert isinstance(Model.build_cost_table(source, 'abcd'), tuple)
+
+
+@pytest.mark.parametrize('Model', [Levenshtein, Damerau, LongestCommonSubsequence])
+def test_trimmed_cost_table(Model):
+    source, target = 'xkittenx', 'xsittingx'
+    expected = [list(row) for row in Model.build_cost_table(source, target)]
+    for keep_cost_table in [True, False]:
+        model = Model(source, target)
+        model.build(keep_cost_table=keep_cost_table)
+        # the table of the trimmed sequences is never kept
+        assert model._cost_table is None
+        assert [list(row) for row in model.iter_cost_table()] == expected
+        assert [list(row) for row in model.cost_table] == expected
+        assert [list(row) for row in model.iter_cost_table()] == expected
+
+
+def test_longest_common_subsequence(use_numpy):
+    for source, target in random_pairs(300, seed=2):
+        length = lcs_brute_force(source, target)
+        model = LongestCommonSubsequence(source, target)
+        model.build()
+        apply_edit_history(source, target, model.edit_history)
+        assert model.cost_table[len(source)][len(target)] == length
+
+
+def test_common_affixes(use_numpy):
+    assert find_common_affixes('abcxyzabc', 'abczabc') == (3, 4)
+    # suffix does not overlap prefix
+    assert find_common_affixes('aaa', 'aa') == (2, 0)
+    assert find_common_affixes('', 'abc') == (0, 0)
+    for source, target in random_pairs(100, seed=5):
+        source = 'xy' * 20 + source + 'yx' * 20
+        target = 'xy' * 20 + target + 'yx' * 20
+        distance = levenshtein_brute_force(source, target)
+        for Model in [Levenshtein, LongestCommonSubsequence]:
+            model = Model(source, target)
+            model.build()
+            apply_edit_history(source, target, model.edit_history)
+            # cost table is of the whole sequences
+            assert len(model.cost_table) == len(source) + 1
+        assert model.cost_table[len(source)][len(target)] == lcs_brute_force(source, target)
+        model = Levenshtein(source, target)
+        model.build()
+        assert model.distance == model.cost_table[len(source)][len(target)] == distance
+
+
+def test_myers():
+    for source, target in random_pairs(300, seed=3):
+        length = lcs_brute_force(source, target)
+        model = Myers(source, target)
+        model.build()
+        counts = apply_edit_history(source, target, model.edit_history)
+        assert counts.get('match', 0) == length
+        assert model.distance == len(source) + len(target) - 2 * length
+
+
+def test_trace_back_long_similar():
+    rand = random.Random(1)
+    source = [rand.choice('abcd') for _ in range(50000)]
+    target = list(source)
+    for _ in range(4):
+        del target[rand.randrange(len(target))]
+    model = Myers(source, target)
+    model.build()
+    apply_edit_history(source, target, model.edit_history)
+    assert model.distance == 4
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_pairwise_distances(n_jobs):
+    sequences = [source for source, _ in random_pairs(12, seed=6)]
+    distances = pairwise_distances(sequences, normalize=True, n_jobs=n_jobs)
+    size = len(sequences)
+    # flattened if NumPy is not installed
+    distances = list(distances.ravel() if string_distance.np is not None else distances)
+    for i in range(size):
+        for j in range(size):
+            expected = levenshtein_brute_force(sequences[i], sequences[j])
+            expected /= max(len(sequences[i]), len(sequences[j]), 1)
+            assert distances[i*size + j] == expected
+    with pytest.raises(ValueError):
+        pairwise_distances(sequences, alignment='Unknown')
+
+
+@pytest.mark.parametrize('normalize', [True, False])
+def test_search_nearest(normalize):
+    for seed in range(200):
+        rand = random.Random(seed)
+        corpus = [
+            ''.join(rand.choice('abcd') for _ in range(rand.randrange(15, 30)))
+            for _ in range(30)
+            ]
+        query = corpus.pop()
+        distances = []
+        for index, candidate in enumerate(corpus):
+            distance = levenshtein_brute_force(query, candidate)
+            if normalize:
+                distance /= max(len(query), len(candidate))
+            distances.append((distance, index))
+        for k in [1, 3, 10]:
+            expected = [(index, distance) for distance, index in sorted(distances)[:k]]
+            assert search_nearest(query, corpus, k=k, normalize=normalize) == expected
+
+
+def test_main(monkeypatch, capsys, tmp_path):
+    monkeypatch.setattr('sys.argv', ['string_distance.py', 'measure', 'kitten', 'sitting'])
+    string_distance.main()
+    assert capsys.readouterr().out == '3\n'
+    corpus = tmp_path / 'corpus.txt'
+    corpus.write_text('kitten\nsitting\nmitten\n', encoding='utf-8')
+    monkeypatch.setattr('sys.argv', ['string_distance.py', 'search', 'kiten', str(corpus), '-k', '2'])
+    string_distance.main()
+    assert capsys.readouterr().out == '0\t0.167\tkitten\n2\t0.333\tmitten\n'
+    monkeypatch.setattr('sys.argv', ['string_distance.py', 'kitten', 'sitting'])
+    with pytest.raises(SystemExit):
+        string_distance.main()
+
+
+@pytest.mark.parametrize('blank', ['<blank>', ''])
+def test_iter_common_parts(blank):
+    for source, target in random_pairs(300, seed=7):
+        model = Levenshtein(source, target)
+        model.build()
+        expected = []
+        i = 0
+        for operation in model.edit_history:
+            expected.append(source[i] if operation == 'match' else blank)
+            i += operation != 'insert'
+        expected = delete_consecutive_duplicates(expected, string=blank)
+        assert list(iter_common_parts(source, target, model.edit_history, blank=blank)) == expected
+
+
+def test_edit_script():
+    operations = ('match',) * 3 + ('replace', 'delete', 'delete', 'insert') + ('match',) * 2
+    edit_script = EditScript.from_operations(operations)
+    assert list(edit_script.runs()) == [
+        ('match', 3), ('replace', 1), ('delete', 2), ('insert', 1), ('match', 2),
+        ]
+    assert len(edit_script) == len(operations)
+    assert edit_script == operations
+    assert edit_script.count('delete') == 2
+    assert edit_script.count('transpose') == 0
+    for index in range(-len(operations), len(operations)):
+        assert edit_script[index] == operations[index]
+    with pytest.raises(IndexError):
+        edit_script[len(operations)]
+    for start in range(-3, len(operations)):
+        for stop in [None, -1, 2, 6]:
+            assert edit_script[start:stop] == operations[start:stop]
+    assert edit_script[::2] == operations[::2]
+    assert pickle.loads(pickle.dumps(edit_script)) == edit_script
+    assert EditScript.from_bytes(edit_script.to_bytes()) == edit_script
+
+    # runs are merged when appended
+    edit_script.append('match', 4)
+    edit_script.extend(['match', 'insert'])
+    assert list(edit_script.runs())[-2:] == [('match', 7), ('insert', 1)]
+    assert edit_script[-2] == 'match'
+
+
+@pytest.mark.parametrize('context', [0, 1, 3])
+def test_iter_hunks(context):
+    for source, target in random_pairs(300, seed=8, alphabet='aab', max_length=16):
+        model = Levenshtein(source, target)
+        model.build()
+        operations = list(model.edit_history)
+        changes = [k for k, operation in enumerate(operations) if operation != 'match']
+        # matches at most context away from a change are kept
+        kept = [
+            any(abs(k - change) <= context for change in changes)
+            for k in range(len(operations))
+            ]
+        expected = []
+        i, j = 0, 0
+        for k, operation in enumerate(operations):
+            if kept[k]:
+                if (k == 0) or not kept[k-1]:
+                    expected.append((i, j, []))
+                expected[-1][2].append(operation)
+            i += operation != 'insert'
+            j += operation != 'delete'
+        hunks = [(i, j, list(hunk)) for i, j, hunk in iter_hunks(model.edit_history, context=context)]
+        assert hunks == expected
+
+
+def test_vocabulary():
+    vocabulary = Vocabulary()
+    assert vocabulary.encode(['the', 'cat', 'the']) == [0, 1, 0]
+    assert vocabulary.encode(['a', 'cat']) == [2, 1]
+    assert len(vocabulary) == 3
+    assert 'cat' in vocabulary
+    assert vocabulary.tokens == ['the', 'cat', 'a']
+
+
+def test_levenshtein_weighted(use_numpy, small_tables):
+    substitutions = {('a', 'b'): 1, ('b', 'a'): 4}
+    cost_model = CostModel(insert=2, delete=3, replace=5, substitutions=substitutions)
+    vocabulary_size = len(cost_model.vocabulary)
+    for source, target in random_pairs(300, seed=9, alphabet='abcxyz'):
+        distance = weighted_brute_force(source, target, 2, 3, 5, substitutions)
+        assert Levenshtein.measure(source, target, cost_model=cost_model) == distance
+        for Model in [Levenshtein, Hirschberg]:
+            model = Model(source, target, cost_model=cost_model)
+            model.build()
+            apply_edit_history(source, target, model.edit_history)
+            assert model.distance == distance
+    # symbols not in substitutions are numbered per call, not interned in the model
+    assert len(cost_model.vocabulary) == vocabulary_size
+
+
+def test_damerau(use_numpy):
+    for source, target in random_pairs(300, seed=1):
+        distance = osa_brute_force(source, target)
+        assert Damerau.measure(source, target) == distance
+        model = Damerau(source, target)
+        model.build()
+        counts = apply_edit_history(source, target, model.edit_history)
+        assert len(model.edit_history) - counts.get('match', 0) == distance
+        assert model.distance == distance
+
+
+@pytest.mark.parametrize('Model', [Hierarchical, HierarchicalLCS])
+def test_hierarchical(Model):
+    for source, target in random_pairs(300, seed=6, alphabet='ab\n', max_length=20):
+        model = Model(source, target)
+        model.build()
+        apply_edit_history(source, target, model.edit_history)
+        assert model.distance == Model.measure(source, target)
+        # blocks are sorted, disjoint, and made of whole lines
+        line_starts = {0, len(source)} | {k+1 for k, elem in enumerate(source) if elem == '\n'}
+        end_last = 0
+        for start, end in model.blocks:
+            assert end_last <= start < end
+            assert (start in line_starts) and (end in line_starts)
+            end_last = end
+
+
+def semi_global_brute_force(source, target):
+    # source is aligned with any span of target for free
+    m, n = len(source), len(target)
+    row = [0] * (n+1)
+    for i in range(1, m+1):
+        row_prev, row = row, [i] + [0] * n
+        for j in range(1, n+1):
+            row[j] = min(row_prev[j] + 1, row[j-1] + 1, row_prev[j-1] + (source[i-1] != target[j-1]))
+    return min(row)
+
+
+def test_semi_global():
+    rand = random.Random(4)
+    pairs = list(random_pairs(300, seed=4, max_length=10))
+    for _ in range(10):
+        # long target searched by the bit-parallel algorithm
+        target = ''.join(rand.choice('abcd') for _ in range(200))
+        start = rand.randrange(100)
+        source = list(target[start:start+rand.randrange(20, 80)])
+        source[rand.randrange(len(source))] = 'x'
+        pairs.append((''.join(source), target))
+    for source, target in pairs:
+        distance = semi_global_brute_force(source, target)
+        model = SemiGlobal(source, target)
+        model.build()
+        apply_edit_history(source, target, model.edit_history)
+        start, end = model.span
+        assert model.distance == distance
+        assert levenshtein_brute_force(source, target[start:end]) == distance
+
+
+@pytest.mark.parametrize('Model', [Anchored, AnchoredLCS])
+def test_anchored(Model):
+    rand = random.Random(10)
+    pairs = list(random_pairs(300, seed=10, max_length=20))
+    for _ in range(20):
+        # long strings have anchors of k-mers
+        source = ''.join(rand.choice('abcdefgh') for _ in range(200))
+        target = list(source)
+        for _ in range(5):
+            target[rand.randrange(len(target))] = 'x'
+        pairs.append((source, ''.join(target)))
+        # and tokens are anchors by themselves
+        pairs.append((source.split('a'), ''.join(target).split('a')))
+    for source, target in pairs:
+        model = Model(source, target)
+        model.build()
+        apply_edit_history(source, target, model.edit_history)
+        assert model.distance == Model.measure(source, target)
+        for i, j, length in model.anchors:
+            assert source[i:i+length] == target[j:j+length]
+
+
+def test_segmented_without_segments():
+    # a model whose align returns only the edit history needs no set_segments
+    class WholeSegment(Segmented):
+        @classmethod
+        def align(cls, source, target):
+            model = Levenshtein(source, target)
+            model.build()
+            return (model.edit_history,)
+
+    model = WholeSegment('kitten', 'sitting')
+    model.build()
+    apply_edit_history('kitten', 'sitting', model.edit_history)
+    assert model.distance == 3